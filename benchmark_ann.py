@@ -0,0 +1,116 @@
+"""
+Build time, memory, QPS and recall@k of the local index's IVF option against the exact scan.
+
+    python -m benchmark_ann                        # the index under LOCAL_INDEX_DIR
+    python -m benchmark_ann --synthetic 300000     # clustered random vectors, no index needed
+    python -m benchmark_ann --lists 256,1024 --nprobe 4,16,64
+
+Each configuration is run without a filter and with the kind of filters semantic_search
+builds (one ticker; a ticker list plus a fiscal-year range). Ground truth for each is the
+exact scan with the same filter, and every returned match is checked against the filter.
+The plan column shows whether the store scanned the filtered rows or probed the IVF lists.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmark_quantization import recall, synthetic_index
+from src.vector_store.factory import LOCAL_INDEX_DIR
+from src.vector_store.ivf import IVFIndex, default_n_lists
+from src.vector_store.local_store import LocalVectorStore
+from src.vector_store.metadata_filter import MetadataColumns
+
+
+def filters_for(store: LocalVectorStore) -> Dict[str, Optional[Dict[str, Any]]]:
+    tickers = sorted({m.get("ticker") for m in store._metadata if m.get("ticker")})
+    years = sorted({m["fiscal_year"] for m in store._metadata if isinstance(m.get("fiscal_year"), int)})
+    filters: Dict[str, Optional[Dict[str, Any]]] = {"none": None}
+    if tickers:
+        filters["ticker"] = {"ticker": tickers[0]}
+        if years:
+            filters["tickers+years"] = {
+                "ticker": {"$in": tickers[: max(len(tickers) // 4, 1)]},
+                "fiscal_year": {"$gte": years[len(years) // 2]},
+            }
+    return filters
+
+
+def run(store: LocalVectorStore, queries: np.ndarray, k: int, filter: Optional[Dict[str, Any]]):
+    ids, metadata = [], []
+    start = time.perf_counter()
+    for query in queries:
+        matches = store.query(query, top_k=k, filter=filter)
+        ids.append([m["id"] for m in matches])
+        metadata.extend(m["metadata"] for m in matches)
+    return ids, len(queries) / (time.perf_counter() - start), metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IVF option of the local vector store.")
+    parser.add_argument("--index-dir", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N synthetic vectors instead")
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3, help="Noise added to the stored vectors used as queries")
+    parser.add_argument("--lists", default="0", help="Comma-separated list counts to train; 0 = sqrt(n)")
+    parser.add_argument("--nprobe", default="4,16,64", help="Comma-separated nprobe values to try")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    index_dir = args.index_dir
+    if args.synthetic:
+        index_dir = tempfile.mkdtemp(prefix="ann-benchmark-")
+        print(f"Building {args.synthetic} synthetic {args.dimensions}-d vectors in {index_dir} ...")
+        synthetic_index(index_dir, args.synthetic, args.dimensions)
+
+    exact = LocalVectorStore(index_dir)
+    n = len(exact)
+    if n == 0:
+        raise SystemExit(f"No vectors in {index_dir}; build the local index or pass --synthetic N.")
+    rng = np.random.default_rng(1)
+    picked = np.asarray(exact._vectors[rng.choice(n, size=min(args.queries, n), replace=False)])
+    queries = picked + args.noise * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(picked.shape[1])
+    k = args.top_k
+
+    filters = filters_for(exact)
+    columns = MetadataColumns(exact._metadata)
+    truth = {}
+    print(f"{n} vectors x {exact.dimensions} dims ({exact._vectors.nbytes / 1e6:.0f} MB float32), {len(queries)} queries")
+    for name, filter in filters.items():
+        run(exact, queries[:5], k, filter)
+        truth[name], qps, _ = run(exact, queries, k, filter)
+        selectivity = columns.filter_mask(filter).mean() if filter else 1.0
+        print(f"exact scan, filter {name:<14} (selectivity {selectivity:6.1%}): {qps:8.0f} QPS")
+
+    print(f"\n{'lists':>6} {'build s':>8} {'index MB':>9} {'nprobe':>6} {'filter':<14} {'plan':<6} {'recall@k':>9} {'QPS':>8} {'violations':>10}")
+    for lists in (int(x) for x in args.lists.split(",")):
+        lists = lists or default_n_lists(n)
+        started = time.perf_counter()
+        ivf = IVFIndex.train(exact._vectors, lists)
+        build_seconds = time.perf_counter() - started
+        for nprobe in (int(x) for x in args.nprobe.split(",")):
+            store = LocalVectorStore(index_dir, ann="ivf", nprobe=nprobe)
+            store._ivf = ivf
+            for name, filter in filters.items():
+                run(store, queries[:5], k, filter)
+                store.plans.clear()
+                found, qps, metadata = run(store, queries, k, filter)
+                plan = store.plans.most_common(1)[0][0]
+                # Every returned match must satisfy the filter, whichever path served it
+                violations = 0
+                if filter:
+                    violations = int((~MetadataColumns(metadata).filter_mask(filter)).sum())
+                print(
+                    f"{ivf.n_lists:>6} {build_seconds:>8.2f} {ivf.nbytes / 1e6:>9.2f} {nprobe:>6} {name:<14} {plan:<6} "
+                    f"{recall(truth[name], found, k):>9.3f} {qps:>8.0f} {violations:>10}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Recall@k vs. latency of the local index's two-stage search modes (int8, binary and
+Matryoshka prefix first passes), against the single-stage exact float32 scan.
+
+    python -m benchmark_quantization                       # the index under LOCAL_INDEX_DIR
+    python -m benchmark_quantization --synthetic 200000    # clustered random vectors, no index needed
+    python -m benchmark_quantization --prefix-dims 64,128 --candidates 100,300
+
+Queries are stored vectors with noise added, so each has a known neighbourhood. Ground truth
+is the exact scan; recall@k is the share of its top k that each mode also returns. Every
+mode re-scores its candidates exactly, so only recall and latency differ, never the scores.
+Prefix results are only meaningful on real text-embedding-3 vectors, or on synthetic ones
+generated with --matryoshka.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from src.vector_store.factory import LOCAL_INDEX_DIR
+from src.vector_store.local_store import LocalVectorStore
+
+
+def synthetic_index(index_dir: str, n: int, dimensions: int, seed: int = 0, matryoshka: bool = False) -> None:
+    """
+    Clustered unit vectors, roughly like chunks of the same filings sitting close together.
+    With `matryoshka`, dimension j is scaled by 1 / sqrt(1 + j / 16) so that, as in
+    Matryoshka-trained embeddings, the leading dimensions carry most of the signal.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(n // 200, 1), dimensions)).astype(np.float32)
+    scale = 1 / np.sqrt(1 + np.arange(dimensions) / 16) if matryoshka else np.ones(dimensions)
+    store = LocalVectorStore(index_dir, dimensions=dimensions)
+    for start in range(0, n, 10000):
+        size = min(10000, n - start)
+        values = centres[rng.integers(0, len(centres), size)] + 0.6 * rng.standard_normal((size, dimensions))
+        values *= scale
+        store.upsert([
+            {"id": f"synthetic-{start + i}", "values": row,
+             "metadata": {"ticker": f"T{(start + i) % 100:03d}", "fiscal_year": 2015 + (start + i) % 10}}
+            for i, row in enumerate(values.astype(np.float32))
+        ])
+    store.flush()
+
+
+def run(store: LocalVectorStore, queries: np.ndarray, k: int) -> tuple[List[List[str]], List[float]]:
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.query(query, top_k=k, include_metadata=False)
+        latencies.append(time.perf_counter() - start)
+        ids.append([m["id"] for m in matches])
+    return ids, latencies
+
+
+def recall(truth: List[List[str]], found: List[List[str]], k: int) -> float:
+    return statistics.mean(len(set(t[:k]) & set(f[:k])) / max(len(t[:k]), 1) for t, f in zip(truth, found))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs. latency of quantized local index search.")
+    parser.add_argument("--index-dir", default=LOCAL_INDEX_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N synthetic vectors instead")
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3, help="Noise added to the stored vectors used as queries")
+    parser.add_argument("--factors", default="2,4,10", help="Comma-separated int8/binary rescore factors to try")
+    parser.add_argument("--prefix-dims", default="64,128", help="Comma-separated Matryoshka prefix widths to try")
+    parser.add_argument("--candidates", default="100,300", help="Comma-separated prefix candidate counts to try")
+    parser.add_argument("--matryoshka", action="store_true", help="Give synthetic vectors Matryoshka-like structure")
+    args = parser.parse_args()
+
+    index_dir = args.index_dir
+    if args.synthetic:
+        index_dir = tempfile.mkdtemp(prefix="quantization-benchmark-")
+        print(f"Building {args.synthetic} synthetic {args.dimensions}-d vectors in {index_dir} ...")
+        synthetic_index(index_dir, args.synthetic, args.dimensions, matryoshka=args.matryoshka)
+
+    exact = LocalVectorStore(index_dir)
+    n = len(exact)
+    if n == 0:
+        raise SystemExit(f"No vectors in {index_dir}; build the local index or pass --synthetic N.")
+    rng = np.random.default_rng(1)
+    picked = np.asarray(exact._vectors[rng.choice(n, size=min(args.queries, n), replace=False)])
+    queries = picked + args.noise * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(picked.shape[1])
+
+    k = 10
+    run(exact, queries[:5], k)  # warm the page cache before timing
+    truth, exact_latencies = run(exact, queries, k)
+
+    print(f"{n} vectors x {exact.dimensions} dims, {len(queries)} queries\n")
+    print(f"{'mode':<10} {'rescore':>7} {'bytes/vec':>9} {'recall@5':>9} {'recall@10':>10} {'p50 ms':>8} {'mean ms':>8}")
+    rows: List[Dict[str, object]] = [{
+        "mode": "exact", "rescore": "-", "bytes": exact.dimensions * 4, "recall": (1.0, 1.0), "latencies": exact_latencies,
+    }]
+    configs = [
+        (mode, f"x{factor}", {"rescore_factor": factor})
+        for mode in ("int8", "binary") for factor in (int(f) for f in args.factors.split(","))
+    ] + [
+        (f"prefix{dims}", str(candidates), {"prefix_dimensions": dims, "rescore_factor": 1, "rescore_candidates": candidates})
+        for dims in (int(d) for d in args.prefix_dims.split(",")) for candidates in (int(c) for c in args.candidates.split(","))
+    ]
+    bytes_per_vector = {"int8": exact.dimensions, "binary": (exact.dimensions + 7) // 8}
+    for mode, rescore, options in configs:
+        store = LocalVectorStore(index_dir, quantization="prefix" if mode.startswith("prefix") else mode, **options)
+        run(store, queries[:5], k)
+        found, latencies = run(store, queries, k)
+        rows.append({
+            "mode": mode, "rescore": rescore, "bytes": bytes_per_vector.get(mode, options.get("prefix_dimensions", 0) * 4),
+            "recall": (recall(truth, found, 5), recall(truth, found, 10)), "latencies": latencies,
+        })
+    for row in rows:
+        latencies = row["latencies"]
+        print(
+            f"{row['mode']:<10} {row['rescore']:>7} {row['bytes']:>9} "
+            f"{row['recall'][0]:>9.3f} {row['recall'][1]:>10.3f} "
+            f"{statistics.median(latencies) * 1000:>8.2f} {statistics.mean(latencies) * 1000:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure MCP server cold start: time from spawning `src/mcp_server/server.py` over stdio
+to the `initialize` handshake and to the first `list_tools` response.
+
+    python -m benchmark_startup            # 5 cold starts, current environment
+    python -m benchmark_startup --runs 10
+
+Each run is a fresh process, as when an agent session spawns the server. Set
+VECTOR_STORE_BACKEND=local to measure without Pinecone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVER_PATH = os.path.join(PROJECT_ROOT, "src", "mcp_server", "server.py")
+
+
+async def cold_start() -> tuple[float, float, int]:
+    """(seconds to initialize, seconds to first list_tools, number of tools) for one fresh process."""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{PROJECT_ROOT}:{env['PYTHONPATH']}" if env.get("PYTHONPATH") else PROJECT_ROOT
+    params = StdioServerParameters(command=sys.executable, args=[SERVER_PATH], env=env)
+
+    start = time.perf_counter()
+    async with stdio_client(params, errlog=open(os.devnull, "w")) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            initialized = time.perf_counter() - start
+            tools = await session.list_tools()
+            listed = time.perf_counter() - start
+    return initialized, listed, len(tools.tools)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark MCP server cold start over stdio.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    initialize_times, list_tools_times = [], []
+    for run in range(1, args.runs + 1):
+        initialized, listed, n_tools = await cold_start()
+        initialize_times.append(initialized)
+        list_tools_times.append(listed)
+        print(f"run {run}: initialize {initialized * 1000:.0f} ms, list_tools {listed * 1000:.0f} ms ({n_tools} tools)")
+
+    print(
+        f"median over {args.runs} runs: initialize {statistics.median(initialize_times) * 1000:.0f} ms, "
+        f"first list_tools {statistics.median(list_tools_times) * 1000:.0f} ms "
+        f"(max {max(list_tools_times) * 1000:.0f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
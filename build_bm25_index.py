@@ -0,0 +1,66 @@
+"""
+Build the BM25 lexical index used for hybrid search, without calling OpenAI.
+
+    python build_bm25_index.py                        # chunk processed_filings/ again
+    python build_bm25_index.py --from-document-store  # reuse the chunks stored at ingest
+
+Chunk IDs match the vector index as long as the chunker is unchanged, so the server can
+fuse the two rankings. embed_skeleton.py also rebuilds the index at the end of each run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator
+
+from src.preprocessing.metadata_extractor import parse_filename
+from src.retrieval.bm25_index import BM25_INDEX_DIR, BM25IndexBuilder
+from src.utils.document_store import DocumentStore
+from src.utils.index_generation import bump_index_generation
+
+logger = logging.getLogger(__name__)
+
+
+def chunks_from_filings(base_dir: str) -> Iterator[Dict]:
+    from src.preprocessing.chunker import process_single_filing
+
+    for company_name in sorted(os.listdir(base_dir)):
+        company_dir = os.path.join(base_dir, company_name)
+        if not os.path.isdir(company_dir):
+            continue
+        for filename in sorted(os.listdir(company_dir)):
+            if not filename.endswith(".txt"):
+                continue
+            try:
+                info = parse_filename(Path(company_dir) / filename)
+            except ValueError:
+                logger.warning(f"Skipping {filename} - invalid filename format")
+                continue
+            with open(info.path, "r", encoding="utf-8") as f:
+                document_text = f.read()
+            yield from process_single_filing(document_text, info.ticker, info.form_type, info.filing_date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 index over SEC filing chunks.")
+    parser.add_argument("--base-dir", default="processed_filings")
+    parser.add_argument("--from-document-store", action="store_true", help="Read chunks from the document store instead")
+    parser.add_argument("--output", default=BM25_INDEX_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    builder = BM25IndexBuilder()
+    if args.from_document_store:
+        builder.add_chunks(DocumentStore().iter_chunks())
+    else:
+        builder.add_chunks(chunks_from_filings(args.base_dir))
+    builder.write(args.output)
+    # Cached search responses were ranked without (or with an older) lexical index
+    bump_index_generation()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Run many semantic searches offline, bypassing the MCP tool path.
+
+Reads one JSON query per line (fields of SearchRequest, plus an optional "id" that is
+echoed back) and streams one JSON result line per query:
+
+    python -m bulk_search --input queries.jsonl --output results.jsonl
+    cat queries.jsonl | python -m bulk_search --batch-size 128 > results.jsonl
+
+Example input line:
+    {"id": "aapl-2023-risk", "query": "supply chain risk", "ticker_filter": "AAPL", "year_filter": 2023, "top_k": 5}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from typing import IO, Iterator, List
+
+from pydantic import ValidationError
+
+from src.mcp_server.server import SearchRequest, search_server
+
+logger = logging.getLogger(__name__)
+
+
+def read_batches(stream: IO[str], batch_size: int) -> Iterator[List[dict]]:
+    """Yield lists of parsed JSONL records, skipping blank lines."""
+    batch: List[dict] = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            batch.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping line {line_number}: invalid JSON ({e})")
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def run(input_stream: IO[str], output_stream: IO[str], batch_size: int, text_chars: int | None):
+    total = 0
+    for records in read_batches(input_stream, batch_size):
+        requests = []
+        ids = []
+        for record in records:
+            record_id = record.pop("id", None)
+            if text_chars is not None:
+                record.setdefault("text_chars", text_chars)
+            try:
+                requests.append(SearchRequest(**record))
+            except ValidationError as e:
+                output_stream.write(json.dumps({"id": record_id, "error": str(e)}) + "\n")
+                continue
+            ids.append(record_id)
+
+        batch_results = await search_server.semantic_search_many(requests)
+
+        for record_id, request, results in zip(ids, requests, batch_results):
+            # Text is already cut to text_chars when read from the document store
+            formatted = [result.model_dump() for result in results]
+            output_stream.write(json.dumps({
+                "id": record_id,
+                "query": request.query,
+                "total_results": len(formatted),
+                "results": formatted,
+            }) + "\n")
+        output_stream.flush()
+        total += len(requests)
+        logger.info(f"Processed {total} queries")
+
+    logger.info(f"Query embedding cache: {search_server.query_cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk semantic search over SEC filings (JSONL in, JSONL out).")
+    parser.add_argument("--input", help="JSONL file of queries (default: stdin)")
+    parser.add_argument("--output", help="JSONL file for results (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Queries embedded and scored per batch")
+    parser.add_argument("--text-chars", type=int, default=None, help="Truncate result text to this many characters")
+    args = parser.parse_args()
+
+    # Logs go to stderr so stdout stays pure JSONL
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, force=True)
+
+    input_stream = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+    output_stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        asyncio.run(run(input_stream, output_stream, args.batch_size, args.text_chars))
+    finally:
+        if args.input:
+            input_stream.close()
+        if args.output:
+            output_stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,119 @@
-"""Batch embed SEC filings using the preprocessing and embedding utilities."""
+"""
+Batch embed SEC filings using the preprocessing and embedding utilities.
+
+    python -m embed_skeleton
+    python -m embed_skeleton --workers 8 --embed-concurrency 8 --upsert-concurrency 4
+
+Chunking, embedding and upserting run as a pipeline across filings (see
+src/embeddings/ingestion.py); the run ends with filings/s and chunks/s. Filings whose
+content and ingest configuration match the manifest from the previous run are skipped;
+pass --full to re-ingest everything.
+"""
 
 from __future__ import annotations
 
+import argparse
 import asyncio
 import os
-from pathlib import Path
 
 import nltk
 
-from src.preprocessing.chunker import process_single_filing
-from src.preprocessing.metadata_extractor import parse_filename
-from src.embeddings.embedding_pipeline import pipeline
-
+from src.embeddings.embedding_pipeline import get_pipeline
+from src.embeddings.ingestion import (
+    FilingJob,
+    IngestionRunner,
+    discover_filings,
+    ingest_config_hash,
+    manifest_entry,
+    plan_incremental,
+)
+from src.retrieval.bm25_index import BM25_INDEX_DIR, BM25IndexBuilder
+from src.utils.facts_store import FactsStore
+from src.utils.index_generation import bump_index_generation
+from src.utils.ingest_manifest import IngestManifest
 
-async def process(document_text: str, company_name: str, form_type: str, filing_date: str):
-    """Chunk a filing and upload embeddings."""
-    chunks = process_single_filing(document_text, company_name, form_type, filing_date)
-    if chunks:
-        await pipeline.upload_chunks_to_pinecone(chunks)
-        print(f"✓ Processed {company_name} {form_type} ({filing_date}): {len(chunks)} chunks")
-    else:
-        print(f"⚠ No chunks generated for {company_name} {form_type} ({filing_date})")
+facts_store = FactsStore()
 
 
-async def process_filings(base_dir: str = "processed_filings"):
-    """Iterate through processed filings and process each file."""
+async def process_filings(
+    base_dir: str = "processed_filings",
+    workers: int | None = None,
+    embed_concurrency: int = 4,
+    upsert_concurrency: int = 2,
+    full: bool = False,
+):
+    """Chunk, embed and upsert the new or changed filings under base_dir, several at a time."""
     if not os.path.exists(base_dir):
         print(f"Error: {base_dir} directory not found.")
         return
-    for company_name in os.listdir(base_dir):
-        company_dir = os.path.join(base_dir, company_name)
-        if not os.path.isdir(company_dir):
-            continue
-        print(f"\nProcessing filings for {company_name}...")
-        for filename in os.listdir(company_dir):
-            if not filename.endswith(".txt"):
-                continue
-            path = Path(company_dir) / filename
-            try:
-                info = parse_filename(path)
-            except ValueError:
-                print(f"Warning: Skipping {filename} - invalid filename format")
-                continue
-            with open(path, "r", encoding="utf-8") as f:
-                document_text = f.read()
-            await process(document_text, info.ticker, info.form_type, info.filing_date)
+    pipeline = get_pipeline()
+    manifest = IngestManifest()
+    config_hash = ingest_config_hash(pipeline.embedding_model, pipeline.embedding_dimensions)
+    plan = plan_incremental(discover_filings(base_dir), manifest.entries(), config_hash, force=full)
+    print(
+        f"{len(plan.to_ingest)} new or changed filings to process, {len(plan.unchanged)} unchanged, "
+        f"{len(plan.removed)} removed from {base_dir}"
+    )
+
+    completed = []
+
+    def record_filing(job: FilingJob, chunks, facts) -> None:
+        """Called once a filing's vectors are written."""
+        if job.key in plan.previous:
+            # Figures a re-processed filing no longer yields must not outlive it
+            facts_store.delete_filings([(job.ticker, job.form_type, job.filing_date)])
+        # Headline figures for the calculate_* tools, linked to the table chunks they came from
+        facts_store.upsert_facts(facts)
+        completed.append(manifest_entry(job, config_hash, chunks))
+        if chunks:
+            print(f"✓ Processed {job.label}: {len(chunks)} chunks")
+        else:
+            print(f"⚠ No chunks generated for {job.label}")
+
+    runner = IngestionRunner(
+        pipeline,
+        workers=workers or os.cpu_count() or 1,
+        embed_concurrency=embed_concurrency,
+        upsert_concurrency=upsert_concurrency,
+        on_indexed=record_filing,
+    )
+    stats = await runner.run(plan.to_ingest)
+    print(stats.summary())
+    print(f"Embedding cache: {pipeline.embedding_cache.stats()}")
+    print(f"Embedding requests: {pipeline.embedding_batcher.stats()}")
+    print(f"Upserts: {pipeline.upserter.stats()}")
+    for path in stats.failed:
+        print(f"✗ Failed (will be retried next run): {path}")
+
+    # Positional chunk IDs a filing no longer emits would otherwise stay searchable
+    stale_ids = plan.stale_ids(completed)
+    if stale_ids:
+        pipeline.vector_store.delete(stale_ids)
+        pipeline.document_store.delete(stale_ids)
+        print(f"Deleted {len(stale_ids)} stale chunks")
+    # The calculate_* tools would otherwise keep answering from filings no longer indexed
+    deleted_facts = facts_store.delete_filings(plan.removed_filings())
+    if deleted_facts:
+        print(f"Deleted {deleted_facts} facts of removed filings")
+
+    # The local backend buffers upserts and deletes in memory; write the index once at the end
+    # (a no-op when nothing changed).
+    pipeline.vector_store.flush()
+    # Recorded only once the vectors are durable, so an interrupted run is redone. Unchanged-content
+    # entries are refreshed and removed filings dropped even when nothing else happened, so a
+    # removed filing that had no chunks is not reported again on every run.
+    manifest.record(plan.touched + completed)
+    manifest.remove(entry.path for entry in plan.removed)
+    if not completed and not stale_ids and not deleted_facts:
+        print("Index is up to date.")
+        return
+
+    # BM25 statistics span the whole corpus, so rebuild from every stored chunk
+    bm25_builder = BM25IndexBuilder()
+    bm25_builder.add_chunks(pipeline.document_store.iter_chunks())
+    if len(bm25_builder):
+        bm25_builder.write(BM25_INDEX_DIR)
+    bump_index_generation()
 
 
 if __name__ == "__main__":
@@ -57,5 +126,15 @@ if __name__ == "__main__":
     except nltk.downloader.LookupError:
         nltk.download("stopwords")
 
-    asyncio.run(process_filings())
+    parser = argparse.ArgumentParser(description="Chunk, embed and index the filings under processed_filings/.")
+    parser.add_argument("--base-dir", default="processed_filings")
+    parser.add_argument("--workers", type=int, default=None, help="Chunking processes (default: CPU count)")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Filings embedding at once")
+    parser.add_argument("--upsert-concurrency", type=int, default=2, help="Concurrent vector store writes")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every filing, ignoring the manifest")
+    args = parser.parse_args()
+
+    asyncio.run(process_filings(
+        args.base_dir, args.workers, args.embed_concurrency, args.upsert_concurrency, full=args.full
+    ))
     print("Pipeline complete!")
\ No newline at end of file
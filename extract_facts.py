@@ -0,0 +1,70 @@
+"""
+Backfill the financial facts store from processed_filings/ without re-embedding.
+
+    python extract_facts.py                    # all filings, with source chunk IDs
+    python extract_facts.py --no-chunk-ids     # skip the chunker (no tokenizer needed)
+
+embed_skeleton.py does the same extraction as part of a normal ingest run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from pathlib import Path
+
+from src.preprocessing.financial_facts import extract_filing_facts
+from src.preprocessing.metadata_extractor import parse_filename
+from src.utils.facts_store import FactsStore
+from src.utils.index_generation import bump_index_generation
+
+logger = logging.getLogger(__name__)
+
+
+def extract_all(base_dir: str, store: FactsStore, with_chunk_ids: bool = True) -> int:
+    if with_chunk_ids:
+        from src.preprocessing.chunker import process_single_filing
+
+    total = 0
+    for company_name in sorted(os.listdir(base_dir)):
+        company_dir = os.path.join(base_dir, company_name)
+        if not os.path.isdir(company_dir):
+            continue
+        for filename in sorted(os.listdir(company_dir)):
+            if not filename.endswith(".txt"):
+                continue
+            try:
+                info = parse_filename(Path(company_dir) / filename)
+            except ValueError:
+                logger.warning(f"Skipping {filename} - invalid filename format")
+                continue
+            with open(info.path, "r", encoding="utf-8") as f:
+                document_text = f.read()
+            chunks = (
+                process_single_filing(document_text, info.ticker, info.form_type, info.filing_date)
+                if with_chunk_ids else None
+            )
+            facts = extract_filing_facts(document_text, info.ticker, info.form_type, info.filing_date, chunks)
+            store.upsert_facts(facts)
+            total += len(facts)
+            logger.info(f"{filename}: {len(facts)} facts")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract income-statement and cash-flow facts into the facts store.")
+    parser.add_argument("--base-dir", default="processed_filings")
+    parser.add_argument("--no-chunk-ids", action="store_true", help="Do not run the chunker to record source chunk IDs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = FactsStore()
+    total = extract_all(args.base_dir, store, with_chunk_ids=not args.no_chunk_ids)
+    # Cached calculate_* responses may have come from the search fallback; drop them
+    bump_index_generation()
+    logger.info(f"Extracted {total} facts; store now holds {store.count()} rows at {store.path}")
+
+
+if __name__ == "__main__":
+    main()
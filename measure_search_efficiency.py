@@ -173,6 +173,7 @@ async def measure_search_efficiency():
     logger.info(f"Average Latency: {avg_latency:.2f} ms")
     logger.info(f"Average Precision: {avg_precision:.4f}")
     logger.info(f"Average Recall: {avg_recall:.4f}")
+    logger.info(f"Query Embedding Cache: {search_server.query_cache.stats()}")
     logger.info("========================================")
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+"""
+Token-aware, rate-limited batching of chunk embedding requests.
+
+A filing's chunks are packed into requests by the token counts the chunker already
+computed, so a large 10-K never exceeds the per-request limits. Requests wait on
+token buckets for the account's tokens-per-minute and requests-per-minute budgets
+(shared by every filing in the run) and up to `max_concurrency` are in flight.
+Transient errors (429, 5xx, timeouts) are retried with exponential backoff and full
+jitter. A request rejected as invalid (400) is split to isolate the input at fault.
+Inputs that still fail are returned as None and appended to a JSONL dead-letter file;
+they are never replaced by zero vectors. Authentication and unknown-model errors
+abort the run, since no input could succeed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from ..utils.paths import CACHE_DIR
+from ..utils.retry import error_status, is_retryable
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+# OpenAI allows 300k tokens and 2048 inputs per embeddings request; smaller batches
+# spread a filing over concurrent requests and lose less work to a failure
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "100000"))
+EMBEDDING_MAX_BATCH_INPUTS = 2048
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+# Inputs that could not be embedded, with their chunk IDs and errors, for inspection
+EMBEDDING_DEAD_LETTER_PATH = os.getenv("EMBEDDING_DEAD_LETTER_PATH", str(CACHE_DIR / "embedding_dead_letter.jsonl"))
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+# Bad API key, no access to the model, unknown model: every request would fail the same way
+_FATAL_STATUS = {401, 403, 404}
+
+
+class FatalEmbeddingError(Exception):
+    """The embeddings API rejected the credentials or the model, not a particular input."""
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """The server's Retry-After hint, if the error carries an HTTP response."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def pack_batches(token_counts: List[int], max_tokens: int, max_inputs: int) -> List[List[int]]:
+    """Consecutive input positions grouped so each group stays within both limits."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` per second up to a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> float:
+        """Wait until `amount` can be taken; returns the seconds spent waiting."""
+        # A request larger than the whole budget is let through once the bucket is full
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # Held while sleeping so waiters are served in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return waited
+                delay = (amount - self._available) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class ChunkEmbeddingBatcher:
+    """
+    Embeds texts through `embed(texts) -> embeddings` under request size, rate and
+    concurrency limits. One instance is shared by all filings in an ingest run.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        max_batch_tokens: int = EMBEDDING_MAX_BATCH_TOKENS,
+        max_batch_inputs: int = EMBEDDING_MAX_BATCH_INPUTS,
+        tokens_per_minute: int = EMBEDDING_TPM,
+        requests_per_minute: int = EMBEDDING_RPM,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        dead_letter_path: Optional[str | os.PathLike] = None,
+    ):
+        self._embed = embed
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = Path(dead_letter_path if dead_letter_path is not None else EMBEDDING_DEAD_LETTER_PATH)
+        self._dead_letter_lock = threading.Lock()
+        # asyncio primitives bind to the running loop, so they are created on first use
+        self._limits_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.tokens_sent = 0
+        self.throttled_seconds = 0.0
+
+    def _limits(self):
+        loop = asyncio.get_running_loop()
+        if self._limits_loop is not loop:
+            self._limits_loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._token_bucket = TokenBucket(self.tokens_per_minute)
+            self._request_bucket = TokenBucket(self.requests_per_minute)
+        return self._semaphore, self._token_bucket, self._request_bucket
+
+    async def embed(
+        self, texts: List[str], token_counts: List[int], ids: Optional[List[str]] = None
+    ) -> List[Optional[List[float]]]:
+        """Embeddings in input order; None where an input failed for good (and was dead-lettered)."""
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        ids = ids if ids is not None else [""] * len(texts)
+
+        async def run(batch: List[int]) -> None:
+            embeddings = await self._send(batch, texts, token_counts, ids)
+            for position, embedding in embeddings.items():
+                results[position] = embedding
+
+        batches = pack_batches(token_counts, self.max_batch_tokens, self.max_batch_inputs)
+        try:
+            # A fatal error in one request cancels the others
+            async with asyncio.TaskGroup() as requests:
+                for batch in batches:
+                    requests.create_task(run(batch))
+        except BaseExceptionGroup as group:
+            raise group.exceptions[0]
+        return results
+
+    async def _send(
+        self, batch: List[int], texts: List[str], token_counts: List[int], ids: List[str]
+    ) -> Dict[int, List[float]]:
+        semaphore, token_bucket, request_bucket = self._limits()
+        batch_tokens = sum(token_counts[i] for i in batch)
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                self.throttled_seconds += await request_bucket.acquire(1)
+                self.throttled_seconds += await token_bucket.acquire(batch_tokens)
+                self.requests += 1
+                self.tokens_sent += batch_tokens
+                try:
+                    embeddings = await self._embed([texts[i] for i in batch])
+                    if len(embeddings) != len(batch):
+                        raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}.")
+                    return dict(zip(batch, embeddings))
+                except Exception as e:
+                    error = e
+            status = error_status(error)
+            if status in _FATAL_STATUS:
+                raise FatalEmbeddingError(f"Embedding requests are rejected ({error}); aborting.") from error
+            if not is_retryable(error):
+                if status == 400 and len(batch) > 1:
+                    # Usually one input at fault (e.g. over the per-input token limit): bisect to find it
+                    logger.warning(f"Embedding request for {len(batch)} inputs rejected ({error}); splitting it.")
+                    middle = len(batch) // 2
+                    halves = await asyncio.gather(
+                        self._send(batch[:middle], texts, token_counts, ids),
+                        self._send(batch[middle:], texts, token_counts, ids),
+                    )
+                    return {**halves[0], **halves[1]}
+                break
+            if attempt < self.max_retries:
+                self.retries += 1
+                # Full jitter keeps concurrent retries from arriving together
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, _retry_after(error) or 0.0)
+                logger.warning(f"Embedding request for {len(batch)} inputs failed ({error}); retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+        logger.error(f"Giving up on {len(batch)} inputs after {attempt + 1} attempts: {error}")
+        self._dead_letter(batch, texts, token_counts, ids, error, attempt + 1)
+        return {}
+
+    def _dead_letter(
+        self, batch: List[int], texts: List[str], token_counts: List[int], ids: List[str], error: Exception, attempts: int
+    ) -> None:
+        failed_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._dead_letter_lock:
+            self.dead_lettered += len(batch)
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for i in batch:
+                    f.write(json.dumps({
+                        "id": ids[i],
+                        "tokens": token_counts[i],
+                        "error": f"{type(error).__name__}: {error}",
+                        "attempts": attempts,
+                        "failed_at": failed_at,
+                        "text": texts[i],
+                    }) + "\n")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "tokens_sent": self.tokens_sent,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "dead_lettered": self.dead_lettered,
+        }
@@ -0,0 +1,223 @@
+"""
+Content-addressed on-disk cache for chunk embeddings.
+
+Chunk texts recur across filings (cover-page tables, risk-factor paragraphs repeated in
+every 10-Q) and across re-ingests after chunker tweaks, so embeddings are kept by
+sha256(model, dimensions, text) rather than by chunk_id. Vectors are appended to a raw
+float32 file that is read memory-mapped; a SQLite table maps each hash to its row.
+Everything lives under CACHE_DIR/chunk_embeddings/<model>-<dimensions>/.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..utils.paths import CACHE_DIR
+from ..utils.sqlite_db import connect
+from ..utils.tokenizer import count_tokens as _count_tokens
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = CACHE_DIR / "chunk_embeddings"
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.sqlite"
+
+# SQLite's default limit on host parameters is 999
+_MAX_KEYS_PER_QUERY = 500
+
+
+class ChunkEmbeddingCache:
+    """
+    Append-only embedding store for one (model, dimensions) pair, with per-instance
+    hit/miss and token accounting. Safe to share between threads; a single ingest
+    process is expected to write to a given directory at a time.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int,
+        directory: Optional[str | os.PathLike] = None,
+        count_tokens: Callable[[str], int] = _count_tokens,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.directory = Path(directory) if directory is not None else EMBEDDING_CACHE_DIR / f"{model}-{dimensions}"
+        self.count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._row_bytes = dimensions * np.dtype(np.float32).itemsize
+        self._map: Optional[np.ndarray] = None
+
+        self.hits = 0
+        self.duplicates = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.tokens_embedded = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / VECTORS_FILE
+        self._db = connect(self.directory / INDEX_FILE)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, row INTEGER NOT NULL, tokens INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+        # Rows are indexed only after they are written, so a torn tail from an interrupted
+        # append is unreferenced and can be cut off
+        size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        if size % self._row_bytes:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(size - size % self._row_bytes)
+        self._rows = size // self._row_bytes
+        # An index that outlived its vector file (e.g. one deleted by hand) must not point new rows at old keys
+        dropped = self._db.execute("DELETE FROM embeddings WHERE row >= ?", (self._rows,)).rowcount
+        self._db.commit()
+        if dropped:
+            logger.warning(f"Dropped {dropped} embedding cache entries past the end of {self._vectors_path}.")
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{self.dimensions}\0{text}".encode("utf-8")).digest()
+
+    # ------------------------------------------------------------------ #
+    # Storage
+    # ------------------------------------------------------------------ #
+    def _vectors(self, rows_needed: int) -> np.ndarray:
+        """The vector file memory-mapped; re-mapped once appends have outgrown the current map."""
+        if self._map is None or self._map.shape[0] < rows_needed:
+            self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r").reshape(-1, self.dimensions)
+        return self._map
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, Tuple[List[float], int]]:
+        """{key: (embedding, tokens)} for the keys that are cached."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[bytes, Tuple[int, int]] = {}
+        with self._lock:
+            for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+                batch = keys[start:start + _MAX_KEYS_PER_QUERY]
+                placeholders = ", ".join("?" for _ in batch)
+                found.update(
+                    (key, (row, tokens)) for key, row, tokens in self._db.execute(
+                        f"SELECT key, row, tokens FROM embeddings WHERE key IN ({placeholders})", batch
+                    )
+                )
+            if not found:
+                return {}
+            vectors = self._vectors(max(row for row, _ in found.values()) + 1)
+            return {key: (vectors[row].tolist(), tokens) for key, (row, tokens) in found.items()}
+
+    def _cached_keys(self, keys: List[bytes]) -> Set[bytes]:
+        """The subset of `keys` already in the index; called with the lock held."""
+        cached: Set[bytes] = set()
+        for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+            batch = keys[start:start + _MAX_KEYS_PER_QUERY]
+            placeholders = ", ".join("?" for _ in batch)
+            cached.update(
+                key for (key,) in self._db.execute(f"SELECT key FROM embeddings WHERE key IN ({placeholders})", batch)
+            )
+        return cached
+
+    def put_many(self, entries: List[Tuple[bytes, List[float], int]]) -> None:
+        """Append (key, embedding, tokens) entries; keys that are already cached keep their row."""
+        if not entries:
+            return
+        matrix = np.asarray([embedding for _, embedding, _ in entries], dtype=np.float32)
+        if matrix.shape[1:] != (self.dimensions,):
+            raise ValueError(f"Expected {self.dimensions}-d embeddings, got shape {matrix.shape}.")
+        with self._lock:
+            # Only new keys are appended (the first entry wins within a call), so concurrent
+            # writers of the same text do not leave unreferenced rows in the vector file
+            cached = self._cached_keys(list(dict.fromkeys(key for key, _, _ in entries)))
+            positions = []
+            for i, (key, _, _) in enumerate(entries):
+                if key not in cached:
+                    cached.add(key)
+                    positions.append(i)
+            if not positions:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.write(matrix[positions].tobytes())
+            first = self._rows
+            self._rows += len(positions)
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, row, tokens) VALUES (?, ?, ?)",
+                [(entries[i][0], first + row, entries[i][2]) for row, i in enumerate(positions)],
+            )
+            self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    # Read-through helper
+    # ------------------------------------------------------------------ #
+    async def get_or_embed(
+        self,
+        texts: List[str],
+        embed: Callable[[List[str], List[int]], Awaitable[List[Optional[List[float]]]]],
+        token_counts: Optional[List[int]] = None,
+    ) -> List[Optional[List[float]]]:
+        """
+        Return embeddings for `texts`, calling `embed(texts, token_counts)` once with each
+        distinct uncached text. `embed` may return None for inputs it could not embed;
+        those are not cached and come back as None. `token_counts`, when the caller
+        already has them, saves re-tokenizing the misses. The SQLite and vector file
+        access runs on a worker thread, so the embed and upsert stages sharing the
+        event loop keep running meanwhile.
+        """
+        keys = [self.key(text) for text in texts]
+        cached = await asyncio.to_thread(self.get_many, keys)
+
+        missing: Dict[bytes, Tuple[str, int]] = {}
+        duplicate_positions: List[int] = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                continue
+            if key in missing:
+                duplicate_positions.append(i)
+            else:
+                tokens = token_counts[i] if token_counts is not None else self.count_tokens(texts[i])
+                missing[key] = (texts[i], tokens)
+
+        fresh: Dict[bytes, Tuple[List[float], int]] = {}
+        if missing:
+            embeddings = await embed([text for text, _ in missing.values()], [tokens for _, tokens in missing.values()])
+            entries = [
+                (key, embedding, tokens)
+                for (key, (_, tokens)), embedding in zip(missing.items(), embeddings)
+                if embedding is not None
+            ]
+            await asyncio.to_thread(self.put_many, entries)
+            fresh = {key: (embedding, tokens) for key, embedding, tokens in entries}
+
+        with self._lock:
+            self.hits += len(texts) - len(missing) - len(duplicate_positions)
+            self.duplicates += len(duplicate_positions)
+            self.misses += len(missing)
+            self.tokens_saved += sum(cached[key][1] for key in keys if key in cached)
+            self.tokens_saved += sum(fresh[keys[i]][1] for i in duplicate_positions if keys[i] in fresh)
+            self.tokens_embedded += sum(tokens for _, tokens in fresh.values())
+
+        return [(cached.get(key) or fresh.get(key) or (None,))[0] for key in keys]
+
+    def stats(self) -> Dict[str, float]:
+        """Counters since this instance was created; duplicates are repeats within one call."""
+        with self._lock:
+            lookups = self.hits + self.duplicates + self.misses
+            return {
+                "hits": self.hits,
+                "duplicates": self.duplicates,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.duplicates) / lookups, 4) if lookups else 0.0,
+                "tokens_saved": self.tokens_saved,
+                "tokens_embedded": self.tokens_embedded,
+                "cached_vectors": self._rows,
+            }
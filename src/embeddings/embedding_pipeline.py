@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import asyncio 
+import functools
 import logging 
-from typing import List, Dict
+from typing import Dict, List, Optional
 
-import tiktoken
-
-from ..utils.clients import openai_client, pinecone_client, index
+from ..utils.clients import get_openai_client
+from ..utils.document_store import DocumentStore
+from ..utils.index_generation import bump_index_generation
+from ..vector_store.factory import get_vector_store
+from ..vector_store.upserter import VectorUpserter
+from .embedding_batcher import ChunkEmbeddingBatcher
+from .embedding_cache import ChunkEmbeddingCache
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
@@ -14,58 +19,47 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 
 class EmbeddingPipeline:
-    """Generate embeddings and upload to Pinecone."""
+    """Generate embeddings and upload to the configured vector store (Pinecone or local)."""
 
     def __init__(self):
-        self.openai_client = openai_client
-        self.pinecone_client = pinecone_client
-        self.index = index
-        self.encoding = tiktoken.encoding_for_model("text-embedding-3-small")
+        self.openai_client = get_openai_client()
+        self.vector_store = get_vector_store()
+        # Chunk text lives here; the vector index only gets the filterable fields
+        self.document_store = DocumentStore()
         self.embedding_model = "text-embedding-3-small"
         self.embedding_dimensions = 512
-        self.pinecone_upsert_batch_size = 100 # Recommended Pinecone batch size
-        self.openai_embedding_batch_size = 1000 # OpenAI API can handle larger inputs, adjust as needed
-
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # Batches cut by serialized size (Pinecone caps requests at 2 MB), several in flight, retried
+        self.upserter = VectorUpserter(self.vector_store)
+        # Packs requests by token count under the TPM/RPM budgets, retrying transient failures
+        self.embedding_batcher = ChunkEmbeddingBatcher(self._request_embeddings)
+        # Repeated texts (boilerplate, unchanged chunks on re-ingest) are embedded once, ever
+        self.embedding_cache = ChunkEmbeddingCache(self.embedding_model, self.embedding_dimensions)
+
+    async def generate_embeddings(
+        self, texts: List[str], token_counts: Optional[List[int]] = None, ids: Optional[List[str]] = None
+    ) -> List[Optional[List[float]]]:
         """
-        Generates embeddings for a list of texts, handling OpenAI's internal batching.
-        The OpenAI client typically handles batching intelligently, but we can
-        add an outer loop for very large lists if hitting API limits.
+        Embeddings in input order, or None for texts that could not be embedded (they are
+        written to the batcher's dead-letter file, never replaced by placeholder vectors).
+        Pass the chunker's `token_counts` to skip re-tokenizing; `ids` label dead letters.
         """
         if not texts:
             return []
-        
-        all_embeddings = []
-        # OpenAI's client handles batching
-        
-        # To implement explicit batching:
-        # for i in range(0, len(texts), self.openai_embedding_batch_size):
-        #     batch_texts = texts[i:i + self.openai_embedding_batch_size]
-        #     try:
-        #         response = await self.openai_client.embeddings.create(
-        #             model=self.embedding_model,
-        #             input=batch_texts,
-        #             dimensions=self.embedding_dimensions,
-        #         )
-        #         all_embeddings.extend([item.embedding for item in response.data])
-        #     except Exception as e:
-        #         logger.error(f"Error generating embeddings for batch: {e}")
-        #         all_embeddings.extend([[0.0] * self.embedding_dimensions] * len(batch_texts))
-        
-        try:
-            response = await self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=texts,
-                dimensions=self.embedding_dimensions,
-            )
-            all_embeddings = [item.embedding for item in response.data]
-        except Exception as e:
-            logger.error(f"Error generating embeddings for {len(texts)} texts: {e}")
-            # Return dummy embeddings or raise error based on desired behavior
-            all_embeddings = [[0.0] * self.embedding_dimensions] * len(texts)
-            
-        return all_embeddings
+        id_by_text = dict(zip(texts, ids)) if ids is not None else {}
+
+        async def embed_misses(missing: List[str], missing_tokens: List[int]) -> List[Optional[List[float]]]:
+            return await self.embedding_batcher.embed(missing, missing_tokens, [id_by_text.get(t, "") for t in missing])
 
+        # Only distinct texts missing from the embedding cache reach OpenAI
+        return await self.embedding_cache.get_or_embed(texts, embed_misses, token_counts)
+
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        response = await self.openai_client.embeddings.create(
+            model=self.embedding_model,
+            input=texts,
+            dimensions=self.embedding_dimensions,
+        )
+        return [item.embedding for item in response.data]
 
     async def upload_chunks_to_pinecone(self, chunks: List[Dict]):
         """
@@ -77,18 +71,34 @@ class EmbeddingPipeline:
 
         logger.info(f"Preparing {len(chunks)} chunks for embedding and upload...")
 
-        # Extract texts for embedding in one go (OpenAI client will handle its own batching)
-        texts_to_embed = [chunk["text"] for chunk in chunks]
-        embeddings = await self.generate_embeddings(texts_to_embed)
+        # Store text first so every vector the index can return has a document behind it
+        self.document_store.put_chunks(chunks)
+
+        embeddings = await self.generate_embeddings(
+            [chunk["text"] for chunk in chunks],
+            [chunk["token_count"] for chunk in chunks],
+            [chunk["chunk_id"] for chunk in chunks],
+        )
 
         if not embeddings:
             logger.warning("No embeddings generated, skipping Pinecone upload.")
             return
 
+        # The vector store client blocks; keep the event loop free while batches are in flight
+        total_uploaded = await asyncio.to_thread(self.upsert_vectors, self.build_vectors(chunks, embeddings))
+        if total_uploaded:
+            # Tell running MCP servers that cached tool responses may now be stale
+            bump_index_generation()
+
+    def build_vectors(self, chunks: List[Dict], embeddings: List[Optional[List[float]]]) -> List[Dict]:
+        """Pair chunks with their embeddings in the upsert shape, keeping only the filterable metadata."""
         # Prepare vectors for Pinecone upsert, ensuring embedding dimensions match
         vectors_for_upsert = []
         for i, chunk in enumerate(chunks):
             embedding = embeddings[i]
+            if embedding is None:
+                # Dead-lettered by the batcher; upserting a placeholder would make it searchable
+                continue
             # Ensure embedding is of the correct dimension, or handle cases where it might be dummy
             if len(embedding) != self.embedding_dimensions:
                 logger.warning(f"Embedding dimension mismatch for chunk {chunk.get('chunk_id', 'N/A')}. Expected {self.embedding_dimensions}, got {len(embedding)}. Skipping.")
@@ -101,31 +111,40 @@ class EmbeddingPipeline:
                 "fiscal_year": chunk["fiscal_year"],
                 "fiscal_quarter": chunk["fiscal_quarter"],
                 "item_id": chunk["item_id"],
+                "item_number": chunk["item_number"],
+                "part": chunk["part"],
+                "item_name": chunk["item_name"],
                 "chunk_type": chunk["chunk_type"],
                 "token_count": chunk["token_count"],
-                "text": chunk["text"], # Storing text in metadata is not best practice ideally we would have dedicated document store for this i.e. AWS S3
             }
+            # Pinecone rejects null metadata values; revenue is only known for some filings
+            if chunk.get("revenue") is not None:
+                metadata["revenue"] = chunk["revenue"]
             vectors_for_upsert.append({
                 "id": chunk["chunk_id"],
                 "values": embedding,
                 "metadata": metadata
             })
+        return vectors_for_upsert
+
+    def upsert_vectors(self, vectors_for_upsert: List[Dict]) -> int:
+        """Upsert in size-bounded concurrent batches (blocking); returns the number of vectors written."""
+        total_uploaded = self.upserter.upsert(vectors_for_upsert)
+        if total_uploaded < len(vectors_for_upsert):
+            logger.error(f"Only {total_uploaded}/{len(vectors_for_upsert)} vectors were written to the vector store.")
+        else:
+            logger.info(f"Uploaded {total_uploaded} vectors to the vector store.")
+        return total_uploaded
+
+
+@functools.lru_cache(maxsize=None)
+def get_pipeline() -> EmbeddingPipeline:
+    """Shared pipeline, built on first use: importing this module opens no clients or stores."""
+    return EmbeddingPipeline()
+
 
-        # Perform batch upserts to Pinecone
-        total_uploaded = 0
-        for i in range(0, len(vectors_for_upsert), self.pinecone_upsert_batch_size):
-            batch_vectors = vectors_for_upsert[i : i + self.pinecone_upsert_batch_size]
-            try:
-                self.index.upsert(vectors=batch_vectors)
-                total_uploaded += len(batch_vectors)
-                logger.info(f"Uploaded batch of {len(batch_vectors)} vectors. Total: {total_uploaded}/{len(vectors_for_upsert)}")
-            except Exception as e:
-                logger.error(f"Error uploading batch to Pinecone (batch {i//self.pinecone_upsert_batch_size + 1}): {e}")
-                # Decide on error handling: continue, retry, or break
-                # For now, we log and continue to process remaining batches
-        
-        logger.info(f"Finished uploading chunks. Total {total_uploaded} vectors successfully uploaded to Pinecone.")
-
-
-# Global singleton instance
-pipeline = EmbeddingPipeline()
\ No newline at end of file
+def __getattr__(name: str):
+    """`from src.embeddings.embedding_pipeline import pipeline` still yields the shared instance."""
+    if name == "pipeline":
+        return get_pipeline()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,369 @@
+"""
+Pipelined ingestion of processed filings.
+
+Three stages run at the same time, connected by bounded queues, so a stage that
+falls behind blocks the one feeding it instead of the corpus piling up in memory:
+
+    chunk   a process pool reads each filing, chunks it and extracts its facts
+            (the CPU-bound tiktoken and NLTK work)
+    embed   up to `embed_concurrency` filings waiting on OpenAI at once
+    upsert  up to `upsert_concurrency` vector store writes running in worker threads
+
+A run therefore takes roughly as long as its slowest stage, not the sum of all three.
+
+plan_incremental compares the discovered filings with the ingest manifest
+(src/utils/ingest_manifest.py) so that only new or changed filings enter the pipeline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from ..preprocessing.metadata_extractor import parse_filename
+from ..utils.ingest_manifest import ManifestEntry
+from .embedding_batcher import FatalEmbeddingError
+
+if TYPE_CHECKING:
+    from .embedding_pipeline import EmbeddingPipeline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FilingJob:
+    path: Path
+    ticker: str
+    form_type: str
+    filing_date: str
+    # Filled in by plan_incremental for the manifest
+    content_hash: str = ""
+    size: int = 0
+    mtime_ns: int = 0
+
+    @property
+    def key(self) -> str:
+        """Manifest key, relative to the filings directory so the tree can move."""
+        return f"{self.path.parent.name}/{self.path.name}"
+
+    @property
+    def label(self) -> str:
+        return f"{self.ticker} {self.form_type} ({self.filing_date})"
+
+
+ChunkResult = Tuple[FilingJob, List[Dict[str, Any]], List[Any]]
+
+
+def discover_filings(base_dir: str | os.PathLike) -> List[FilingJob]:
+    """Every `<ticker>/<filename>.txt` under base_dir whose name parses as a filing."""
+    jobs = []
+    for company_dir in sorted(Path(base_dir).iterdir()):
+        if not company_dir.is_dir():
+            continue
+        for path in sorted(company_dir.glob("*.txt")):
+            try:
+                info = parse_filename(path)
+            except ValueError:
+                logger.warning(f"Skipping {path.name} - invalid filename format")
+                continue
+            jobs.append(FilingJob(path, info.ticker, info.form_type, info.filing_date))
+    return jobs
+
+
+# Bump when the pipeline changes what it stores for a chunk (vector metadata, document
+# store rows) or how filings map to IDs; the chunker and facts extractor have their own
+INGEST_VERSION = 1
+
+
+def ingest_config_hash(embedding_model: str, embedding_dimensions: int) -> str:
+    """
+    Changes whenever re-ingesting an unchanged filing could produce different chunks or
+    vectors: the embedding model, the chunker parameters and the explicit version numbers.
+    Edits that leave the output alone (logging, comments, refactors) keep the hash.
+    """
+    from ..preprocessing import chunker
+    from ..preprocessing.financial_facts import FACTS_VERSION
+    from ..utils.tokenizer import EMBEDDING_MODEL as TOKENIZER_MODEL
+
+    config = {
+        "embedding": [embedding_model, embedding_dimensions],
+        "tokenizer": TOKENIZER_MODEL,
+        "chunker": [
+            chunker.CHUNKER_VERSION, chunker.MIN_CHUNK_TOKENS, chunker.TARGET_CHUNK_TOKENS, chunker.OVERLAP_TOKENS
+        ],
+        "facts": FACTS_VERSION,
+        "ingest": INGEST_VERSION,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@dataclass
+class IncrementalPlan:
+    to_ingest: List[FilingJob]
+    unchanged: List[ManifestEntry]
+    # Unchanged content with a new mtime: re-recorded so the next run need not hash it again
+    touched: List[ManifestEntry]
+    removed: List[ManifestEntry]
+    previous: Dict[str, ManifestEntry]
+
+    def stale_ids(self, completed: List[ManifestEntry]) -> List[str]:
+        """IDs that re-processed or removed filings no longer emit, and nothing else still does."""
+        candidates = set()
+        for entry in completed:
+            previous = self.previous.get(entry.path)
+            if previous is not None:
+                candidates.update(previous.chunk_ids)
+        for entry in self.removed:
+            candidates.update(entry.chunk_ids)
+        live = {chunk_id for entry in completed + self.unchanged for chunk_id in entry.chunk_ids}
+        return sorted(candidates - live)
+
+    def removed_filings(self) -> List[Tuple[str, str, str]]:
+        """(ticker, form_type, filing_date) of the filings no longer under the filings directory."""
+        filings = []
+        for entry in self.removed:
+            info = parse_filename(Path(entry.path))
+            filings.append((info.ticker, info.form_type, info.filing_date))
+        return filings
+
+
+def plan_incremental(
+    jobs: List[FilingJob], previous: Dict[str, ManifestEntry], config_hash: str, force: bool = False
+) -> IncrementalPlan:
+    """
+    Split discovered filings into those to (re-)ingest and those whose content and ingest
+    configuration match the manifest. Size and mtime are compared first, so unchanged
+    files are not even read.
+    """
+    to_ingest, unchanged, touched = [], [], []
+    for job in jobs:
+        stat = job.path.stat()
+        entry = previous.get(job.key)
+        if not force and entry is not None and entry.config_hash == config_hash:
+            if (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                unchanged.append(entry)
+                continue
+            content_hash = file_hash(job.path)
+            if content_hash == entry.content_hash:
+                unchanged.append(entry)
+                touched.append(replace(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+                continue
+        else:
+            content_hash = file_hash(job.path)
+        to_ingest.append(replace(job, content_hash=content_hash, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+
+    discovered = {job.key for job in jobs}
+    removed = [entry for path, entry in previous.items() if path not in discovered]
+    return IncrementalPlan(to_ingest, unchanged, touched, removed, previous)
+
+
+def manifest_entry(job: FilingJob, config_hash: str, chunks: List[Dict[str, Any]]) -> ManifestEntry:
+    return ManifestEntry(
+        job.key, job.size, job.mtime_ns, job.content_hash, config_hash, [chunk["chunk_id"] for chunk in chunks]
+    )
+
+
+def chunk_filing(job: FilingJob) -> ChunkResult:
+    """Read, chunk and extract facts from one filing; runs in a worker process."""
+    from ..preprocessing.chunker import process_single_filing
+    from ..preprocessing.financial_facts import extract_filing_facts
+
+    document_text = job.path.read_text(encoding="utf-8")
+    chunks = process_single_filing(document_text, job.ticker, job.form_type, job.filing_date)
+    facts = extract_filing_facts(document_text, job.ticker, job.form_type, job.filing_date, chunks)
+    return job, chunks, facts
+
+
+@dataclass
+class IngestionStats:
+    filings: int = 0
+    chunks: int = 0
+    vectors: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    # Time spent per stage, summed over concurrent filings (chunk includes waiting for a free
+    # worker process); compared with `seconds` it shows which stage is the bottleneck
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: {"chunk": 0.0, "embed": 0.0, "upsert": 0.0})
+
+    def summary(self) -> str:
+        seconds = max(self.seconds, 1e-9)
+        busy = ", ".join(f"{stage} {busy:.1f}s" for stage, busy in self.stage_seconds.items())
+        return (
+            f"Ingested {self.filings} filings ({self.chunks} chunks, {self.vectors} vectors) in {self.seconds:.1f}s: "
+            f"{self.filings / seconds:.2f} filings/s, {self.chunks / seconds:.1f} chunks/s; "
+            f"stage busy time {busy}; {len(self.failed)} failed"
+        )
+
+
+class IngestionRunner:
+    """
+    Runs FilingJobs through the chunk -> embed -> upsert stages. `on_indexed(job, chunks,
+    facts)` is called on the event loop once a filing's vectors are written (or straight
+    after chunking for a filing that produced no chunks).
+
+    A failure confined to one filing is logged and the filing reported as failed. Anything
+    else (`on_indexed` raising, a dead process pool, a FatalEmbeddingError) cancels all
+    stages and is re-raised.
+    """
+
+    def __init__(
+        self,
+        pipeline: "EmbeddingPipeline",
+        workers: int = 4,
+        embed_concurrency: int = 4,
+        upsert_concurrency: int = 2,
+        queue_size: Optional[int] = None,
+        on_indexed: Optional[Callable[[FilingJob, List[Dict[str, Any]], List[Any]], None]] = None,
+        chunk_fn: Callable[[FilingJob], ChunkResult] = chunk_filing,
+    ):
+        self.pipeline = pipeline
+        self.workers = max(workers, 1)
+        self.embed_concurrency = max(embed_concurrency, 1)
+        self.upsert_concurrency = max(upsert_concurrency, 1)
+        # Enough buffered filings to keep the next stage busy, few enough to bound memory
+        self.queue_size = queue_size or 2 * max(self.embed_concurrency, self.upsert_concurrency)
+        self.on_indexed = on_indexed
+        self.chunk_fn = chunk_fn
+        self.stats = IngestionStats()
+
+    async def run(self, jobs: List[FilingJob]) -> IngestionStats:
+        self.stats = IngestionStats()
+        started = time.perf_counter()
+        chunked: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        embedded: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                # The first stage task to fail cancels the others, so none is left blocked on a queue
+                async with asyncio.TaskGroup() as stages:
+                    embedders = [stages.create_task(self._embed_worker(chunked, embedded)) for _ in range(self.embed_concurrency)]
+                    upserters = [stages.create_task(self._upsert_worker(embedded)) for _ in range(self.upsert_concurrency)]
+                    stages.create_task(self._feed(pool, jobs, chunked, embedded, embedders, upserters))
+            except BaseExceptionGroup as group:
+                raise group.exceptions[0]
+
+        self.stats.seconds = time.perf_counter() - started
+        return self.stats
+
+    async def _feed(
+        self,
+        pool: ProcessPoolExecutor,
+        jobs: List[FilingJob],
+        chunked: asyncio.Queue,
+        embedded: asyncio.Queue,
+        embedders: List[asyncio.Task],
+        upserters: List[asyncio.Task],
+    ) -> None:
+        """Chunk every job, then shut the embed and upsert stages down in order."""
+        await self._chunk_stage(pool, jobs, chunked)
+        for _ in embedders:
+            await chunked.put(None)
+        # wait() rather than gather(): a worker's error is reported by the task group, not here too
+        await asyncio.wait(embedders)
+        for _ in upserters:
+            await embedded.put(None)
+
+    async def _chunk_stage(self, pool: ProcessPoolExecutor, jobs: List[FilingJob], chunked: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        in_flight: Dict[asyncio.Future, Tuple[FilingJob, float]] = {}
+
+        async def hand_off(done) -> None:
+            for future in done:
+                job, submitted = in_flight.pop(future)
+                self.stats.stage_seconds["chunk"] += time.perf_counter() - submitted
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"Chunking {job.label} failed: {e}")
+                    self.stats.failed.append(str(job.path))
+                    continue
+                # Blocks while the embed stage is behind, which stops new submissions below
+                await chunked.put(result)
+
+        try:
+            for job in jobs:
+                # Keep every worker busy with one filing queued behind it, but no more
+                while len(in_flight) >= 2 * self.workers:
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    await hand_off(done)
+                in_flight[loop.run_in_executor(pool, self.chunk_fn, job)] = (job, time.perf_counter())
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                await hand_off(done)
+        finally:
+            # When the run is cancelled, filings not yet started are dropped from the pool
+            for future in in_flight:
+                future.cancel()
+
+    async def _embed_worker(self, chunked: asyncio.Queue, embedded: asyncio.Queue) -> None:
+        while (item := await chunked.get()) is not None:
+            job, chunks, facts = item
+            if not chunks:
+                self._indexed(job, chunks, facts)
+                continue
+            started = time.perf_counter()
+            try:
+                # Store text first so every vector the index can return has a document behind it
+                await asyncio.to_thread(self.pipeline.document_store.put_chunks, chunks)
+                embeddings = await self.pipeline.generate_embeddings(
+                    [chunk["text"] for chunk in chunks],
+                    [chunk["token_count"] for chunk in chunks],
+                    [chunk["chunk_id"] for chunk in chunks],
+                )
+                vectors = self.pipeline.build_vectors(chunks, embeddings)
+            except FatalEmbeddingError:
+                raise
+            except Exception as e:
+                logger.error(f"Embedding {job.label} failed: {e}")
+                self.stats.failed.append(str(job.path))
+                continue
+            finally:
+                self.stats.stage_seconds["embed"] += time.perf_counter() - started
+            # Vectors that were embedded are still written, but a filing with dead-lettered
+            # chunks is reported as failed so the next incremental run retries it
+            complete = len(vectors) == len(chunks)
+            await embedded.put((job, chunks, facts, vectors, complete))
+
+    async def _upsert_worker(self, embedded: asyncio.Queue) -> None:
+        while (item := await embedded.get()) is not None:
+            job, chunks, facts, vectors, complete = item
+            started = time.perf_counter()
+            try:
+                written = await asyncio.to_thread(self.pipeline.upsert_vectors, vectors)
+            except Exception as e:
+                logger.error(f"Upserting {job.label} failed: {e}")
+                self.stats.failed.append(str(job.path))
+                continue
+            finally:
+                self.stats.stage_seconds["upsert"] += time.perf_counter() - started
+            self.stats.vectors += written
+            if written < len(vectors):
+                logger.error(f"Upserting {job.label} failed for {len(vectors) - written} of {len(vectors)} vectors")
+                self.stats.failed.append(str(job.path))
+                continue
+            if not complete:
+                logger.error(f"Embedding {job.label} failed for {len(chunks) - len(vectors)} of {len(chunks)} chunks")
+                self.stats.failed.append(str(job.path))
+                continue
+            self._indexed(job, chunks, facts)
+
+    def _indexed(self, job: FilingJob, chunks: List[Dict[str, Any]], facts: List[Any]) -> None:
+        self.stats.filings += 1
+        self.stats.chunks += len(chunks)
+        if self.on_indexed is not None:
+            self.on_indexed(job, chunks, facts)
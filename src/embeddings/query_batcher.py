@@ -0,0 +1,130 @@
+"""
+Micro-batching of query embedding requests.
+
+Concurrent searches each miss the query cache with one or two texts; sent separately,
+they spend the OpenAI request-per-minute budget long before the token budget. The
+batcher holds requests for a short window (or until enough texts are waiting), sends
+them as one embeddings call and hands each caller its own vectors back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], Awaitable[Tuple[List[List[float]], int]]]
+
+# OpenAI's embeddings endpoint rejects requests with more inputs than this
+MAX_REQUEST_INPUTS = 2048
+
+
+class QueryEmbeddingBatcher:
+    """
+    Wraps an `embed(texts) -> (embeddings, total_tokens)` function with the same signature.
+    Calls arriving within `max_wait_seconds` of the first waiting one share a single
+    upstream request; a batch is sent early once `max_batch_size` texts are waiting.
+    A batch of more than `max_request_inputs` texts is split into concurrent requests.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        max_wait_seconds: float = 0.005,
+        max_batch_size: int = 64,
+        max_request_inputs: int = MAX_REQUEST_INPUTS,
+    ):
+        self._embed = embed
+        self.max_wait_seconds = max_wait_seconds
+        self.max_batch_size = max_batch_size
+        self.max_request_inputs = max_request_inputs
+        self._pending: List[Tuple[List[str], asyncio.Future, float]] = []
+        self._pending_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._send_tasks: set = set()
+
+        self.batches = 0
+        self.queries = 0
+        self.batch_sizes: Counter = Counter()
+        self.queue_delay = LatencyHistogram()
+
+    async def embed(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        if self.max_wait_seconds <= 0 or len(texts) >= self.max_batch_size:
+            # Already a full batch (e.g. semantic_search_many): nothing to gain by waiting
+            self._record_batch(len(texts), [0.0])
+            return await self._embed_in_requests(texts)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future, time.perf_counter()))
+        self._pending_texts += len(texts)
+        if self._pending_texts >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    async def _embed_in_requests(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """self._embed over slices of at most max_request_inputs texts, sent concurrently."""
+        if len(texts) <= self.max_request_inputs:
+            return await self._embed(texts)
+        parts = await asyncio.gather(*(
+            self._embed(texts[start:start + self.max_request_inputs])
+            for start in range(0, len(texts), self.max_request_inputs)
+        ))
+        return [embedding for embeddings, _ in parts for embedding in embeddings], sum(tokens for _, tokens in parts)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    def _record_batch(self, size: int, delays: List[float]) -> None:
+        self.batches += 1
+        self.queries += size
+        self.batch_sizes[size] += 1
+        for delay in delays:
+            self.queue_delay.record(delay)
+
+    async def _send(self, batch: List[Tuple[List[str], asyncio.Future, float]]) -> None:
+        # Callers racing on the same text share one input
+        texts = list(dict.fromkeys(text for caller_texts, _, _ in batch for text in caller_texts))
+        now = time.perf_counter()
+        self._record_batch(len(texts), [now - enqueued for _, _, enqueued in batch])
+        try:
+            embeddings, total_tokens = await self._embed_in_requests(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text: Dict[str, List[float]] = dict(zip(texts, embeddings))
+        for caller_texts, future, _ in batch:
+            if future.done():  # Caller was cancelled while waiting
+                continue
+            # Usage is only reported per request, so attribute it by share of the inputs
+            tokens = total_tokens * len(caller_texts) // len(texts) if texts else 0
+            future.set_result(([by_text[text] for text in caller_texts], tokens))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "queue_delay": self.queue_delay.summary(),
+            "window_ms": self.max_wait_seconds * 1000,
+            "max_batch_size": self.max_batch_size,
+        }
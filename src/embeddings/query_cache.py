@@ -0,0 +1,190 @@
+"""
+Two-tier cache for query embeddings.
+
+Tier 1 is a bounded in-memory LRU; tier 2 is a SQLite file under CACHE_DIR so that
+embeddings survive the per-session restarts of the stdio MCP server. Entries are keyed
+by (model, dimensions, normalised query text). The async read-through path only touches
+the memory tier on the event loop; disk reads and writes run on a worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.paths import CACHE_DIR
+from ..utils.sqlite_db import connect
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, int, str]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapse whitespace and apply NFKC so trivially different spellings share an entry.
+    Case is preserved: the embedding model is case-sensitive, so lowercasing would
+    return a vector for a different input than the one asked for.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU in front of a persistent SQLite store, with hit/miss accounting."""
+
+    def __init__(self, path: Optional[Path] = None, max_memory_entries: int = 1024):
+        self.path = Path(path) if path is not None else CACHE_DIR / "query_embeddings.sqlite"
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[CacheKey, Tuple[List[float], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._miss_seconds = 0.0
+
+        self._db = connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " model TEXT NOT NULL, dimensions INTEGER NOT NULL, query TEXT NOT NULL,"
+            " vector BLOB NOT NULL, tokens INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (model, dimensions, query))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, query: str) -> CacheKey:
+        return (model, dimensions, normalize_query(query))
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+    def _remember(self, key: CacheKey, embedding: List[float], tokens: int) -> None:
+        self._memory[key] = (embedding, tokens)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_memory(self, key: CacheKey) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.tokens_saved += entry[1]
+            return entry[0]
+
+    def _get_disk(self, keys: List[CacheKey]) -> Dict[CacheKey, List[float]]:
+        """Disk lookups for keys the memory tier missed; hits are promoted to memory."""
+        found: Dict[CacheKey, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                row = self._db.execute(
+                    "SELECT vector, tokens FROM query_embeddings WHERE model = ? AND dimensions = ? AND query = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    continue
+                embedding = np.frombuffer(row[0], dtype=np.float32).tolist()
+                self._remember(key, embedding, row[1])
+                self.disk_hits += 1
+                self.tokens_saved += row[1]
+                found[key] = embedding
+        return found
+
+    def get(self, model: str, dimensions: int, query: str) -> Optional[List[float]]:
+        """Return a cached embedding (memory first, then disk) or None."""
+        key = self.make_key(model, dimensions, query)
+        embedding = self._get_memory(key)
+        if embedding is None:
+            embedding = self._get_disk([key]).get(key)
+        return embedding
+
+    def put_many(self, model: str, dimensions: int, entries: List[Tuple[str, List[float], int]]) -> None:
+        """Store (query, embedding, tokens) entries in both tiers with a single commit."""
+        rows = []
+        with self._lock:
+            for query, embedding, tokens in entries:
+                key = self.make_key(model, dimensions, query)
+                self._remember(key, list(embedding), tokens)
+                rows.append((*key, np.asarray(embedding, dtype=np.float32).tobytes(), tokens))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (model, dimensions, query, vector, tokens) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    def put(self, model: str, dimensions: int, query: str, embedding: List[float], tokens: int = 0) -> None:
+        self.put_many(model, dimensions, [(query, embedding, tokens)])
+
+    # ------------------------------------------------------------------ #
+    # Read-through helpers
+    # ------------------------------------------------------------------ #
+    async def get_or_embed(
+        self,
+        model: str,
+        dimensions: int,
+        queries: List[str],
+        embed: Callable[[List[str]], Awaitable[Tuple[List[List[float]], int]]],
+    ) -> List[List[float]]:
+        """
+        Return embeddings for `queries`, calling `embed` once for all the misses.
+        `embed` receives the missing texts and returns (embeddings, total_tokens).
+        """
+        keys = [self.make_key(model, dimensions, q) for q in queries]
+        results: List[Optional[List[float]]] = [self._get_memory(key) for key in keys]
+        memory_misses = list(dict.fromkeys(key for key, embedding in zip(keys, results) if embedding is None))
+        if memory_misses:
+            on_disk = await asyncio.to_thread(self._get_disk, memory_misses)
+            results = [embedding if embedding is not None else on_disk.get(key) for key, embedding in zip(keys, results)]
+
+        missing: Dict[str, List[int]] = {}
+        for i, embedding in enumerate(results):
+            if embedding is None:
+                missing.setdefault(keys[i][2], []).append(i)
+
+        if missing:
+            texts = list(missing)
+            started = time.perf_counter()
+            embeddings, total_tokens = await embed(texts)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.misses += len(texts)
+                self._miss_seconds += elapsed
+            # The API only reports usage per request, so spread it over the inputs.
+            tokens_each = total_tokens // len(texts) if texts else 0
+            for text, embedding in zip(texts, embeddings):
+                for i in missing[text]:
+                    results[i] = embedding
+            await asyncio.to_thread(
+                self.put_many, model, dimensions, [(text, embedding, tokens_each) for text, embedding in zip(texts, embeddings)]
+            )
+
+        return results  # type: ignore[return-value]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus the upstream latency and tokens the hits avoided."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            avg_miss_ms = (self._miss_seconds / self.misses * 1000) if self.misses else 0.0
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "avg_miss_latency_ms": round(avg_miss_ms, 2),
+                "estimated_latency_saved_ms": round(hits * avg_miss_ms, 2),
+                "tokens_saved": self.tokens_saved,
+            }
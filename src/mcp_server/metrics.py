@@ -0,0 +1,104 @@
+"""
+Lightweight in-process metrics for the MCP server.
+
+Timings are recorded per (tool, stage) into fixed-bucket LatencyHistograms (defined in
+src/utils/metrics.py), so memory stays bounded no matter how long the server runs. The
+current tool is tracked in a context variable, so stages timed deep inside
+SECSearchServer are attributed to the tool call that triggered them.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.metrics import LatencyHistogram  # Re-exported for existing importers
+
+# Tool whose call is currently being served; "-" for work outside any tool (e.g. cache warm-up)
+current_tool: ContextVar[str] = ContextVar("current_tool", default="-")
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "ServerMetrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class ServerMetrics:
+    """Per-tool call counts, in-flight gauges, cache hit counts and per-stage latency histograms."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.cache_hits: Dict[str, int] = defaultdict(int)
+        self.cache_misses: Dict[str, int] = defaultdict(int)
+
+    def stage(self, stage: str) -> _StageTimer:
+        """`with metrics.stage("embed"): ...` times a block under the current tool."""
+        return _StageTimer(self, stage)
+
+    def record(self, stage: str, seconds: float, tool: Optional[str] = None) -> None:
+        self._histograms[(tool or current_tool.get(), stage)].record(seconds)
+
+    def call_started(self, tool: str) -> None:
+        self.calls[tool] += 1
+        self.in_flight[tool] += 1
+
+    def call_finished(self, tool: str, seconds: float, error: bool = False) -> None:
+        self.in_flight[tool] -= 1
+        if error:
+            self.errors[tool] += 1
+        self.record("total", seconds, tool)
+
+    def cache_lookup(self, tool: str, hit: bool) -> None:
+        if hit:
+            self.cache_hits[tool] += 1
+        else:
+            self.cache_misses[tool] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        tools: Dict[str, Dict[str, Any]] = {}
+        for (tool, stage), histogram in sorted(self._histograms.items()):
+            tools.setdefault(tool, {"stages": {}})["stages"][stage] = histogram.summary()
+        for tool in set(self.calls) | set(tools):
+            entry = tools.setdefault(tool, {"stages": {}})
+            hits, misses = self.cache_hits.get(tool, 0), self.cache_misses.get(tool, 0)
+            entry.update({
+                "calls": self.calls.get(tool, 0),
+                "errors": self.errors.get(tool, 0),
+                "in_flight": self.in_flight.get(tool, 0),
+                "response_cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            })
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "in_flight": sum(self.in_flight.values()),
+            "tools": tools,
+        }
+
+    def log_line(self) -> str:
+        """One compact line: calls, in-flight and p50/p95 of each tool's total latency."""
+        parts = [f"in_flight={sum(self.in_flight.values())}"]
+        for tool in sorted(self.calls):
+            total = self._histograms.get((tool, "total"))
+            if total is None or not total.count:
+                continue
+            parts.append(
+                f"{tool}: n={self.calls[tool]} p50={total.percentile(50) * 1e3:.1f}ms "
+                f"p95={total.percentile(95) * 1e3:.1f}ms"
+            )
+        return " | ".join(parts)
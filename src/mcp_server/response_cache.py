@@ -0,0 +1,101 @@
+"""TTL + LRU cache for MCP tool responses, invalidated when the index generation changes."""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Maps (tool name, canonical arguments) to a previously returned response.
+
+    Entries expire after `ttl_seconds`, the least recently used entry is evicted once
+    `max_entries` is reached, and everything is dropped as soon as `generation()`
+    returns a value different from the one the entries were cached under. A response
+    computed while the generation changed is not stored (see put).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 900.0,
+        generation: Optional[Callable[[], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._generation = generation or (lambda: 0)
+        self._seen_generation = self._generation()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @staticmethod
+    def make_key(name: str, arguments: Dict[str, Any]) -> str:
+        """Canonical key: sorted keys, no whitespace, absent and null arguments treated alike."""
+        canonical = {k: v for k, v in (arguments or {}).items() if v is not None}
+        return json.dumps([name, canonical], sort_keys=True, separators=(",", ":"), default=str)
+
+    def _check_generation(self) -> None:
+        generation = self._generation()
+        if generation != self._seen_generation:
+            self._entries.clear()
+            self._seen_generation = generation
+            self.invalidations += 1
+
+    def generation(self) -> int:
+        """The current index generation; read it before computing a response to put."""
+        self._check_generation()
+        return self._seen_generation
+
+    def get(self, key: str) -> Optional[Any]:
+        self._check_generation()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store a response. Pass the generation() read when the call started: if an ingest
+        finished in the meantime the response may mix old and new results, so it is dropped.
+        """
+        self._check_generation()
+        if generation is not None and generation != self._seen_generation:
+            self.stale_puts += 1
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+            "generation": self._seen_generation,
+        }
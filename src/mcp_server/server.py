@@ -1,20 +1,107 @@
 import asyncio
+import functools
 import json
 import logging
+import math
+import os
 import re
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-from src.utils.clients import openai_client, index
+from src.embeddings.query_batcher import QueryEmbeddingBatcher
+from src.embeddings.query_cache import QueryEmbeddingCache
+from src.mcp_server.metrics import ServerMetrics, current_tool
+from src.mcp_server.response_cache import ResponseCache
+from src.preprocessing.financial_facts import (
+    EPS_DILUTED,
+    FREE_CASH_FLOW,
+    NET_INCOME,
+    REVENUE,
+)
+from src.preprocessing.sections import item_filter_conditions
+from src.retrieval.bm25_index import BM25_INDEX_DIR, BM25Index
+from src.retrieval.diversify import DIVERSIFY_MODES, MAX_MERGED_CHUNKS, group_adjacent, merge_texts, mmr_order
+from src.retrieval.fusion import reciprocal_rank_fusion
+from src.utils.clients import get_openai_client
+from src.utils.document_store import DocumentStore
+from src.utils.facts_store import FactsStore
 from src.utils.financial_parsing import extract_value # Import from the new utility
+from src.utils.index_generation import GenerationWatcher
+from src.vector_store.base import VectorStore
+from src.vector_store.factory import get_vector_store
 from pydantic import BaseModel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Must match the model and dimensions the index was built with
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 512
+
+# Fixed query strings the tools below send on every call; embedded once at startup
+CANNED_QUERIES = [
+    "business overview operations products services",
+    "risk factors risks uncertainties challenges",
+    "Net Income",
+    "Revenue sales",
+    "Free Cash Flow",
+    "Earnings Per Share EPS diluted",
+]
+
+# Vector store queries are blocking calls; they run on this many worker threads so a
+# slow query never stalls the event loop (and the other MCP requests it is serving).
+VECTOR_QUERY_WORKERS = int(os.getenv("VECTOR_QUERY_WORKERS", "8"))
+
+# Query-embedding cache misses from concurrent searches are sent to OpenAI together:
+# a batch goes out this long after its first request, or as soon as this many texts wait.
+# A window of 0 sends every request on its own.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "64"))
+
+# Item filters that cannot be pushed into the index are post-filtered; the over-fetch
+# needed for that is learned per filter text instead of a fixed multiplier.
+MAX_FETCH_K = 1000  # Pinecone's top_k ceiling for queries that include metadata
+DEFAULT_ITEM_PASS_RATE = 0.5  # Same over-fetch as the old top_k * 2 until we have observations
+MIN_ITEM_PASS_RATE = 0.01
+FETCH_HEADROOM = 1.25
+
+# Collapsing, merging or MMR need spare candidates to still fill top_k: fetch this many times deeper
+DIVERSIFY_CANDIDATE_FACTOR = 3
+
+# Hybrid retrieval: when a BM25 index is available, each search also ranks chunks
+# lexically and the two candidate lists (this deep) are merged by reciprocal rank fusion.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1").lower() not in ("0", "false", "no")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# Log a one-line latency summary this often (seconds); 0 disables it. Full stats: get_server_stats
+STATS_LOG_INTERVAL_SECONDS = float(os.getenv("STATS_LOG_INTERVAL_SECONDS", "0"))
+
+@dataclass
+class ToolOutcome:
+    """What went wrong while answering one tool call; a failed call's response is not cached."""
+    error_payload: bool = False  # The response is an {"error": ...} payload
+    search_failures: int = 0  # Searches answered with [] because an embedding or vector store call failed
+
+    @property
+    def failed(self) -> bool:
+        return self.error_payload or self.search_failures > 0
+
+# Set by run_tool for the duration of a call; tasks the call spawns share the same object
+tool_outcome: ContextVar[Optional[ToolOutcome]] = ContextVar("tool_outcome", default=None)
+
+def record_search_failure(count: int = 1) -> None:
+    outcome = tool_outcome.get()
+    if outcome is not None:
+        outcome.search_failures += count
+
 class SearchResult(BaseModel):
     """Structured search result"""
     chunk_id: str
@@ -24,16 +111,310 @@ class SearchResult(BaseModel):
     item_id: str
     chunk_type: str
     text: str
-    score: float
+    score: Optional[float]  # Vector similarity; None for a chunk only BM25 retrieved
+    fusion_score: Optional[float] = None  # Reciprocal rank fusion score when the search was hybrid
     fiscal_year: int
     fiscal_quarter: int
     revenue: Optional[float] = None # Add revenue to SearchResult model
+    merged_chunk_ids: Optional[List[str]] = None  # Set when adjacent chunks were merged into this passage
+
+class SearchRequest(BaseModel):
+    """Arguments of a single semantic_search call (used by the batched API and bulk CLI)"""
+    query: str
+    top_k: int = 5
+    ticker_filter: Optional[str] = None
+    form_type_filter: Optional[str] = None
+    item_filter: Optional[str] = None
+    year_filter: Optional[int] = None
+    chunk_type_filter: Optional[str] = None
+    min_revenue: Optional[float] = None
+    text_chars: Optional[int] = None  # Read only this many leading characters of each result's text
+    # None, "collapse" (one chunk per run of adjacent chunks), "merge" (stitch the run into
+    # one passage) or "mmr" (maximal marginal relevance over the stored vectors)
+    diversify: Optional[Literal["collapse", "merge", "mmr"]] = None
 
 class SECSearchServer:
-    def __init__(self):
-        self.openai_client = openai_client
-        self.index = index
-        
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        facts_store: Optional[FactsStore] = None,
+        lexical_index: Optional[BM25Index] = None,
+        document_store: Optional[DocumentStore] = None,
+        index_generation: Optional[GenerationWatcher] = None,
+    ):
+        # Pinecone by default; set VECTOR_STORE_BACKEND=local to search the in-process index
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        # Financial figures extracted at ingest time (see extract_facts.py)
+        self.facts_store = facts_store if facts_store is not None else FactsStore()
+        # Chunk text is fetched from here for returned results only; the index holds IDs and fields
+        self.document_store = document_store if document_store is not None else DocumentStore()
+        # BM25 over the same chunks (see build_bm25_index.py); None means vector-only search
+        if lexical_index is None and HYBRID_SEARCH:
+            lexical_index = BM25Index.open(BM25_INDEX_DIR)
+        self.lexical_index = lexical_index
+        self._lexical_index_dir = (
+            lexical_index.index_dir if lexical_index is not None else BM25_INDEX_DIR if HYBRID_SEARCH else None
+        )
+        # Bumped by the ingest scripts; a new value means the files under the indexes changed
+        self.index_generation = index_generation or GenerationWatcher()
+        self._loaded_generation = self.index_generation.current()
+        self._reload_lock = threading.Lock()
+        self.query_cache = QueryEmbeddingCache()
+        # Late-bound so the upstream call can be swapped (e.g. in tests) after construction
+        self.query_batcher = QueryEmbeddingBatcher(
+            lambda texts: self._embed_texts(texts),
+            max_wait_seconds=QUERY_BATCH_WINDOW_MS / 1000,
+            max_batch_size=QUERY_BATCH_MAX_SIZE,
+        )
+        self._query_executor = ThreadPoolExecutor(
+            max_workers=VECTOR_QUERY_WORKERS, thread_name_prefix="vector-query"
+        )
+        self._item_pass_rates: Dict[str, float] = {}
+        # Per-tool, per-stage latency histograms and call counters (see get_server_stats)
+        self.metrics = ServerMetrics()
+        # Single-flight table: search signature -> the task computing it
+        self._in_flight_searches: Dict[str, asyncio.Future] = {}
+        self.searches_executed = 0
+        self.searches_coalesced = 0
+
+    @property
+    def openai_client(self):
+        """Created on first use (the openai import is deferred off the startup path)."""
+        return get_openai_client()
+
+    async def _timed(self, stage: str, awaitable):
+        """Await and record the wait under stage (for futures that cannot use a with block)."""
+        with self.metrics.stage(stage):
+            return await awaitable
+
+    async def _embed_texts(self, texts: List[str]) -> tuple[List[List[float]], int]:
+        """Embed texts in one request; returns (embeddings, total_tokens)."""
+        response = await self.openai_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=texts,
+            dimensions=EMBEDDING_DIMENSIONS
+        )
+        tokens = response.usage.total_tokens if response.usage else 0
+        return [item.embedding for item in response.data], tokens
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed query texts through the two-tier cache; only misses reach OpenAI, micro-batched."""
+        with self.metrics.stage("embed"):
+            return await self.query_cache.get_or_embed(
+                EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, queries, self.query_batcher.embed
+            )
+
+    async def warm_query_cache(self):
+        """Pre-seed the cache with the canned tool queries (one batched request for any misses)."""
+        try:
+            # Build the OpenAI client on a worker thread so its import does not hold up
+            # the first requests, and so a cache miss later does not pay for it either.
+            await asyncio.get_running_loop().run_in_executor(None, get_openai_client)
+            await self.embed_queries(CANNED_QUERIES)
+            logger.info(f"Query embedding cache warmed: {self.query_cache.stats()}")
+        except Exception as e:
+            logger.warning(f"Could not warm query embedding cache: {e}")
+
+    @staticmethod
+    def _build_filter(request: SearchRequest, push_down_items: bool = True) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Translate the request's filters into a Pinecone-style metadata filter.
+        Returns (filter, item_post_filter): item_post_filter is set only when the
+        item_filter text cannot be expressed as exact item_number/part/item_name conditions.
+        """
+        # Build filter conditions - simplified without regex
+        filter_conditions = {}
+        if request.ticker_filter:
+            filter_conditions['ticker'] = request.ticker_filter
+        if request.form_type_filter:
+            filter_conditions['form_type'] = request.form_type_filter
+        if request.year_filter:
+            filter_conditions['fiscal_year'] = request.year_filter
+        if request.chunk_type_filter:
+            filter_conditions['chunk_type'] = request.chunk_type_filter
+        if request.min_revenue is not None: # Add revenue filter
+            filter_conditions['revenue'] = {"$gte": request.min_revenue}
+
+        item_post_filter = None
+        if request.item_filter:
+            item_conditions = item_filter_conditions(request.item_filter) if push_down_items else None
+            if item_conditions:
+                filter_conditions.update(item_conditions)
+            else:
+                item_post_filter = request.item_filter
+        return (filter_conditions if filter_conditions else None), item_post_filter
+
+    @staticmethod
+    def _rank_score(match: Dict[str, Any]) -> float:
+        """The score a match was ranked by: its fused score in a hybrid search, else its similarity."""
+        return match.get('fusion_score', match['score'])
+
+    @staticmethod
+    def _matches_item(match: Dict[str, Any], item_post_filter: Optional[str]) -> bool:
+        return not item_post_filter or item_post_filter.lower() in match['metadata']['item_id'].lower()
+
+    def _to_results(self, matches: List[Dict[str, Any]], request: SearchRequest) -> List[SearchResult]:
+        """Format (already filtered) matches into SearchResults, fetching their text in one bulk read."""
+        if request.diversify == "collapse":
+            groups = group_adjacent(matches)[:request.top_k]
+        elif request.diversify == "merge":
+            groups = group_adjacent(matches, max_group_size=MAX_MERGED_CHUNKS)[:request.top_k]
+        else:
+            groups = [[match] for match in matches[:request.top_k]]
+        merging = request.diversify == "merge"
+        # A merged passage is cut to text_chars only after stitching, so read members in full
+        with self.metrics.stage("fetch_text"):
+            texts = self.document_store.get_texts(
+                [m['id'] for group in groups for m in (group if merging else [max(group, key=self._rank_score)])],
+                None if merging else request.text_chars,
+            )
+        results = []
+        for group in groups:
+            match = max(group, key=self._rank_score)
+            metadata = match['metadata']
+            # Indexes built before the document store still carry text in their metadata
+            if merging:
+                text = merge_texts([texts.get(m['id'], m['metadata'].get('text', '')) for m in group])
+            else:
+                text = texts.get(match['id'], metadata.get('text', ''))
+            if request.text_chars is not None:
+                text = text[:request.text_chars]
+            result = SearchResult(
+                chunk_id=match['id'],
+                ticker=metadata['ticker'],
+                form_type=metadata['form_type'],
+                filing_date=metadata['filing_date'],
+                item_id=metadata['item_id'],
+                chunk_type=metadata['chunk_type'],
+                text=text,
+                score=match['score'],
+                fusion_score=match.get('fusion_score'),
+                fiscal_year=metadata['fiscal_year'],
+                fiscal_quarter=metadata['fiscal_quarter'],
+                revenue=metadata.get('revenue'), # Get revenue from metadata
+                merged_chunk_ids=[m['id'] for m in group] if merging and len(group) > 1 else None
+            )
+            results.append(result)
+        return results
+
+    def _fetch_k(self, top_k: int, item_post_filter: Optional[str]) -> int:
+        """How many matches to request so that ~top_k survive the item post-filter."""
+        if not item_post_filter:
+            return top_k
+        pass_rate = self._item_pass_rates.get(item_post_filter.lower(), DEFAULT_ITEM_PASS_RATE)
+        return min(MAX_FETCH_K, max(top_k, math.ceil(top_k / max(pass_rate, MIN_ITEM_PASS_RATE) * FETCH_HEADROOM)))
+
+    def _record_pass_rate(self, item_post_filter: str, matches: int, passed: int):
+        """Exponential moving average of the fraction of matches that pass a given item post-filter."""
+        if not matches:
+            return
+        key = item_post_filter.lower()
+        observed = passed / matches
+        previous = self._item_pass_rates.get(key)
+        self._item_pass_rates[key] = observed if previous is None else 0.5 * previous + 0.5 * observed
+
+    async def _query(self, vector: List[float], top_k: int, filter_conditions: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Search the vector store on the bounded executor, off the event loop."""
+        loop = asyncio.get_running_loop()
+        with self.metrics.stage("vector_query"):
+            return await loop.run_in_executor(
+                self._query_executor,
+                functools.partial(
+                    self.vector_store.query,
+                    vector=vector,
+                    top_k=top_k,
+                    include_metadata=True,
+                    filter=filter_conditions
+                )
+            )
+
+    def _candidate_k(self, request: SearchRequest) -> int:
+        """Depth of each candidate list: deeper than top_k when it will be diversified or fused with BM25."""
+        k = request.top_k * DIVERSIFY_CANDIDATE_FACTOR if request.diversify else request.top_k
+        return max(k, HYBRID_CANDIDATES) if self.lexical_index is not None else k
+
+    async def _lexical_query(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """BM25 searches on the query executor (filters are the same pushed-down filters)."""
+        loop = asyncio.get_running_loop()
+        with self.metrics.stage("lexical_query"):
+            return await loop.run_in_executor(
+                self._query_executor, functools.partial(self.lexical_index.search_many, queries)
+            )
+
+    def _lexical_plan(self, request: SearchRequest) -> Dict[str, Any]:
+        filter_conditions, _ = self._build_filter(request)
+        return {"query": request.query, "top_k": self._candidate_k(request), "filter": filter_conditions}
+
+    async def _mmr(self, matches: List[Dict[str, Any]], query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Reorder candidates by maximal marginal relevance using their stored vectors."""
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(
+                self._query_executor, self.vector_store.fetch_vectors, [m['id'] for m in matches]
+            )
+        except NotImplementedError as e:
+            logger.warning(f"MMR unavailable, returning relevance order: {e}")
+            return matches
+        with self.metrics.stage("diversify"):
+            # Chunks without a stored vector (e.g. BM25-only hits missing from the index) go last
+            with_vectors = [m for m in matches if m['id'] in vectors]
+            order = mmr_order(query_embedding, [vectors[m['id']] for m in with_vectors], top_k)
+            return [with_vectors[i] for i in order] + [m for m in matches if m['id'] not in vectors]
+
+    async def _fuse(
+        self,
+        request: SearchRequest,
+        vector_matches: List[Dict[str, Any]],
+        lexical_matches: Optional[List[Dict[str, Any]]],
+        query_embedding: List[float],
+    ) -> List[SearchResult]:
+        """Reciprocal rank fusion of the two candidate lists (ranked by fusion_score), then diversification."""
+        if lexical_matches is None:
+            matches = vector_matches
+        else:
+            _, item_post_filter = self._build_filter(request)
+            with self.metrics.stage("post_filter"):
+                if item_post_filter:
+                    lexical_matches = [m for m in lexical_matches if self._matches_item(m, item_post_filter)]
+                matches = reciprocal_rank_fusion([vector_matches, lexical_matches])
+        if request.diversify == "mmr" and matches:
+            matches = await self._mmr(matches, query_embedding, request.top_k)
+        return self._to_results(matches, request)
+
+    async def _vector_matches(self, query_embedding: List[float], request: SearchRequest, k: int) -> List[Dict[str, Any]]:
+        """Top-k vector matches for an already-embedded query, pushing filters into the index where possible."""
+        filter_conditions, item_post_filter = self._build_filter(request)
+        if item_post_filter is None:
+            matches = await self._query(query_embedding, k, filter_conditions)
+            if matches or not request.item_filter:
+                return matches[:k]
+            # Nothing matched the pushed-down item fields: the index may predate them,
+            # so retry with the item_id post-filter.
+            filter_conditions, item_post_filter = self._build_filter(request, push_down_items=False)
+
+        # Adaptive over-fetch: size the request from the learned pass rate and grow it
+        # until enough matches survive or the filtered candidate set is exhausted.
+        fetch_k = self._fetch_k(k, item_post_filter)
+        while True:
+            matches = await self._query(query_embedding, fetch_k, filter_conditions)
+            with self.metrics.stage("post_filter"):
+                passed = [m for m in matches if self._matches_item(m, item_post_filter)]
+            self._record_pass_rate(item_post_filter, len(matches), len(passed))
+            if len(passed) >= k or len(matches) < fetch_k or fetch_k >= MAX_FETCH_K:
+                return passed[:k]
+            fetch_k = min(MAX_FETCH_K, max(fetch_k * 2, self._fetch_k(k, item_post_filter)))
+
+    async def _search_embedded(self, query_embedding: List[float], request: SearchRequest) -> List[SearchResult]:
+        """Run one search for an already-embedded query; vector and BM25 retrieval run concurrently."""
+        k = self._candidate_k(request)
+        if self.lexical_index is None:
+            return await self._fuse(request, await self._vector_matches(query_embedding, request, k), None, query_embedding)
+        vector_matches, (lexical_matches,) = await asyncio.gather(
+            self._vector_matches(query_embedding, request, k),
+            self._lexical_query([self._lexical_plan(request)]),
+        )
+        return await self._fuse(request, vector_matches, lexical_matches, query_embedding)
+
     async def semantic_search(
         self, 
         query: str, 
@@ -43,77 +424,186 @@ class SECSearchServer:
         item_filter: Optional[str] = None,
         year_filter: Optional[int] = None,
         chunk_type_filter: Optional[str] = None,
-        min_revenue: Optional[float] = None # New filter for revenue
+        min_revenue: Optional[float] = None, # New filter for revenue
+        text_chars: Optional[int] = None,
+        diversify: Optional[str] = None
     ) -> List[SearchResult]:
-        """Perform semantic search over SEC filings"""
+        """Perform semantic search over SEC filings (fused with BM25 when a lexical index is built)"""
+        request = SearchRequest(
+            query=query,
+            top_k=top_k,
+            ticker_filter=ticker_filter,
+            form_type_filter=form_type_filter,
+            item_filter=item_filter,
+            year_filter=year_filter,
+            chunk_type_filter=chunk_type_filter,
+            min_revenue=min_revenue,
+            text_chars=text_chars,
+            diversify=diversify
+        )
         
+        # Identical searches already running (same query, filters, top_k and text_chars)
+        # are joined rather than repeated. The shared task is shielded so one caller
+        # being cancelled does not cancel it for the others.
+        key = request.model_dump_json()
+        task = self._in_flight_searches.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_search(request))
+            self._in_flight_searches[key] = task
+            task.add_done_callback(functools.partial(self._search_done, key))
+            self.searches_executed += 1
+        else:
+            self.searches_coalesced += 1
         try:
-            # IMPORTANT: Generate query embedding with 512 dimensions to match index
-            response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query,
-                dimensions=512
-            )
-            query_embedding = response.data[0].embedding
-            
-            # Build filter conditions - simplified without regex
-            filter_conditions = {}
-            if ticker_filter:
-                filter_conditions['ticker'] = ticker_filter
-            if form_type_filter:
-                filter_conditions['form_type'] = form_type_filter
-            if year_filter:
-                filter_conditions['fiscal_year'] = year_filter
-            if chunk_type_filter:
-                filter_conditions['chunk_type'] = chunk_type_filter
-            if min_revenue is not None: # Add revenue filter
-                filter_conditions['revenue'] = {"$gte": min_revenue}
+            return list(await asyncio.shield(task))
+        except Exception as e:
+            # Every caller joined to the failed search records it, so none of their responses is cached
+            logger.error(f"Search error: {e}")
+            record_search_failure()
+            return []
+
+    def _search_done(self, key: str, task: asyncio.Future) -> None:
+        self._in_flight_searches.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Retrieved here too in case every caller was cancelled
+
+    async def _run_search(self, request: SearchRequest) -> List[SearchResult]:
+        # IMPORTANT: Query embedding must use 512 dimensions to match index (cached per query text)
+        query_embedding = (await self.embed_queries([request.query]))[0]
+        return await self._search_embedded(query_embedding, request)
+
+    def single_flight_stats(self) -> Dict[str, Any]:
+        """How many semantic_search calls ran upstream vs. joined an identical in-flight one."""
+        calls = self.searches_executed + self.searches_coalesced
+        return {
+            "executed": self.searches_executed,
+            "coalesced": self.searches_coalesced,
+            "coalesced_rate": round(self.searches_coalesced / calls, 4) if calls else 0.0,
+            "in_flight": len(self._in_flight_searches),
+        }
+
+    async def semantic_search_many(
+        self, requests: List[Union[SearchRequest, Dict[str, Any]]]
+    ) -> List[List[SearchResult]]:
+        """
+        Run many searches at once. All query texts are embedded in one batched request
+        (through the cache; split at the embeddings input limit) and the vector store scores them together: one matrix-matrix
+        product per distinct filter locally, bounded-concurrency queries on Pinecone.
+        BM25 candidates, when enabled, are fused per request as in semantic_search.
+        Returns one result list per request, in request order; a request that fails
+        gets an empty list without affecting the others.
+        """
+        requests = [r if isinstance(r, SearchRequest) else SearchRequest(**r) for r in requests]
+        if not requests:
+            return []
+        
+        try:
+            embeddings = await self.embed_queries([r.query for r in requests])
+            plans = [self._build_filter(request) for request in requests]
+            depths = [self._candidate_k(request) for request in requests]
+            vector_queries = [
+                {
+                    "vector": embedding,
+                    "top_k": self._fetch_k(k, item_post_filter),
+                    "filter": filter_conditions,
+                }
+                for k, embedding, (filter_conditions, item_post_filter) in zip(depths, embeddings, plans)
+            ]
             
-            # Search Pinecone
-            search_results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k * 2 if item_filter else top_k,  # Get more results if we need to filter
-                include_metadata=True,
-                filter=filter_conditions if filter_conditions else None
-            )
+            loop = asyncio.get_running_loop()
+            vector_future = self._timed("vector_query", loop.run_in_executor(
+                self._query_executor,
+                functools.partial(self.vector_store.query_many, vector_queries, include_metadata=True)
+            ))
+            try:
+                if self.lexical_index is not None:
+                    all_matches, all_lexical = await asyncio.gather(
+                        vector_future, self._lexical_query([self._lexical_plan(request) for request in requests])
+                    )
+                else:
+                    all_matches, all_lexical = await vector_future, [None] * len(requests)
+            except Exception as e:
+                # One bad request (e.g. a filter the store rejects) must not sink the rest
+                logger.warning(f"Batched query failed ({e}); running the {len(requests)} searches one by one.")
+                all_matches = all_lexical = [None] * len(requests)
             
-            # Format results and apply item_filter post-search if needed
-            results = []
-            for match in search_results['matches']:
-                metadata = match['metadata']
-                
-                # Apply item filter manually if specified
-                if item_filter and item_filter.lower() not in metadata['item_id'].lower():
+            fused = {}
+            retries = []
+            for i, (request, matches, (_, item_post_filter)) in enumerate(zip(requests, all_matches, plans)):
+                if matches is None:
+                    retries.append(i)
                     continue
-                    
-                result = SearchResult(
-                    chunk_id=match['id'],
-                    ticker=metadata['ticker'],
-                    form_type=metadata['form_type'],
-                    filing_date=metadata['filing_date'],
-                    item_id=metadata['item_id'],
-                    chunk_type=metadata['chunk_type'],
-                    text=metadata['text'],
-                    score=match['score'],
-                    fiscal_year=metadata['fiscal_year'],
-                    fiscal_quarter=metadata['fiscal_quarter'],
-                    revenue=metadata.get('revenue') # Get revenue from metadata
-                )
-                results.append(result)
-                
-                # Stop when we have enough results
-                if len(results) >= top_k:
-                    break
+                passed = [m for m in matches if self._matches_item(m, item_post_filter)]
+                if item_post_filter:
+                    self._record_pass_rate(item_post_filter, len(matches), len(passed))
+                exhausted = len(matches) < vector_queries[i]["top_k"]
+                pushed_down_empty = request.item_filter and item_post_filter is None and not matches
+                if pushed_down_empty or (len(passed) < depths[i] and item_post_filter and not exhausted):
+                    # Fall back to the single-query path (fallback / adaptive over-fetch) for stragglers
+                    retries.append(i)
+                else:
+                    fused[i] = self._fuse(request, passed[:depths[i]], all_lexical[i], embeddings[i])
             
-            return results
+            jobs = {**fused, **{i: self._search_embedded(embeddings[i], requests[i]) for i in retries}}
+            finished = {}
+            for i, outcome in zip(jobs, await asyncio.gather(*jobs.values(), return_exceptions=True)):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Search {i} of the batch ({requests[i].query!r}) failed: {outcome}")
+                    record_search_failure()
+                    outcome = []
+                finished[i] = outcome
+            return [finished[i] for i in range(len(requests))]
             
         except Exception as e:
-            logger.error(f"Search error: {e}")
-            return []
+            # Only the shared embedding request fails every search in the batch
+            logger.error(f"Batched search error: {e}")
+            record_search_failure(len(requests))
+            return [[] for _ in requests]
+
+    async def refresh_indexes(self) -> None:
+        """Re-open the local vector index and the BM25 index if an ingest run bumped the generation."""
+        if self.index_generation.current() != self._loaded_generation:
+            await asyncio.to_thread(self._reload_indexes)
+
+    def _reload_indexes(self) -> None:
+        with self._reload_lock:
+            # Read before loading: a bump while we load triggers another reload on the next call
+            generation = self.index_generation.current()
+            if generation == self._loaded_generation:
+                return
+            try:
+                vector_store = self.vector_store.reopen()
+                lexical_index = BM25Index.open(self._lexical_index_dir) if self._lexical_index_dir else None
+            except Exception as e:
+                # E.g. caught between two file swaps of a writer; keep serving the old index and retry
+                logger.warning(f"Could not reload indexes for generation {generation}: {e}")
+                return
+            # Searches already running keep the objects they started with
+            self.vector_store = vector_store
+            self.lexical_index = lexical_index
+            self._loaded_generation = generation
+            logger.info(f"Reloaded indexes for generation {generation}.")
 
 # Initialize the search server
 search_server = SECSearchServer()
 
+# Tool responses only change when new filings are ingested (which bumps the index
+# generation), so identical calls within the TTL are answered from memory.
+CACHEABLE_TOOLS = {
+    "search_sec_filings",
+    "get_company_overview",
+    "get_risk_factors",
+    "compare_companies",
+    "calculate_net_profit_margin",
+    "calculate_pe_ratio",
+    "calculate_rule_of_40_fcf",
+}
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900")),
+    generation=search_server.index_generation.current,
+)
+
 # Create MCP server
 app = Server("sec-filing-search")
 
@@ -134,7 +624,12 @@ async def list_tools() -> list[Tool]:
                     "item_section": {"type": "string", "description": "Filter by item section (e.g., 'Risk Factors', 'Business')"},
                     "fiscal_year": {"type": "integer", "description": "Filter by fiscal year"},
                     "chunk_type": {"type": "string", "description": "Filter by chunk type ('narrative' or 'table')"},
-                    "min_revenue": {"type": "number", "description": "Filter by minimum revenue (e.g., 1000000000 for $1B)"}
+                    "min_revenue": {"type": "number", "description": "Filter by minimum revenue (e.g., 1000000000 for $1B)"},
+                    "diversify": {
+                        "type": "string",
+                        "enum": list(DIVERSIFY_MODES),
+                        "description": "Reduce redundant results: 'collapse' keeps one chunk per run of adjacent chunks, 'merge' joins adjacent chunks into one longer passage, 'mmr' favours results that differ from each other"
+                    }
                 },
                 "required": ["query"]
             }
@@ -213,12 +708,128 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["ticker", "fiscal_year"]
             }
+        ),
+        Tool(
+            name="get_server_stats",
+            description="Operational statistics for this server: per-tool call counts, errors, in-flight requests, response cache hit rates, and per-stage latency percentiles (p50/p95/p99/max) for embedding, vector and BM25 queries, post-filtering, text fetches, value extraction and JSON serialization.",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
 
+def fact_source(fact: Dict[str, Any]) -> Dict[str, Any]:
+    """Provenance for a value answered from the facts store."""
+    return {
+        "source": "facts_store",
+        "form_type": fact["form_type"],
+        "filing_date": fact["filing_date"],
+        "chunk_ids": fact["source_chunk_ids"],
+    }
+
+def extract_eps(text: str) -> Optional[float]:
+    """EPS from free text; rejects large numbers that are really totals, not per-share amounts."""
+    eps_match = re.search(r"(?:Earnings Per Share|EPS|Net Income Per Share)\s*[:\$]?\s*(\d+\.\d{2})", text, re.IGNORECASE)
+    if eps_match:
+        try:
+            return float(eps_match.group(1))
+        except ValueError:
+            pass
+    eps = extract_value(text, "Earnings Per Share")
+    if eps is not None and eps > 1000:
+        logger.warning(f"Extracted potentially large EPS: {eps}. This might be total income, not EPS. Skipping.")
+        return None
+    return eps
+
+async def search_financial_value(
+    query: str,
+    ticker: str,
+    fiscal_year: int,
+    extract,
+) -> tuple[Optional[float], Optional[Dict[str, Any]]]:
+    """
+    Fallback for figures missing from the facts store: search the 10-K financial
+    statements and return the first value `extract` finds, with its source chunk.
+    """
+    results = await search_server.semantic_search(
+        query=query,
+        top_k=2,
+        ticker_filter=ticker,
+        year_filter=fiscal_year,
+        form_type_filter="10K",
+        item_filter="Item 8. Financial Statements and Supplementary Data"
+    )
+    for res in results:
+        logger.info(f"Searching for {query} in: {res.text[:100]}...")
+        with search_server.metrics.stage("extract_value"):
+            value = extract(res.text)
+        if value is not None:
+            logger.info(f"Extracted {query}: {value}")
+            return value, {"source": "semantic_search", "filing_date": res.filing_date, "chunk_ids": [res.chunk_id]}
+    return None, None
+
+def _round_score(score: Optional[float]) -> Optional[float]:
+    return None if score is None else round(score, 4)
+
+def to_json(payload: Any, **kwargs) -> str:
+    """json.dumps, timed as the serialize stage of the current tool; flags {"error": ...} payloads."""
+    if isinstance(payload, dict) and "error" in payload:
+        outcome = tool_outcome.get()
+        if outcome is not None:
+            outcome.error_payload = True
+    with search_server.metrics.stage("serialize"):
+        return json.dumps(payload, **kwargs)
+
+async def run_tool(name: str, arguments: dict) -> tuple[list[TextContent], ToolOutcome]:
+    """dispatch_tool, returning the response with what went wrong while producing it"""
+    outcome = ToolOutcome()
+    token = tool_outcome.set(outcome)
+    try:
+        return await dispatch_tool(name, arguments), outcome
+    finally:
+        tool_outcome.reset(token)
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    """Handle tool calls"""
+    """Handle tool calls, recording per-tool latency, in-flight and error counts"""
+    metrics = search_server.metrics
+    token = current_tool.set(name)
+    metrics.call_started(name)
+    start = time.perf_counter()
+    error = True
+    try:
+        # Pick up a finished ingest run before answering (or caching) anything
+        await search_server.refresh_indexes()
+        response, error = await cached_dispatch(name, arguments)
+        return response
+    finally:
+        metrics.call_finished(name, time.perf_counter() - start, error=error)
+        current_tool.reset(token)
+
+async def cached_dispatch(name: str, arguments: dict) -> tuple[list[TextContent], bool]:
+    """Answer repeated calls from the response cache, dispatching misses; returns (response, failed)"""
+    
+    if name not in CACHEABLE_TOOLS:
+        response, outcome = await run_tool(name, arguments)
+        return response, outcome.failed
+    
+    cache_key = ResponseCache.make_key(name, arguments)
+    generation = response_cache.generation()
+    cached = response_cache.get(cache_key)
+    search_server.metrics.cache_lookup(name, hit=cached is not None)
+    if cached is not None:
+        return cached, False
+    
+    response, outcome = await run_tool(name, arguments)
+    # Errors are usually transient (e.g. an OpenAI or Pinecone outage emptying a search),
+    # so don't pin their responses
+    if not outcome.failed:
+        response_cache.put(cache_key, response, generation)
+    return response, outcome.failed
+
+async def dispatch_tool(name: str, arguments: dict) -> list[TextContent]:
+    """Run a tool call against the search server"""
     
     if name == "search_sec_filings":
         results = await search_server.semantic_search(
@@ -229,7 +840,9 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             item_filter=arguments.get("item_section"),
             year_filter=arguments.get("fiscal_year"),
             chunk_type_filter=arguments.get("chunk_type"),
-            min_revenue=arguments.get("min_revenue") # Pass new filter
+            min_revenue=arguments.get("min_revenue"), # Pass new filter
+            diversify=arguments.get("diversify"),
+            text_chars=501 # One past the preview length so truncation is still detected
         )
         
         formatted_results = []
@@ -241,15 +854,18 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 "filing_date": result.filing_date,
                 "section": result.item_id,
                 "content_type": result.chunk_type,
-                "relevance_score": round(result.score, 4),
+                "relevance_score": _round_score(result.score),
+                "fusion_score": _round_score(result.fusion_score),
                 "fiscal_year": result.fiscal_year,
                 "revenue": result.revenue, # Include revenue in formatted results
                 "text_preview": result.text[:500] + "..." if len(result.text) > 500 else result.text
             })
+            if result.merged_chunk_ids:
+                formatted_results[-1]["merged_chunk_ids"] = result.merged_chunk_ids
         
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "query": arguments["query"],
                 "total_results": len(formatted_results),
                 "results": formatted_results
@@ -263,13 +879,15 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             ticker_filter=arguments["ticker"],
             form_type_filter="10K",
             item_filter="Business",
-            year_filter=arguments.get("fiscal_year")
+            year_filter=arguments.get("fiscal_year"),
+            text_chars=2001,
+            diversify="merge" # Adjacent Business chunks overlap; read them as one passage
         )
         
         if not results:
             return [TextContent(
                 type="text",
-                text=json.dumps({"error": f"No business information found for {arguments['ticker']}"})
+                text=to_json({"error": f"No business information found for {arguments['ticker']}"})
             )]
         
         combined_text = ""
@@ -278,11 +896,11 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "ticker": arguments["ticker"],
                 "fiscal_year": arguments.get("fiscal_year"),
                 "business_overview": combined_text[:2000] + "..." if len(combined_text) > 2000 else combined_text,
-                "source_chunks": [r.chunk_id for r in results]
+                "source_chunks": [chunk_id for r in results for chunk_id in (r.merged_chunk_ids or [r.chunk_id])]
             }, indent=2)
         )]
     
@@ -292,13 +910,15 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             top_k=5,
             ticker_filter=arguments["ticker"],
             item_filter="Risk Factors",
-            year_filter=arguments.get("fiscal_year")
+            year_filter=arguments.get("fiscal_year"),
+            text_chars=1001,
+            diversify="collapse" # Five distinct risks rather than neighbouring windows of one
         )
         
         if not results:
             return [TextContent(
                 type="text",
-                text=json.dumps({"error": f"No risk factors found for {arguments['ticker']}"})
+                text=to_json({"error": f"No risk factors found for {arguments['ticker']}"})
             )]
         
         risk_sections = []
@@ -307,12 +927,13 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 "form_type": result.form_type,
                 "filing_date": result.filing_date,
                 "text": result.text[:1000] + "..." if len(result.text) > 1000 else result.text,
-                "relevance_score": round(result.score, 4)
+                "relevance_score": _round_score(result.score),
+                "fusion_score": _round_score(result.fusion_score)
             })
         
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "ticker": arguments["ticker"],
                 "fiscal_year": arguments.get("fiscal_year"),
                 "risk_factors": risk_sections
@@ -320,18 +941,22 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         )]
     
     elif name == "compare_companies":
-        results1 = await search_server.semantic_search(
-            query=arguments["topic"],
-            top_k=3,
-            ticker_filter=arguments["ticker1"],
-            year_filter=arguments.get("fiscal_year")
-        )
-        
-        results2 = await search_server.semantic_search(
-            query=arguments["topic"],
-            top_k=3,
-            ticker_filter=arguments["ticker2"],
-            year_filter=arguments.get("fiscal_year")
+        # The two companies are searched independently, so run them concurrently
+        results1, results2 = await asyncio.gather(
+            search_server.semantic_search(
+                query=arguments["topic"],
+                top_k=3,
+                ticker_filter=arguments["ticker1"],
+                year_filter=arguments.get("fiscal_year"),
+                text_chars=801
+            ),
+            search_server.semantic_search(
+                query=arguments["topic"],
+                top_k=3,
+                ticker_filter=arguments["ticker2"],
+                year_filter=arguments.get("fiscal_year"),
+                text_chars=801
+            )
         )
         
         def format_company_results(results, ticker):
@@ -346,7 +971,8 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                         "form_type": r.form_type,
                         "filing_date": r.filing_date,
                         "text": r.text[:800] + "..." if len(r.text) > 800 else r.text,
-                        "relevance_score": round(r.score, 4)
+                        "relevance_score": _round_score(r.score),
+                        "fusion_score": _round_score(r.fusion_score)
                     }
                     for r in results
                 ]
@@ -354,7 +980,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "comparison_topic": arguments["topic"],
                 "fiscal_year": arguments.get("fiscal_year"),
                 "company_1": format_company_results(results1, arguments["ticker1"]),
@@ -365,56 +991,47 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     elif name == "calculate_net_profit_margin":
         ticker = arguments["ticker"]
         fiscal_year = arguments["fiscal_year"]
-        
-        net_income = None
-        revenue = None
-
-        # Search for Net Income
-        ni_results = await search_server.semantic_search(
-            query="Net Income",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year,
-            form_type_filter="10K", 
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in ni_results:
-            logger.info(f"Searching for Net Income in: {res.text[:100]}...")
-            net_income = extract_value(res.text, "Net Income")
-            if net_income is not None:
-                logger.info(f"Extracted Net Income: {net_income}")
-                break
-        
-        # Search for Revenue
-        rev_results = await search_server.semantic_search(
-            query="Revenue sales",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year,
-            form_type_filter="10K", 
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in rev_results:
-            logger.info(f"Searching for Revenue in: {res.text[:100]}...")
-            revenue = extract_value(res.text, "Revenue") or extract_value(res.text, "Sales")
-            if revenue is not None:
-                logger.info(f"Extracted Revenue: {revenue}")
-                break
+
+        facts = search_server.facts_store.get_facts(ticker, fiscal_year, [NET_INCOME, REVENUE])
+        sources = {metric: fact_source(fact) for metric, fact in facts.items()}
+        net_income = facts[NET_INCOME]["value"] if NET_INCOME in facts else None
+        revenue = facts[REVENUE]["value"] if REVENUE in facts else None
+
+        # Fall back to searching the filing text only for figures the facts store lacks
+        fallbacks = {}
+        if net_income is None:
+            fallbacks[NET_INCOME] = search_financial_value(
+                "Net Income", ticker, fiscal_year,
+                lambda text: extract_value(text, "Net Income"),
+            )
+        if revenue is None:
+            fallbacks[REVENUE] = search_financial_value(
+                "Revenue sales", ticker, fiscal_year,
+                lambda text: extract_value(text, "Revenue") or extract_value(text, "Sales"),
+            )
+        for metric, (value, source) in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+            if value is None:
+                continue
+            sources[metric] = source
+            if metric == NET_INCOME:
+                net_income = value
+            else:
+                revenue = value
 
         if net_income is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find Net Income for {ticker} in {fiscal_year}. "
                          "Please ensure data is available and try a more specific query if needed."
             }))]
         
         if revenue is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find Revenue for {ticker} in {fiscal_year}. "
                          "Please ensure data is available and try a more specific query if needed."
             }))]
 
         if revenue == 0:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Cannot calculate Net Profit Margin for {ticker} in {fiscal_year}: Revenue is zero."
             }))]
 
@@ -422,12 +1039,13 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "ticker": ticker,
                 "fiscal_year": fiscal_year,
                 "net_income": net_income,
                 "revenue": revenue,
-                "net_profit_margin": f"{net_profit_margin:.2f}%"
+                "net_profit_margin": f"{net_profit_margin:.2f}%",
+                "sources": sources
             }, indent=2)
         )]
     
@@ -437,43 +1055,21 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         share_price = arguments.get("share_price")
 
         if share_price is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": "Share price is required to calculate P/E Ratio. Please provide it as an argument."
             }))]
 
-        eps = None
-        
-        eps_results = await search_server.semantic_search(
-            query="Earnings Per Share EPS diluted",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year,
-            form_type_filter="10K", 
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in eps_results:
-            logger.info(f"Searching for EPS in: {res.text[:100]}...")
-            # EPS is usually a smaller number, typically found with a dollar sign or just a float
-            # Need a more specific regex for EPS to avoid large numbers like total income
-            # This regex looks for numbers that might be EPS (e.g., $1.23, 4.56, but not very large numbers)
-            eps_match = re.search(r"(?:Earnings Per Share|EPS|Net Income Per Share)\s*[:\$]?\s*(\d+\.\d{2})", res.text, re.IGNORECASE)
-            if eps_match:
-                try:
-                    eps = float(eps_match.group(1))
-                    logger.info(f"Extracted EPS: {eps}")
-                    break
-                except ValueError:
-                    pass
-            
-            if eps is None:
-                 eps = extract_value(res.text, "Earnings Per Share") 
-                 if eps is not None and eps > 1000:
-                     logger.warning(f"Extracted potentially large EPS: {eps}. This might be total income, not EPS. Skipping.")
-                     eps = None
-
+        eps_fact = search_server.facts_store.get_fact(ticker, fiscal_year, EPS_DILUTED)
+        if eps_fact is not None:
+            eps = eps_fact["value"]
+            source = fact_source(eps_fact)
+        else:
+            eps, source = await search_financial_value(
+                "Earnings Per Share EPS diluted", ticker, fiscal_year, extract_eps
+            )
 
         if eps is None or eps == 0:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find valid Earnings Per Share (EPS) for {ticker} in {fiscal_year}. "
                          "P/E ratio cannot be calculated without EPS."
             }))]
@@ -482,80 +1078,76 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "ticker": ticker,
                 "fiscal_year": fiscal_year,
                 "share_price": share_price,
                 "earnings_per_share": eps,
-                "pe_ratio": f"{pe_ratio:.2f}"
+                "pe_ratio": f"{pe_ratio:.2f}",
+                "sources": {EPS_DILUTED: source}
             }, indent=2)
         )]
 
     elif name == "calculate_rule_of_40_fcf":
         ticker = arguments["ticker"]
         fiscal_year = arguments["fiscal_year"]
-        
-        current_year_revenue = None
-        rev_results_current = await search_server.semantic_search(
-            query="Revenue sales",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year,
-            form_type_filter="10K",
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in rev_results_current:
-            current_year_revenue = extract_value(res.text, "Revenue") or extract_value(res.text, "Sales")
-            if current_year_revenue is not None:
-                break
-
-        previous_year_revenue = None
-        rev_results_prev = await search_server.semantic_search(
-            query="Revenue sales",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year - 1,
-            form_type_filter="10K",
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in rev_results_prev:
-            previous_year_revenue = extract_value(res.text, "Revenue") or extract_value(res.text, "Sales")
-            if previous_year_revenue is not None:
-                break
-
-        fcf = None
-        fcf_results = await search_server.semantic_search(
-            query="Free Cash Flow",
-            top_k=2,
-            ticker_filter=ticker,
-            fiscal_year=fiscal_year,
-            form_type_filter="10K",
-            item_filter="Item 8. Financial Statements and Supplementary Data"
-        )
-        for res in fcf_results:
-            fcf = extract_value(res.text, "Free Cash Flow")
-            if fcf is not None:
-                break
+
+        current = search_server.facts_store.get_facts(ticker, fiscal_year, [REVENUE, FREE_CASH_FLOW])
+        previous = search_server.facts_store.get_facts(ticker, fiscal_year - 1, [REVENUE])
+        values = {
+            "current_year_revenue": current.get(REVENUE),
+            "previous_year_revenue": previous.get(REVENUE),
+            "free_cash_flow": current.get(FREE_CASH_FLOW),
+        }
+        sources = {key: fact_source(fact) for key, fact in values.items() if fact is not None}
+        values = {key: fact["value"] if fact is not None else None for key, fact in values.items()}
+
+        # Whatever the facts store is missing is looked up concurrently in the filing text
+        def revenue_from_text(text):
+            return extract_value(text, "Revenue") or extract_value(text, "Sales")
+
+        fallbacks = {}
+        if values["current_year_revenue"] is None:
+            fallbacks["current_year_revenue"] = search_financial_value(
+                "Revenue sales", ticker, fiscal_year, revenue_from_text
+            )
+        if values["previous_year_revenue"] is None:
+            fallbacks["previous_year_revenue"] = search_financial_value(
+                "Revenue sales", ticker, fiscal_year - 1, revenue_from_text
+            )
+        if values["free_cash_flow"] is None:
+            fallbacks["free_cash_flow"] = search_financial_value(
+                "Free Cash Flow", ticker, fiscal_year,
+                lambda text: extract_value(text, "Free Cash Flow"),
+            )
+        for key, (value, source) in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+            if value is not None:
+                values[key] = value
+                sources[key] = source
+
+        current_year_revenue = values["current_year_revenue"]
+        previous_year_revenue = values["previous_year_revenue"]
+        fcf = values["free_cash_flow"]
         
         if current_year_revenue is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find current year ({fiscal_year}) Revenue for {ticker}. Cannot calculate Rule of 40."
             }))]
         if previous_year_revenue is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find previous year ({fiscal_year - 1}) Revenue for {ticker}. Cannot calculate Rule of 40."
             }))]
         if fcf is None:
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=to_json({
                 "error": f"Could not find Free Cash Flow for {ticker} in {fiscal_year}. Cannot calculate Rule of 40."
             }))]
         
         if previous_year_revenue == 0:
-             return [TextContent(type="text", text=json.dumps({
+             return [TextContent(type="text", text=to_json({
                 "error": f"Cannot calculate Revenue Growth Rate for {ticker}: Previous year revenue is zero."
             }))]
         if current_year_revenue == 0:
-             return [TextContent(type="text", text=json.dumps({
+             return [TextContent(type="text", text=to_json({
                 "error": f"Cannot calculate FCF Margin for {ticker}: Current year revenue is zero."
             }))]
 
@@ -566,7 +1158,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=to_json({
                 "ticker": ticker,
                 "fiscal_year": fiscal_year,
                 "current_year_revenue": current_year_revenue,
@@ -574,20 +1166,93 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 "revenue_growth_rate": f"{revenue_growth_rate:.2f}%",
                 "free_cash_flow": fcf,
                 "fcf_margin": f"{fcf_margin:.2f}%",
-                "rule_of_40_fcf": f"{rule_of_40:.2f}%"
+                "rule_of_40_fcf": f"{rule_of_40:.2f}%",
+                "sources": sources
             }, indent=2)
         )]
     
+    elif name == "get_server_stats":
+        return [TextContent(
+            type="text",
+            text=to_json(server_stats(), indent=2)
+        )]
+    
     else:
         return [TextContent(
             type="text",
             text=f"Unknown tool: {name}"
         )]
 
-async def main():
-    """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+def server_stats() -> Dict[str, Any]:
+    """Tool latencies and counters plus the caches' own statistics."""
+    return {
+        **search_server.metrics.snapshot(),
+        "query_embedding_cache": search_server.query_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "single_flight": search_server.single_flight_stats(),
+        "query_batcher": search_server.query_batcher.stats(),
+        "lexical_index_chunks": len(search_server.lexical_index) if search_server.lexical_index is not None else 0,
+    }
+
+async def log_stats_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Server stats: {search_server.metrics.log_line()}")
+
+async def start_background_tasks() -> List[asyncio.Task]:
+    """Cache warm-up and the optional stats log line; the caller keeps the references."""
+    tasks = [asyncio.create_task(search_server.warm_query_cache())]
+    if STATS_LOG_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(log_stats_periodically(STATS_LOG_INTERVAL_SECONDS)))
+    return tasks
+
+def create_sse_app():
+    """
+    Starlette app serving MCP over HTTP + Server-Sent Events. Every client session runs
+    against the same search server, so clients, executors and caches are shared.
+    """
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+        # Starlette needs a response object once the client disconnects
+        return Response()
+
+    async def health(request):
+        return JSONResponse({"status": "ok", "in_flight": search_server.metrics.snapshot()["in_flight"]})
+
+    return Starlette(routes=[
+        Route("/sse", endpoint=handle_sse, methods=["GET"]),
+        Mount("/messages/", app=sse.handle_post_message),
+        Route("/health", endpoint=health, methods=["GET"]),
+    ])
+
+async def main(transport: str = "stdio", host: str = "127.0.0.1", port: int = 8000):
+    """Run the MCP server over stdio (one client per process) or SSE (many clients per process)"""
+    background_tasks = await start_background_tasks()  # noqa: F841 - keep references
+    if transport == "sse":
+        import uvicorn
+
+        config = uvicorn.Config(create_sse_app(), host=host, port=port, log_level="info")
+        logger.info(f"Serving MCP over SSE at http://{host}:{port}/sse")
+        await uvicorn.Server(config).serve()
+    else:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SEC filing search MCP server.")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="stdio",
+                        help="stdio for a single local client, sse to serve many clients from one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    asyncio.run(main(args.transport, args.host, args.port))
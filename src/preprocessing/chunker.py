@@ -2,57 +2,45 @@
 
 from __future__ import annotations
 
+import bisect
+import itertools
 import re
-from typing import List, Dict, Optional
-import pandas as pd
-import tiktoken
-import nltk
+from typing import List, Dict, Optional, Tuple
 import logging
 
 # Import the new financial parsing utility
 from ..utils.financial_parsing import extract_value # Note the relative import
+from ..utils.tokenizer import count_tokens, count_tokens_batch
+from .financial_facts import fiscal_period
+# Item maps live in sections.py so the search server can resolve item filters
+# without importing the chunker's tokenizer dependencies.
+from .sections import (
+    INTRO_ITEM_NAME,
+    ITEM_NAME_MAP_10K,
+    ITEM_NAME_MAP_10Q_PART_I,
+    ITEM_NAME_MAP_10Q_PART_II,
+    part_for_10k_item,
+)
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Part of the ingest configuration hash: bump when a change alters the chunks (text,
+# boundaries, IDs or metadata) produced for an unchanged filing, so it is re-ingested.
+CHUNKER_VERSION = 1
+MIN_CHUNK_TOKENS = 25
+TARGET_CHUNK_TOKENS = 500
+OVERLAP_TOKENS = 100
 
-# Maps moved from the original preprocessing logic
-ITEM_NAME_MAP_10K = {
-    "1": "Business", "1A": "Risk Factors", "1B": "Unresolved Staff Comments", "1C": "Cybersecurity",
-    "2": "Properties", "3": "Legal Proceedings", "4": "Mine Safety Disclosures",
-    "5": "Market for Registrant's Common Equity, Related Stockholder Matters and Issuer Purchases of Equity Securities",
-    "6": "Reserved", "7": "Management's Discussion and Analysis of Financial Condition and Results of Operations",
-    "7A": "Quantitative and Qualitative Disclosures About Market Risk", "8": "Financial Statements and Supplementary Data",
-    "9": "Changes in and Disagreements With Accountants on Accounting and Financial Disclosure",
-    "9A": "Controls and Procedures", "9B": "Other Information",
-    "9C": "Disclosure Regarding Foreign Jurisdictions that Prevent Inspections",
-    "10": "Directors, Executive Officers and Corporate Governance", "11": "Executive Compensation",
-    "12": "Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters",
-    "13": "Certain Relationships and Related Transactions, and Director Independence",
-    "14": "Principal Accountant Fees and Services", "15": "Exhibits, Financial Statement Schedules",
-    "16": "Form 10-K Summary",
-}
-
-ITEM_NAME_MAP_10Q_PART_I = {
-    "1": "Financial Statements",
-    "2": "Management's Discussion and Analysis of Financial Condition and Results of Operations",
-    "3": "Quantitative and Qualitative Disclosures About Market Risk",
-    "4": "Controls and Procedures",
-}
-
-ITEM_NAME_MAP_10Q_PART_II = {
-    "1": "Legal Proceedings", "1A": "Risk Factors",
-    "2": "Unregistered Sales of Equity Securities and Use of Proceeds",
-    "3": "Defaults Upon Senior Securities", "4": "Mine Safety Disclosures",
-    "5": "Other Information", "6": "Exhibits",
-}
-
-encoding = tiktoken.encoding_for_model("text-embedding-3-small")
 
 def _count_tokens(text: str) -> int:
-    """Helper to count tokens using the global tokenizer."""
-    return len(encoding.encode(text))
+    """Helper to count tokens using the shared tokenizer (loaded on first use)."""
+    return count_tokens(text)
+
+def _count_tokens_batch(texts: List[str]) -> List[int]:
+    """Token counts for many texts in a single tokenizer call."""
+    return count_tokens_batch(texts)
 
 def clean_chunk_text(text: str) -> str:
     """Remove leftover artifacts and clean whitespace."""
@@ -67,24 +55,99 @@ def _split_text_into_semantic_units(text: str, max_unit_tokens: int = 200) -> Li
     Splits text into sentences using NLTK, or falls back to paragraphs if NLTK fails
     or sentences are too long. Ensures units are not excessively large.
     """
-    units = []
+    return _split_text_into_counted_units(text, max_unit_tokens)[0]
+
+
+def _split_text_into_counted_units(text: str, max_unit_tokens: int = 200) -> Tuple[List[str], List[int]]:
+    """
+    The units of _split_text_into_semantic_units together with their token counts.
+    Sentences are counted in one batch and a sentence's count is reused for its unit;
+    only paragraph fallbacks and sentences changed by stripping are counted again.
+    """
+    units: List[str] = []
+    counts: List[Optional[int]] = []
     try:
-        # Attempt sentence tokenization
+        # Attempt sentence tokenization (NLTK is imported here, not at module import)
+        import nltk
         sentences = nltk.sent_tokenize(text)
-        for sent in sentences:
-            if _count_tokens(sent) > max_unit_tokens:
+        for sent, sent_tokens in zip(sentences, _count_tokens_batch(sentences)):
+            if sent_tokens > max_unit_tokens:
                 # If a sentence is too long, split it by paragraphs as a fallback
                 sub_paragraphs = [p.strip() for p in sent.split('\n\n') if p.strip()]
                 units.extend(sub_paragraphs)
+                counts.extend([None] * len(sub_paragraphs))
             else:
-                units.append(sent.strip())
+                unit = sent.strip()
+                units.append(unit)
+                counts.append(sent_tokens if unit == sent else None)
     except Exception as e:
         logger.warning(f"NLTK sentence tokenization failed ({e}), falling back to paragraph splitting.")
         # Fallback to paragraph splitting if NLTK fails or isn't downloaded
         units = [p.strip() for p in text.split('\n\n') if p.strip()]
-    
+        counts = [None] * len(units)
+
     # Filter out any empty units
-    return [unit for unit in units if unit]
+    kept = [(unit, unit_tokens) for unit, unit_tokens in zip(units, counts) if unit]
+    units = [unit for unit, _ in kept]
+    counts = [unit_tokens for _, unit_tokens in kept]
+    uncounted = [i for i, unit_tokens in enumerate(counts) if unit_tokens is None]
+    for i, unit_tokens in zip(uncounted, _count_tokens_batch([units[i] for i in uncounted])):
+        counts[i] = unit_tokens
+    return units, counts  # type: ignore[return-value]
+
+
+def _narrative_windows(
+    units: List[str], counts: List[int], target_size: int, overlap_tokens: int
+) -> List[Tuple[int, int, bool]]:
+    """
+    (start, end, has_overlap) unit ranges of the sliding-window narrative chunks.
+
+    A window closes when the next unit would take it past target_size. The next window
+    starts with the longest tail of it whose unit counts fit in overlap_tokens, found by
+    bisecting prefix sums of the per-unit counts (every unit has at least one token).
+    That tail is counted once more as joined text, since the running total that decides
+    where the next window closes starts from it. has_overlap records whether the window
+    has such a tail.
+
+    The re-count is not replaced by a prefix-sum difference on purpose: BPE counts are
+    not additive across the joining space (it can merge into the next unit's first
+    token, or split a token that straddled the boundary), so a derived count would move
+    window boundaries away from those of the original chunker. It costs one encode per
+    window, not per unit.
+    """
+    prefix = list(itertools.accumulate(counts, initial=0))
+    windows: List[Tuple[int, int, bool]] = []
+    start = 0
+    window_tokens = 0
+    for i, unit_tokens in enumerate(counts):
+        if window_tokens + unit_tokens > target_size:
+            overlap_start = bisect.bisect_left(prefix, prefix[i] - overlap_tokens, start, i)
+            if i > start:
+                windows.append((start, i, overlap_start < i))
+            start = overlap_start
+            window_tokens = _count_tokens(" ".join(units[start:i])) if start < i else 0
+        window_tokens += unit_tokens
+    if start < len(units):
+        windows.append((start, len(units), counts[-1] <= overlap_tokens))
+    return windows
+
+
+def _narrative_chunks(
+    narrative_text: str, min_tokens: int, target_size: int, overlap_tokens: int
+) -> List[Tuple[str, int, bool]]:
+    """
+    (text, token_count, has_overlap) for each narrative chunk of at least min_tokens.
+    token_count is that of the joined text (one batched encode per section), for the
+    reason given in _narrative_windows.
+    """
+    semantic_units, unit_counts = _split_text_into_counted_units(narrative_text)
+    windows = _narrative_windows(semantic_units, unit_counts, target_size, overlap_tokens)
+    chunk_texts = [" ".join(semantic_units[start:end]) for start, end, _ in windows]
+    return [
+        (chunk_text, token_count, has_overlap)
+        for chunk_text, token_count, (_, _, has_overlap) in zip(chunk_texts, _count_tokens_batch(chunk_texts), windows)
+        if token_count >= min_tokens
+    ]
 
 
 def process_single_filing(
@@ -92,9 +155,9 @@ def process_single_filing(
     company_name: str,
     form_type: str,
     filing_date: str,
-    min_tokens: int = 25,
-    target_size: int = 500,
-    overlap_tokens: int = 100,
+    min_tokens: int = MIN_CHUNK_TOKENS,
+    target_size: int = TARGET_CHUNK_TOKENS,
+    overlap_tokens: int = OVERLAP_TOKENS,
 ) -> List[Dict]:
     """
     Chunk a single filing and return metadata dictionaries,
@@ -103,11 +166,8 @@ def process_single_filing(
     file_id = f"{company_name}_{form_type}_{filing_date}"
     ticker = company_name
 
-    filing_date_dt = pd.to_datetime(filing_date)
-    fiscal_year = filing_date_dt.year
-    fiscal_quarter = filing_date_dt.quarter
-    if form_type == "10K" and filing_date_dt.month < 4:
-        fiscal_year -= 1
+    # 10-Ks filed before April cover the previous fiscal year
+    fiscal_year, fiscal_quarter = fiscal_period(form_type, filing_date)
 
     # --- Extract Revenue for the entire filing using the new utility ---
     extracted_revenue = None
@@ -148,8 +208,14 @@ def process_single_filing(
 
     for section_title, section_text in sections:
         item_id = "Intro"
+        # Normalised, filterable section fields (item_id stays as the human-readable label)
+        item_number = ""
+        item_part = ""
+        item_name = INTRO_ITEM_NAME
         if "PART" in section_title.upper():
             current_part = section_title.upper()
+            item_number = "1"
+            item_part = " ".join(current_part.split())
             if form_type == "10Q":
                 item_map = ITEM_NAME_MAP_10Q_PART_I if "PART I" in current_part else ITEM_NAME_MAP_10Q_PART_II
                 item_name = item_map.get("1", "Unknown Section")
@@ -167,21 +233,25 @@ def process_single_filing(
                 item_map = ITEM_NAME_MAP_10Q_PART_I if "PART I" in current_part else ITEM_NAME_MAP_10Q_PART_II
                 item_name = item_map.get(item_number, "Unknown Section")
                 item_id = f"{current_part}, Item {item_number} - {item_name}"
+                item_part = " ".join(current_part.split())
             else:
                 item_map = ITEM_NAME_MAP_10K
                 item_name = item_map.get(item_number, "Unknown Section")
                 item_id = f"Item {item_number} - {item_name}"
+                item_part = part_for_10k_item(item_number)
 
         table_pattern = re.compile(r"\[TABLE_START\].*?\[TABLE_END\]", re.DOTALL)
-        table_matches = list(table_pattern.finditer(section_text))
-        for match in table_matches:
-            cleaned_text = clean_chunk_text(match.group(0).strip())
-            token_count = _count_tokens(cleaned_text)
+        # Each section's tables, and then its units and chunks, are tokenized in single batches
+        cleaned_tables = [clean_chunk_text(match.group(0).strip()) for match in table_pattern.finditer(section_text)]
+        for cleaned_text, token_count in zip(cleaned_tables, _count_tokens_batch(cleaned_tables)):
             if token_count >= min_tokens:
                 final_chunks.append({
                     "text": cleaned_text,
                     "chunk_type": "table",
                     "item_id": item_id,
+                    "item_number": item_number,
+                    "part": item_part,
+                    "item_name": item_name,
                     "token_count": token_count,
                     "has_overlap": False,
                     "revenue": extracted_revenue
@@ -189,61 +259,21 @@ def process_single_filing(
 
         narrative_text = table_pattern.sub("", section_text).strip()
         if narrative_text:
-            semantic_units = _split_text_into_semantic_units(narrative_text)
-            
-            current_chunk_units = []
-            current_chunk_tokens = 0
-            overlap_buffer_units = []
-            
-            for unit_idx, unit in enumerate(semantic_units):
-                unit_tokens = _count_tokens(unit)
-
-                if current_chunk_tokens + unit_tokens > target_size:
-                    if current_chunk_units:
-                        chunk_text = " ".join(current_chunk_units)
-                        token_count = _count_tokens(chunk_text)
-                        if token_count >= min_tokens:
-                            final_chunks.append({
-                                "text": chunk_text,
-                                "chunk_type": "narrative",
-                                "item_id": item_id,
-                                "token_count": token_count,
-                                "has_overlap": bool(overlap_buffer_units),
-                                "revenue": extracted_revenue
-                            })
-                    
-                    current_chunk_units = list(overlap_buffer_units)
-                    current_chunk_tokens = _count_tokens(" ".join(current_chunk_units))
-                    overlap_buffer_units = []
-
-                current_chunk_units.append(unit)
-                current_chunk_tokens += unit_tokens
-
-                temp_overlap_units = []
-                temp_overlap_tokens = 0
-                for j in range(len(current_chunk_units) - 1, -1, -1):
-                    unit_for_overlap = current_chunk_units[j]
-                    unit_for_overlap_tokens = _count_tokens(unit_for_overlap)
-                    if temp_overlap_tokens + unit_for_overlap_tokens <= overlap_tokens:
-                        temp_overlap_units.insert(0, unit_for_overlap)
-                        temp_overlap_tokens += unit_for_overlap_tokens
-                    else:
-                        break
-                overlap_buffer_units = temp_overlap_units
-
-            if current_chunk_units:
-                chunk_text = " ".join(current_chunk_units)
-                token_count = _count_tokens(chunk_text)
-                if token_count >= min_tokens:
-                    final_chunks.append({
-                        "text": chunk_text,
-                        "chunk_type": "narrative",
-                        "item_id": item_id,
-                        "token_count": token_count,
-                        "has_overlap": bool(overlap_buffer_units),
-                        "revenue": extracted_revenue
-                    })
-                
+            for chunk_text, token_count, has_overlap in _narrative_chunks(
+                narrative_text, min_tokens, target_size, overlap_tokens
+            ):
+                final_chunks.append({
+                    "text": chunk_text,
+                    "chunk_type": "narrative",
+                    "item_id": item_id,
+                    "item_number": item_number,
+                    "part": item_part,
+                    "item_name": item_name,
+                    "token_count": token_count,
+                    "has_overlap": has_overlap,
+                    "revenue": extracted_revenue
+                })
+
     final_chunks_with_id: list[dict] = []
     for i, chunk_data in enumerate(final_chunks):
         chunk_id = f"{file_id}-chunk-{i:04d}"
@@ -256,6 +286,9 @@ def process_single_filing(
                 "fiscal_year": fiscal_year,
                 "fiscal_quarter": fiscal_quarter,
                 "item_id": chunk_data["item_id"],
+                "item_number": chunk_data["item_number"],
+                "part": chunk_data["part"],
+                "item_name": chunk_data["item_name"],
                 "chunk_type": chunk_data["chunk_type"],
                 "text": chunk_data["text"],
                 "token_count": chunk_data["token_count"],
@@ -0,0 +1,339 @@
+"""
+Ingest-time extraction of headline financial facts from the tables in processed filings.
+
+Income-statement and cash-flow tables are flattened by the filing preprocessor into
+"[TABLE_START] cell | cell | ... [TABLE_END]" blocks, with "$", "(" / ")" and "%" as
+cells of their own. This module turns those blocks back into labelled rows, picks out a
+small set of metrics and maps each column to the fiscal period it reports, so the
+calculate_* tools can answer from a lookup instead of scraping search results.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TABLE_PATTERN = re.compile(r"\[TABLE_START\].*?\[TABLE_END\]", re.DOTALL)
+
+# Part of the ingest configuration hash: bump when the facts extracted from a filing change
+FACTS_VERSION = 1
+
+REVENUE = "revenue"
+NET_INCOME = "net_income"
+EPS_DILUTED = "eps_diluted"
+OPERATING_CASH_FLOW = "operating_cash_flow"
+CAPITAL_EXPENDITURES = "capital_expenditures"
+FREE_CASH_FLOW = "free_cash_flow"
+
+# Checked in order; the first pattern that matches some row of a table wins for that table.
+METRIC_LABEL_PATTERNS: Dict[str, List[re.Pattern]] = {
+    REVENUE: [
+        re.compile(r"^total (net )?(sales|revenues?)( and (other )?(operating )?revenues?)?$"),
+        re.compile(r"^(net )?operating revenues?$"),
+        re.compile(r"^(net )?revenues?$"),
+        re.compile(r"^net sales$"),
+        re.compile(r"^sales$"),
+    ],
+    NET_INCOME: [
+        re.compile(r"^net (income|earnings|loss|income \(loss\)|\(loss\) income|earnings \(loss\)) attributable to (?!non)"),
+        re.compile(r"^net (income|earnings|loss|income \(loss\)|\(loss\) income|earnings \(loss\))$"),
+        re.compile(r"^consolidated net (income|earnings)$"),
+    ],
+    EPS_DILUTED: [
+        re.compile(r"^diluted( net)? (earnings|income|net income|\(loss\) earnings|earnings \(loss\)|net \(loss\) income)( \(loss\))? per (common )?share"),
+        re.compile(r"^net (income|earnings)( \(loss\))? per diluted share"),
+        re.compile(r"^diluted$"),
+    ],
+    OPERATING_CASH_FLOW: [
+        re.compile(r"^(net )?cash (provided by|generated by|from|provided by \(used in\)|provided by/\(used in\)) operating activities$"),
+        re.compile(r"^net cash (provided|generated)? ?(by|from)? ?operating activities"),
+        re.compile(r"^net cash (from|provided by) operations$"),
+    ],
+    CAPITAL_EXPENDITURES: [
+        re.compile(r"^capital expenditures"),
+        re.compile(r"^(payments for acquisition of|purchases? of|purchases related to|additions to) property"),
+    ],
+}
+
+# Statement amounts for the covered issuers are stated in millions unless the table says otherwise
+DEFAULT_UNIT_SCALE = 1_000_000
+UNIT_SCALES = (("billions", 1_000_000_000), ("millions", 1_000_000), ("thousands", 1_000))
+# Metrics reported per share are never scaled
+PER_SHARE_METRICS = {EPS_DILUTED}
+# 10-Q cash flow statements are year-to-date, not quarterly, so they are not stored per quarter
+YEAR_TO_DATE_METRICS = {OPERATING_CASH_FLOW, CAPITAL_EXPENDITURES}
+
+_UNIT_PATTERN = re.compile(r"in (billions|millions|thousands)", re.IGNORECASE)
+_YEAR_PATTERN = re.compile(r"\b(19[89]\d|20\d\d)\b")
+_NUMBER_PATTERN = re.compile(r"^\(?\$?\s*(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?\)?$")
+_FOOTNOTE_PATTERN = re.compile(r"\s*\(\d\)\s*$")
+_EMPTY_CELLS = {"", "$", "​", "(", ")", ")%"}
+_DASH_CELLS = {"—", "–", "-", "— %", "—%"}
+
+
+@dataclass
+class TableRow:
+    label: str
+    values: List[float] = field(default_factory=list)
+    is_percentage: bool = False
+
+
+@dataclass
+class FinancialFact:
+    ticker: str
+    fiscal_year: int
+    fiscal_quarter: int
+    metric: str
+    value: float
+    unit_scale: int
+    form_type: str
+    filing_date: str
+    source_chunk_ids: List[str] = field(default_factory=list)
+    # 0 for the column the filing reports as its own period; prior-period comparatives
+    # rank lower so a later filing's restated figure never overwrites the original
+    source_rank: int = 0
+
+
+def fiscal_period(form_type: str, filing_date: str) -> Tuple[int, int]:
+    """Same (fiscal_year, fiscal_quarter) convention the chunker stores on every chunk."""
+    year, month = int(filing_date[:4]), int(filing_date[5:7])
+    quarter = (month - 1) // 3 + 1
+    if form_type == "10K" and month < 4:
+        year -= 1
+    return year, quarter
+
+
+def clean_table_text(text: str) -> str:
+    """Mirror of chunker.clean_chunk_text for table blocks (kept here to avoid the tokenizer import)."""
+    text = text.replace("[TABLE_START]", "").replace("[TABLE_END]", "")
+    text = text.replace("[PAGE BREAK]", "")
+    text = re.sub(r"\n\s*\n", "\n", text)
+    text = re.sub(r" +", " ", text)
+    return text.strip()
+
+
+def _normalize_label(label: str) -> str:
+    label = " ".join(label.replace("​", " ").split()).lower()
+    label = _FOOTNOTE_PATTERN.sub("", label)
+    return label.rstrip(":").strip()
+
+
+def _parse_number(cell: str) -> Optional[float]:
+    match = _NUMBER_PATTERN.match(cell)
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", "") + (match.group(2) or ""))
+    return -value if cell.startswith("(") else value
+
+
+def parse_table_rows(table_text: str) -> List[TableRow]:
+    """
+    Rebuild (label, values) rows from a flattened table.
+
+    A non-numeric cell starts a new row; numeric cells that follow are that row's values.
+    "(" followed by a number (or a number followed by ")") marks a negative amount.
+    """
+    body = table_text.replace("[TABLE_START]", "").replace("[TABLE_END]", "")
+    cells = [" ".join(cell.split()) for cell in body.split("|")]
+
+    rows: List[TableRow] = []
+    current: Optional[TableRow] = None
+    negative_open = False
+    for cell in cells:
+        if cell in _EMPTY_CELLS:
+            if cell == "(":
+                negative_open = True
+            elif cell == ")%" and current is not None:
+                current.is_percentage = True
+            continue
+        if cell.startswith("%"):
+            if current is not None:
+                current.is_percentage = True
+            continue
+        if cell in _DASH_CELLS:
+            if current is not None:
+                current.values.append(0.0)
+            continue
+
+        number = _parse_number(cell.rstrip("%").rstrip())
+        if number is not None and current is not None:
+            if _FOOTNOTE_PATTERN.fullmatch(cell) and current.values and all(_is_year(v) for v in current.values):
+                continue  # "2023 | (1)": footnote marker on a header year
+            if negative_open and number > 0:
+                number = -number
+            negative_open = False
+            current.values.append(number)
+            if cell.endswith("%"):
+                current.is_percentage = True
+            continue
+
+        negative_open = False
+        current = TableRow(label=cell)
+        rows.append(current)
+    return rows
+
+
+def _is_year(value: float) -> bool:
+    return value == int(value) and 1980 <= value <= 2099
+
+
+def header_years(rows: List[TableRow]) -> List[int]:
+    """Column years, read from the rows above the first row of amounts."""
+    years: List[int] = []
+    for row in rows:
+        if row.values and not all(_is_year(v) for v in row.values):
+            break
+        years.extend(int(m) for m in _YEAR_PATTERN.findall(row.label))
+        years.extend(int(v) for v in row.values)
+    return years
+
+
+def detect_unit_scale(table_text: str, preceding_text: str) -> int:
+    """Look for "(In millions ...)" inside the table first, then just above it."""
+    for text in (table_text, preceding_text):
+        match = _UNIT_PATTERN.search(text)
+        if match:
+            unit = match.group(1).lower()
+            return next(scale for name, scale in UNIT_SCALES if name == unit)
+    return DEFAULT_UNIT_SCALE
+
+
+def _find_metric_row(rows: List[TableRow], metric: str) -> Optional[TableRow]:
+    normalized = [(_normalize_label(row.label), row) for row in rows]
+    for pattern in METRIC_LABEL_PATTERNS[metric]:
+        for label, row in normalized:
+            if not row.values or row.is_percentage or not pattern.search(label):
+                continue
+            if metric == EPS_DILUTED and abs(row.values[0]) >= 1000:
+                continue  # A "Diluted" share-count row, not EPS
+            if metric == CAPITAL_EXPENDITURES and "proceeds" in label:
+                continue
+            return row
+    return None
+
+
+def _column_periods(
+    years: List[int],
+    n_values: int,
+    form_type: str,
+    fiscal_year: int,
+    fiscal_quarter: int,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Map value columns to (column, fiscal_year, fiscal_quarter, source_rank).
+
+    10-K columns are annual; header years are shifted so the most recent column lands
+    on the filing's own fiscal_year (issuers like NVDA label years by the calendar year
+    their fiscal year ends in). 10-Q tables mix quarter and year-to-date columns, so only
+    the first current-year column is used.
+    """
+    if n_values == 0:
+        return []
+    years = years[:n_values]
+    if not years:
+        return [(0, fiscal_year, fiscal_quarter, 0)]
+    latest = max(years)
+    if form_type == "10Q":
+        return [(years.index(latest), fiscal_year, fiscal_quarter, 0)]
+    offset = fiscal_year - latest
+    return [(column, year + offset, 0, latest - year) for column, year in enumerate(years)]
+
+
+def extract_filing_facts(
+    document_text: str,
+    ticker: str,
+    form_type: str,
+    filing_date: str,
+    chunks: Optional[Iterable[Dict]] = None,
+) -> List[FinancialFact]:
+    """
+    Extract revenue, net income, diluted EPS, operating cash flow, capex and free cash
+    flow from a filing's tables.
+
+    `chunks` are the chunker's output for the same filing; when given, each fact records
+    the chunk_ids of the table chunks it was read from.
+    """
+    if form_type not in ("10K", "10Q"):
+        return []
+    fiscal_year, fiscal_quarter = fiscal_period(form_type, filing_date)
+    if form_type == "10K":
+        fiscal_quarter = 0
+
+    table_chunk_ids: Dict[str, str] = {}
+    for chunk in chunks or ():
+        if chunk.get("chunk_type") == "table":
+            table_chunk_ids.setdefault(chunk["text"], chunk["chunk_id"])
+
+    # Parse every table once, then take each metric from the table that reports the most
+    # metrics: the primary statements beat MD&A summaries, segment tables and notes.
+    candidates: List[Tuple[int, int, Dict[str, TableRow], List[int], int, Optional[str]]] = []
+    for position, match in enumerate(TABLE_PATTERN.finditer(document_text)):
+        table_text = match.group(0)
+        rows = parse_table_rows(table_text)
+        metric_rows = {}
+        for metric in METRIC_LABEL_PATTERNS:
+            if form_type == "10Q" and metric in YEAR_TO_DATE_METRICS:
+                continue
+            row = _find_metric_row(rows, metric)
+            if row is not None:
+                metric_rows[metric] = row
+        if not metric_rows:
+            continue
+        candidates.append((
+            len(metric_rows),
+            -position,
+            metric_rows,
+            header_years(rows),
+            detect_unit_scale(table_text, document_text[max(0, match.start() - 600):match.start()]),
+            table_chunk_ids.get(clean_table_text(table_text)),
+        ))
+    candidates.sort(key=lambda c: c[:2], reverse=True)
+
+    found: Dict[Tuple[int, int, str], FinancialFact] = {}
+    for _, _, metric_rows, years, scale, chunk_id in candidates:
+        for metric, row in metric_rows.items():
+            values = row.values
+            if years and len(values) == len(years) + 1 and values[0] in range(1, 10):
+                values = values[1:]  # "Diluted Net Income Per Share | 1 | $ | 2.47": footnote marker
+            unit_scale = 1 if metric in PER_SHARE_METRICS else scale
+            for column, year, quarter, rank in _column_periods(
+                years, len(values), form_type, fiscal_year, fiscal_quarter
+            ):
+                key = (year, quarter, metric)
+                if key in found:
+                    continue
+                found[key] = FinancialFact(
+                    ticker=ticker,
+                    fiscal_year=year,
+                    fiscal_quarter=quarter,
+                    metric=metric,
+                    value=values[column] * unit_scale,
+                    unit_scale=unit_scale,
+                    form_type=form_type,
+                    filing_date=filing_date,
+                    source_chunk_ids=[chunk_id] if chunk_id else [],
+                    source_rank=rank,
+                )
+
+    # Free cash flow is derived, not reported: operating cash flow less capital expenditures
+    for (year, quarter, metric), ocf in list(found.items()):
+        if metric != OPERATING_CASH_FLOW:
+            continue
+        capex = found.get((year, quarter, CAPITAL_EXPENDITURES))
+        if capex is None:
+            continue
+        found[(year, quarter, FREE_CASH_FLOW)] = FinancialFact(
+            ticker=ticker,
+            fiscal_year=year,
+            fiscal_quarter=quarter,
+            metric=FREE_CASH_FLOW,
+            value=ocf.value - abs(capex.value),
+            unit_scale=ocf.unit_scale,
+            form_type=form_type,
+            filing_date=filing_date,
+            source_chunk_ids=sorted(set(ocf.source_chunk_ids + capex.source_chunk_ids)),
+            source_rank=max(ocf.source_rank, capex.source_rank),
+        )
+
+    return list(found.values())
@@ -0,0 +1,99 @@
+"""Item/section vocabulary for 10-K and 10-Q filings, shared by the chunker and the search server."""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Optional
+
+ITEM_NAME_MAP_10K = {
+    "1": "Business", "1A": "Risk Factors", "1B": "Unresolved Staff Comments", "1C": "Cybersecurity",
+    "2": "Properties", "3": "Legal Proceedings", "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity, Related Stockholder Matters and Issuer Purchases of Equity Securities",
+    "6": "Reserved", "7": "Management's Discussion and Analysis of Financial Condition and Results of Operations",
+    "7A": "Quantitative and Qualitative Disclosures About Market Risk", "8": "Financial Statements and Supplementary Data",
+    "9": "Changes in and Disagreements With Accountants on Accounting and Financial Disclosure",
+    "9A": "Controls and Procedures", "9B": "Other Information",
+    "9C": "Disclosure Regarding Foreign Jurisdictions that Prevent Inspections",
+    "10": "Directors, Executive Officers and Corporate Governance", "11": "Executive Compensation",
+    "12": "Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters",
+    "13": "Certain Relationships and Related Transactions, and Director Independence",
+    "14": "Principal Accountant Fees and Services", "15": "Exhibits, Financial Statement Schedules",
+    "16": "Form 10-K Summary",
+}
+
+ITEM_NAME_MAP_10Q_PART_I = {
+    "1": "Financial Statements",
+    "2": "Management's Discussion and Analysis of Financial Condition and Results of Operations",
+    "3": "Quantitative and Qualitative Disclosures About Market Risk",
+    "4": "Controls and Procedures",
+}
+
+ITEM_NAME_MAP_10Q_PART_II = {
+    "1": "Legal Proceedings", "1A": "Risk Factors",
+    "2": "Unregistered Sales of Equity Securities and Use of Proceeds",
+    "3": "Defaults Upon Senior Securities", "4": "Mine Safety Disclosures",
+    "5": "Other Information", "6": "Exhibits",
+}
+
+INTRO_ITEM_NAME = "Intro"
+
+KNOWN_ITEM_NAMES = sorted(
+    {INTRO_ITEM_NAME}
+    | set(ITEM_NAME_MAP_10K.values())
+    | set(ITEM_NAME_MAP_10Q_PART_I.values())
+    | set(ITEM_NAME_MAP_10Q_PART_II.values())
+)
+
+
+def part_for_10k_item(item_number: str) -> str:
+    """10-K items map to a fixed part (I: 1-4, II: 5-9C, III: 10-14, IV: 15-16)."""
+    match = re.match(r"\d+", item_number)
+    if not match:
+        return ""
+    number = int(match.group(0))
+    if number <= 4:
+        return "PART I"
+    if number <= 9:
+        return "PART II"
+    if number <= 14:
+        return "PART III"
+    return "PART IV"
+
+
+_ITEM_NUMBER_PATTERN = re.compile(r"\bitem\s*(\d{1,2}[a-z]?)\b", re.IGNORECASE)
+_PART_PATTERN = re.compile(r"\bpart\s+(iv|iii|ii|i)\b", re.IGNORECASE)
+
+
+def item_filter_conditions(item_filter: str) -> Optional[Dict[str, Any]]:
+    """
+    Translate a free-text item filter into exact metadata conditions on the
+    item_number / part / item_name fields emitted by the chunker.
+
+    "Item 8. Financial Statements ..." -> {"item_number": "8"}
+    "Risk Factors"                     -> {"item_name": "Risk Factors"}
+    "Financial Statements"             -> {"item_name": {"$in": [...every name containing it...]}}
+
+    Returns None when the text matches no known item, in which case callers have to
+    fall back to post-filtering on item_id.
+    """
+    text = " ".join(item_filter.split())
+    if not text:
+        return None
+
+    number_match = _ITEM_NUMBER_PATTERN.search(text)
+    if number_match:
+        conditions: Dict[str, Any] = {"item_number": number_match.group(1).upper()}
+        part_match = _PART_PATTERN.search(text)
+        if part_match:
+            conditions["part"] = f"PART {part_match.group(1).upper()}"
+        return conditions
+
+    # Same substring semantics as the old item_id post-filter, resolved against the
+    # closed set of item names up front.
+    lowered = text.lower()
+    names = [name for name in KNOWN_ITEM_NAMES if lowered in name.lower()]
+    if len(names) == 1:
+        return {"item_name": names[0]}
+    if names:
+        return {"item_name": {"$in": names}}
+    return None
@@ -0,0 +1,230 @@
+"""
+BM25 lexical index over chunk texts.
+
+Exact financial terms ("free cash flow", "diluted", specific line items) are matched
+poorly by dense retrieval; this index scores them lexically so the server can fuse both
+rankings. Layout of an index directory:
+
+    offsets.npy      int64 (n_terms + 1,)  CSR offsets into the postings arrays
+    postings.npy     int32 (n_postings,)   chunk ordinals, ascending within each term
+    frequencies.npy  uint16 (n_postings,)  term frequency of the term in that chunk
+    doc_lengths.npy  int32 (n_chunks,)     tokens per chunk
+    index.json       terms, chunk ids, filterable metadata and BM25 parameters
+
+The arrays are memory-mapped on load. Queries accept the same Pinecone-style metadata
+filters as the vector stores and return the same match dictionaries.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..utils.paths import PROJECT_ROOT
+from ..vector_store.metadata_filter import MetadataColumns
+
+logger = logging.getLogger(__name__)
+
+# Built by build_bm25_index.py (or embed_skeleton.py); read by the MCP server. Anchored to
+# the project root so hybrid search still finds it when the server starts elsewhere.
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", str(PROJECT_ROOT / "bm25_index"))
+
+INDEX_FILE = "index.json"
+
+# Chunk metadata kept alongside the index: the fields the server filters on or returns.
+# Text is not kept; it is read from the document store for returned results only.
+STORED_FIELDS = (
+    "ticker", "form_type", "filing_date", "fiscal_year", "fiscal_quarter", "item_id",
+    "item_number", "part", "item_name", "chunk_type", "revenue",
+)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Function words only; financial vocabulary ("net", "per", "total") is deliberately kept
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25IndexBuilder:
+    """Accumulates chunks (as produced by process_single_filing) and writes an index directory."""
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._id_to_doc: Dict[str, int] = {}
+        self._metadata: List[Dict[str, Any]] = []
+        self._term_counts: List[Counter] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]) -> None:
+        for chunk in chunks:
+            metadata = {field: chunk[field] for field in STORED_FIELDS if chunk.get(field) is not None}
+            counts = Counter(tokenize(chunk["text"]))
+            doc = self._id_to_doc.get(chunk["chunk_id"])
+            if doc is None:
+                self._id_to_doc[chunk["chunk_id"]] = len(self._ids)
+                self._ids.append(chunk["chunk_id"])
+                self._metadata.append(metadata)
+                self._term_counts.append(counts)
+            else:
+                self._metadata[doc] = metadata
+                self._term_counts[doc] = counts
+
+    def write(self, index_dir: str | os.PathLike, k1: float = 1.2, b: float = 0.75) -> Path:
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        terms = sorted({term for counts in self._term_counts for term in counts})
+        term_ids = {term: i for i, term in enumerate(terms)}
+        postings_per_term: List[List[int]] = [[] for _ in terms]
+        frequencies_per_term: List[List[int]] = [[] for _ in terms]
+        for doc, counts in enumerate(self._term_counts):
+            for term, count in counts.items():
+                term_id = term_ids[term]
+                postings_per_term[term_id].append(doc)
+                frequencies_per_term[term_id].append(min(count, np.iinfo(np.uint16).max))
+
+        lengths = np.fromiter((len(p) for p in postings_per_term), dtype=np.int64, count=len(terms))
+        arrays = {
+            "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "postings": np.fromiter(
+                (doc for p in postings_per_term for doc in p), dtype=np.int32, count=int(lengths.sum())
+            ),
+            "frequencies": np.fromiter(
+                (tf for f in frequencies_per_term for tf in f), dtype=np.uint16, count=int(lengths.sum())
+            ),
+            "doc_lengths": np.fromiter(
+                (sum(counts.values()) for counts in self._term_counts), dtype=np.int32, count=len(self._ids)
+            ),
+        }
+
+        # Write everything under temporary names, then swap in, so a reader never sees a mix
+        for name, array in arrays.items():
+            with open(index_dir / f"{name}.npy.tmp", "wb") as f:
+                np.save(f, array)
+        with open(index_dir / f"{INDEX_FILE}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"k1": k1, "b": b, "terms": terms, "ids": self._ids, "metadata": self._metadata}, f)
+        for name in arrays:
+            os.replace(index_dir / f"{name}.npy.tmp", index_dir / f"{name}.npy")
+        os.replace(index_dir / f"{INDEX_FILE}.tmp", index_dir / INDEX_FILE)
+
+        logger.info(f"Wrote BM25 index to {index_dir}: {len(self._ids)} chunks, {len(terms)} terms.")
+        return index_dir
+
+
+class BM25Index:
+    """Read-only BM25 scorer over a directory written by BM25IndexBuilder."""
+
+    def __init__(self, index_dir: str | os.PathLike, max_cached_filters: int = 256):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self.k1 = sidecar["k1"]
+        self.b = sidecar["b"]
+        self._term_ids = {term: i for i, term in enumerate(sidecar["terms"])}
+        self._ids: List[str] = sidecar["ids"]
+        self._metadata: List[Dict[str, Any]] = sidecar["metadata"]
+        self._columns = MetadataColumns(self._metadata)
+
+        self._offsets = np.load(self.index_dir / "offsets.npy", mmap_mode="r")
+        self._postings = np.load(self.index_dir / "postings.npy", mmap_mode="r")
+        self._frequencies = np.load(self.index_dir / "frequencies.npy", mmap_mode="r")
+        doc_lengths = np.load(self.index_dir / "doc_lengths.npy").astype(np.float32)
+
+        n_docs = len(self._ids)
+        document_frequency = np.diff(self._offsets).astype(np.float32)
+        # Lucene's non-negative idf variant
+        self._idf = np.log1p((n_docs - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(doc_lengths.mean()) if n_docs else 0.0
+        # Per-chunk length normalisation, precomputed once: k1 * (1 - b + b * dl / avgdl)
+        self._length_norm = (
+            self.k1 * (1 - self.b + self.b * doc_lengths / average_length) if average_length else doc_lengths
+        ).astype(np.float32)
+
+        # Filters repeat across searches (same ticker/year/form); their masks are cached
+        self._mask_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._max_cached_filters = max_cached_filters
+        self._lock = threading.Lock()
+        logger.info(f"Loaded BM25 index from {self.index_dir}: {n_docs} chunks, {len(self._term_ids)} terms.")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @classmethod
+    def open(cls, index_dir: str | os.PathLike) -> Optional["BM25Index"]:
+        """Load the index if one has been built, else None (hybrid search is then skipped)."""
+        if not (Path(index_dir) / INDEX_FILE).exists():
+            logger.info(f"No BM25 index found at {index_dir}; lexical retrieval disabled.")
+            return None
+        return cls(index_dir)
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True)
+        with self._lock:
+            mask = self._mask_cache.get(key)
+            if mask is not None:
+                self._mask_cache.move_to_end(key)
+                return mask
+        mask = self._columns.filter_mask(filter)
+        with self._lock:
+            self._mask_cache[key] = mask
+            while len(self._mask_cache) > self._max_cached_filters:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Top_k chunks by BM25 score (only chunks containing at least one query term)."""
+        term_ids = [self._term_ids[t] for t in dict.fromkeys(tokenize(query)) if t in self._term_ids]
+        if not term_ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = int(self._offsets[term_id]), int(self._offsets[term_id + 1])
+            docs = self._postings[start:end]
+            tf = self._frequencies[start:end].astype(np.float32)
+            # Postings are unique per term, so fancy-index accumulation is safe
+            scores[docs] += self._idf[term_id] * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+
+        if filter:
+            scores[~self._filter_mask(filter)] = 0.0
+        candidates = np.flatnonzero(scores)
+        if candidates.size == 0:
+            return []
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {
+                "id": self._ids[doc],
+                "score": float(scores[doc]),
+                "metadata": self._metadata[doc] if include_metadata else {},
+            }
+            for doc in top
+        ]
+
+    def search_many(self, queries: List[Dict[str, Any]], include_metadata: bool = True) -> List[List[Dict[str, Any]]]:
+        """Run several searches ({"query": ..., "top_k": ..., "filter": ...}); one match list each."""
+        return [
+            self.search(q["query"], top_k=q.get("top_k", 10), filter=q.get("filter"), include_metadata=include_metadata)
+            for q in queries
+        ]
@@ -0,0 +1,139 @@
+"""
+Redundancy control for search results.
+
+Narrative chunks are cut with a sliding window (see process_single_filing), so a chunk
+and its neighbour share their boundary sentences and tend to be retrieved together.
+Two remedies are offered:
+
+- group_adjacent / merge_texts: treat consecutive chunks (`<filing>-chunk-NNNN`) of the
+  same filing and section as one passage, either keeping its best chunk or stitching the
+  texts back together without the repeated overlap.
+- mmr_order: maximal marginal relevance over the stored chunk vectors, which also
+  spreads results across near-duplicates that are not adjacent.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DIVERSIFY_MODES = ("collapse", "merge", "mmr")
+
+# Relevance vs. novelty trade-off for MMR (1.0 = plain relevance order)
+MMR_LAMBDA = 0.7
+
+# Upper bound on the overlap looked for when stitching; the chunker repeats ~100 tokens
+MAX_OVERLAP_CHARS = 4000
+
+# A merged passage spans at most this many chunks (~2k tokens at the chunker's 500-token target)
+MAX_MERGED_CHUNKS = 4
+
+_CHUNK_ID_PATTERN = re.compile(r"^(?P<filing>.+)-chunk-(?P<ordinal>\d+)$")
+
+
+def parse_chunk_id(chunk_id: str) -> Optional[Tuple[str, int]]:
+    """("AAPL_10K_2023-11-03", 12) for "AAPL_10K_2023-11-03-chunk-0012"; None for other ids."""
+    match = _CHUNK_ID_PATTERN.match(chunk_id)
+    if not match:
+        return None
+    return match.group("filing"), int(match.group("ordinal"))
+
+
+def group_adjacent(
+    matches: Sequence[Dict[str, Any]], max_group_size: Optional[int] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group matches (best first) whose chunk ordinals are consecutive within the same filing
+    and item_id. Groups are returned in order of their best match; members of a group are
+    in document order. A match that would grow a group past max_group_size is dropped,
+    since it mostly repeats a passage that is already returned.
+    """
+    groups: List[Optional[List[Dict[str, Any]]]] = []
+    owner: Dict[Tuple[str, str, int], int] = {}  # (filing, item_id, ordinal) -> group index
+
+    for match in matches:
+        parsed = parse_chunk_id(match["id"])
+        if parsed is None:
+            groups.append([match])
+            continue
+        filing, ordinal = parsed
+        item_id = match.get("metadata", {}).get("item_id", "")
+        neighbours = sorted({
+            owner[(filing, item_id, n)] for n in (ordinal - 1, ordinal + 1) if (filing, item_id, n) in owner
+        })
+        if not neighbours:
+            target = len(groups)
+            groups.append([match])
+        elif max_group_size is not None and 1 + sum(len(groups[g]) for g in neighbours) > max_group_size:
+            continue
+        else:
+            target = neighbours[0]
+            groups[target].append(match)
+            # This chunk bridges two groups: fold the later one into the earlier one
+            for other in neighbours[1:]:
+                for member in groups[other]:
+                    member_filing, member_ordinal = parse_chunk_id(member["id"])
+                    owner[(member_filing, item_id, member_ordinal)] = target
+                groups[target].extend(groups[other])
+                groups[other] = None
+        owner[(filing, item_id, ordinal)] = target
+
+    return [
+        sorted(group, key=lambda m: parse_chunk_id(m["id"])[1] if parse_chunk_id(m["id"]) else 0)
+        for group in groups if group is not None
+    ]
+
+
+def merge_texts(texts: Sequence[str]) -> str:
+    """Concatenate consecutive chunk texts, dropping the prefix each one repeats from the previous."""
+    merged = ""
+    for text in texts:
+        if not merged:
+            merged = text
+            continue
+        overlap = 0
+        # The repeated overlap is whole sentences, so it ends where the next chunk has a space
+        limit = min(len(merged), len(text), MAX_OVERLAP_CHARS)
+        for end in range(limit, 0, -1):
+            if (end == len(text) or text[end] == " ") and merged.endswith(text[:end]):
+                overlap = end
+                break
+        remainder = text[overlap:].lstrip()
+        merged = f"{merged} {remainder}" if remainder else merged
+    return merged
+
+
+def mmr_order(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_: float = MMR_LAMBDA,
+) -> List[int]:
+    """
+    Indices of up to k candidates chosen greedily by maximal marginal relevance:
+    lambda * sim(query, d) - (1 - lambda) * max sim(d, already selected).
+    """
+    n = len(candidate_vectors)
+    if n == 0 or k <= 0:
+        return []
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1.0)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, n)):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy if selected else relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = similarity[best] if len(selected) == 1 else np.maximum(redundancy, similarity[best])
+    return selected
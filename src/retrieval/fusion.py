@@ -0,0 +1,32 @@
+"""Rank fusion of result lists from different retrievers."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+# Constant from the original RRF paper (Cormack et al., 2009); damps the head of each list
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge match lists ({"id", "score", "metadata"}) by summing 1 / (k + rank) across lists.
+
+    Raw scores are not comparable across retrievers (cosine similarities vs BM25), so they
+    play no part in the order. The fused score goes in "fusion_score"; "score" keeps the
+    first list's score and is None for ids only the other lists found. The first list's
+    metadata wins for ids found in several.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for list_index, matches in enumerate(result_lists):
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.get(match["id"])
+            if entry is None:
+                entry = fused[match["id"]] = {
+                    "id": match["id"],
+                    "score": match["score"] if list_index == 0 else None,
+                    "fusion_score": 0.0,
+                    "metadata": match["metadata"],
+                }
+            entry["fusion_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m["fusion_score"], reverse=True)
@@ -15,38 +15,66 @@ to test first version of the pinecone database comment out the code below this l
 
 from __future__ import annotations
 
+import functools
+import logging
 import os
-import sys # Import sys for potential exit on critical errors
 
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from pinecone import Pinecone # No need for ServerlessSpec if not creating index
 
 load_dotenv()
 
-# Initialize OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Initialize Pinecone client
-pinecone_client = Pinecone(
-    api_key=os.getenv("PINECONE_API_KEY")
-)
+logger = logging.getLogger(__name__)
 
 # Define your Pinecone index name
 PINECONE_INDEX_NAME = "take-home-project" # Your actual index name
 
+# The local backend (VECTOR_STORE_BACKEND=local) runs without the hosted service,
+# so only connect to Pinecone when it is the selected vector store.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+
+# Clients are built on first use rather than at import time: importing openai and
+# pinecone is a large share of the MCP server's cold start, and a failed connection
+# should surface as an error to the caller instead of exiting the process.
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    """Shared AsyncOpenAI client (one connection pool per process)."""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_pinecone_client():
+    from pinecone import Pinecone # No need for ServerlessSpec if not creating index
+
+    return Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+
 # --- REMOVED INDEX CREATION LOGIC ---
 # Assuming the index 'take-home-project' is already created manually in your Pinecone console.
-# If the index does not exist, this script will fail when trying to connect to it.
-
-try:
-    # Connect to the Pinecone index
-    index = pinecone_client.Index(PINECONE_INDEX_NAME)
-    print(f"Successfully connected to Pinecone index: {PINECONE_INDEX_NAME}")
-    # Optional: Verify index status
-    # index_description = pinecone_client.describe_index(PINECONE_INDEX_NAME)
-    # print(f"Index status: {index_description.status.state}")
-except Exception as e:
-    print(f"Error connecting to Pinecone index '{PINECONE_INDEX_NAME}': {e}")
-    print("Please ensure the index exists in your Pinecone console and your API key/environment are correct.")
-    sys.exit(1) # Exit if connection fails
\ No newline at end of file
+# If the index does not exist, this will fail when trying to connect to it.
+
+@functools.lru_cache(maxsize=None)
+def get_pinecone_index():
+    """Handle to the Pinecone index; raises RuntimeError if it cannot be opened."""
+    try:
+        index = get_pinecone_client().Index(PINECONE_INDEX_NAME)
+    except Exception as e:
+        raise RuntimeError(
+            f"Error connecting to Pinecone index '{PINECONE_INDEX_NAME}': {e}. Please ensure the index "
+            "exists in your Pinecone console and your API key/environment are correct."
+        ) from e
+    logger.info(f"Successfully connected to Pinecone index: {PINECONE_INDEX_NAME}")
+    return index
+
+
+def __getattr__(name: str):
+    """Module attributes kept for existing imports (`from src.utils.clients import openai_client, index`)."""
+    if name == "openai_client":
+        return get_openai_client()
+    if name == "pinecone_client":
+        return get_pinecone_client() if VECTOR_STORE_BACKEND == "pinecone" else None
+    if name == "index":
+        return get_pinecone_index() if VECTOR_STORE_BACKEND == "pinecone" else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,94 @@
+"""
+SQLite document store for chunk text and full chunk metadata, keyed by chunk_id.
+
+The vector index only carries the fields searches filter on; the text of the handful
+of chunks a tool actually returns is fetched from here in one bulk query, optionally
+just a prefix of it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .paths import PROJECT_ROOT
+from .sqlite_db import connect
+
+# Primary data (not a cache): lives next to the local indexes rather than under CACHE_DIR.
+# Anchored to the project root so a server spawned from another directory finds it.
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", str(PROJECT_ROOT / "document_store.sqlite"))
+
+# SQLite's default limit on host parameters is 999
+_MAX_IDS_PER_QUERY = 500
+
+
+class DocumentStore:
+    """Chunk text and metadata by chunk_id."""
+
+    def __init__(self, path: Optional[str | os.PathLike] = None):
+        self.path = Path(path if path is not None else DOCUMENT_STORE_PATH)
+        self._lock = threading.Lock()
+
+        self._db = connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " chunk_id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._db.commit()
+
+    def put_chunks(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        """Insert or overwrite chunks as produced by process_single_filing."""
+        rows = []
+        for chunk in chunks:
+            metadata = {k: v for k, v in chunk.items() if k not in ("chunk_id", "text")}
+            rows.append((chunk["chunk_id"], chunk["text"], json.dumps(metadata)))
+        if not rows:
+            return 0
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO documents (chunk_id, text, metadata) VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+        return len(rows)
+
+    def get_texts(self, chunk_ids: List[str], text_chars: Optional[int] = None) -> Dict[str, str]:
+        """
+        Bulk-fetch text for chunk_ids (missing ids are absent from the result). With
+        text_chars, only that many leading characters are read and returned.
+        """
+        texts: Dict[str, str] = {}
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        column = "substr(text, 1, ?)" if text_chars is not None else "text"
+        with self._lock:
+            for start in range(0, len(unique_ids), _MAX_IDS_PER_QUERY):
+                batch = unique_ids[start:start + _MAX_IDS_PER_QUERY]
+                placeholders = ", ".join("?" for _ in batch)
+                params = ([text_chars] if text_chars is not None else []) + batch
+                texts.update(self._db.execute(
+                    f"SELECT chunk_id, {column} FROM documents WHERE chunk_id IN ({placeholders})", params
+                ).fetchall())
+        return texts
+
+    def delete(self, chunk_ids: Iterable[str]) -> int:
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        with self._lock:
+            for start in range(0, len(chunk_ids), _MAX_IDS_PER_QUERY):
+                batch = chunk_ids[start:start + _MAX_IDS_PER_QUERY]
+                placeholders = ", ".join("?" for _ in batch)
+                self._db.execute(f"DELETE FROM documents WHERE chunk_id IN ({placeholders})", batch)
+            self._db.commit()
+        return len(chunk_ids)
+
+    def iter_chunks(self) -> Iterator[Dict[str, Any]]:
+        """Every stored chunk ({"chunk_id", "text", **metadata}), e.g. to rebuild the BM25 index."""
+        with self._lock:
+            rows = self._db.execute("SELECT chunk_id, text, metadata FROM documents ORDER BY chunk_id").fetchall()
+        for chunk_id, text, metadata in rows:
+            yield {"chunk_id": chunk_id, "text": text, **json.loads(metadata)}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
@@ -0,0 +1,126 @@
+"""
+SQLite store of financial facts extracted at ingest time.
+
+One row per (ticker, fiscal_year, fiscal_quarter, metric); fiscal_quarter is 0 for
+annual (10-K) figures. Every fact keeps the filing and chunk IDs it was read from so
+tool responses can cite their source.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .paths import CACHE_DIR
+from .sqlite_db import connect
+
+FACTS_DB_PATH = os.getenv("FACTS_DB_PATH", str(CACHE_DIR / "financial_facts.sqlite"))
+
+
+class FactsStore:
+    """Indexed lookups over extracted facts."""
+
+    def __init__(self, path: Optional[str | os.PathLike] = None):
+        self.path = Path(path if path is not None else FACTS_DB_PATH)
+        self._lock = threading.Lock()
+
+        self._db = connect(self.path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " ticker TEXT NOT NULL, fiscal_year INTEGER NOT NULL, fiscal_quarter INTEGER NOT NULL,"
+            " metric TEXT NOT NULL, value REAL NOT NULL, unit_scale INTEGER NOT NULL,"
+            " form_type TEXT NOT NULL, filing_date TEXT NOT NULL,"
+            " source_chunk_ids TEXT NOT NULL DEFAULT '[]', source_rank INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (ticker, fiscal_year, fiscal_quarter, metric))"
+        )
+        self._db.commit()
+
+    def upsert_facts(self, facts: Iterable[Any]) -> int:
+        """
+        Insert facts (FinancialFact instances or dicts with the same fields).
+
+        An existing row is only replaced by a fact with a lower source_rank, or the same
+        rank from a filing at least as recent: a filing's own period beats a comparative
+        column in a later filing, and re-ingesting a filing refreshes its rows.
+        """
+        rows = []
+        for fact in facts:
+            data = fact if isinstance(fact, dict) else asdict(fact)
+            rows.append((
+                data["ticker"].upper(), int(data["fiscal_year"]), int(data["fiscal_quarter"]),
+                data["metric"], float(data["value"]), int(data["unit_scale"]),
+                data["form_type"], data["filing_date"],
+                json.dumps(list(data.get("source_chunk_ids") or [])), int(data.get("source_rank", 0)),
+            ))
+        if not rows:
+            return 0
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO facts (ticker, fiscal_year, fiscal_quarter, metric, value, unit_scale,"
+                " form_type, filing_date, source_chunk_ids, source_rank)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (ticker, fiscal_year, fiscal_quarter, metric) DO UPDATE SET"
+                " value = excluded.value, unit_scale = excluded.unit_scale, form_type = excluded.form_type,"
+                " filing_date = excluded.filing_date, source_chunk_ids = excluded.source_chunk_ids,"
+                " source_rank = excluded.source_rank"
+                " WHERE excluded.source_rank < facts.source_rank"
+                " OR (excluded.source_rank = facts.source_rank AND excluded.filing_date >= facts.filing_date)",
+                rows,
+            )
+            self._db.commit()
+        return len(rows)
+
+    def delete_filings(self, filings: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        Remove the facts read from each (ticker, form_type, filing_date) filing; returns the
+        number of rows deleted. A comparative figure another filing lost to them is not
+        restored (run extract_facts to rebuild the store from every filing).
+        """
+        rows = [(ticker.upper(), form_type, filing_date) for ticker, form_type, filing_date in filings]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "DELETE FROM facts WHERE ticker = ? AND form_type = ? AND filing_date = ?", rows
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def get_facts(
+        self,
+        ticker: str,
+        fiscal_year: int,
+        metrics: List[str],
+        fiscal_quarter: int = 0,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return {metric: fact} for whichever of `metrics` are stored; missing ones are absent."""
+        if not metrics:
+            return {}
+        placeholders = ", ".join("?" for _ in metrics)
+        with self._lock:
+            cursor = self._db.execute(
+                "SELECT * FROM facts WHERE ticker = ? AND fiscal_year = ? AND fiscal_quarter = ?"
+                f" AND metric IN ({placeholders})",
+                (ticker.upper(), int(fiscal_year), int(fiscal_quarter), *metrics),
+            )
+            rows = cursor.fetchall()
+        facts = {}
+        for row in rows:
+            fact = dict(row)
+            fact["source_chunk_ids"] = json.loads(fact["source_chunk_ids"])
+            facts[fact["metric"]] = fact
+        return facts
+
+    def get_fact(self, ticker: str, fiscal_year: int, metric: str, fiscal_quarter: int = 0) -> Optional[Dict[str, Any]]:
+        return self.get_facts(ticker, fiscal_year, [metric], fiscal_quarter).get(metric)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
@@ -0,0 +1,54 @@
+"""
+Index "generation" counter shared between the ingestion pipeline and the MCP server.
+
+The pipeline bumps the counter after every successful upsert run; the server compares
+it against the value it last saw to know when cached responses may be stale. The
+counter is a small file under CACHE_DIR so it works across processes.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .paths import CACHE_DIR
+
+GENERATION_FILE = CACHE_DIR / "index_generation"
+
+
+def read_index_generation(path: Path = GENERATION_FILE) -> int:
+    try:
+        return int(path.read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_index_generation(path: Path = GENERATION_FILE) -> int:
+    """Increment the counter (write-then-rename so readers never see a partial file)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = read_index_generation(path) + 1
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+
+class GenerationWatcher:
+    """Cheap change detection: stat the counter file and only re-read it when it changed."""
+
+    def __init__(self, path: Path = GENERATION_FILE):
+        self.path = path
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._generation = 0
+
+    def current(self) -> int:
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._generation = read_index_generation(self.path)
+        return self._generation
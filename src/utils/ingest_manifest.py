@@ -0,0 +1,75 @@
+"""
+SQLite manifest of what each ingested filing contributed to the indexes.
+
+One row per filing, keyed "<ticker dir>/<file name>": a hash of the file's content, a
+hash of the ingest configuration (chunker code and parameters, embedding model) it was
+processed with, and the chunk IDs it produced. A later run skips filings whose hashes
+are unchanged and deletes the IDs a re-processed (or removed) filing no longer emits.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .paths import CACHE_DIR
+from .sqlite_db import connect
+
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", str(CACHE_DIR / "ingest_manifest.sqlite"))
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    config_hash: str
+    chunk_ids: List[str]
+
+
+class IngestManifest:
+    """Per-filing ingest records."""
+
+    def __init__(self, path: Optional[str | os.PathLike] = None):
+        self.path = Path(path if path is not None else INGEST_MANIFEST_PATH)
+        self._lock = threading.Lock()
+
+        self._db = connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS filings ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " content_hash TEXT NOT NULL, config_hash TEXT NOT NULL, chunk_ids TEXT NOT NULL DEFAULT '[]')"
+        )
+        self._db.commit()
+
+    def entries(self) -> Dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, size, mtime_ns, content_hash, config_hash, chunk_ids FROM filings"
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row[:5], json.loads(row[5])) for row in rows}
+
+    def record(self, entries: Iterable[ManifestEntry]) -> int:
+        rows = [
+            (e.path, e.size, e.mtime_ns, e.content_hash, e.config_hash, json.dumps(e.chunk_ids)) for e in entries
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO filings (path, size, mtime_ns, content_hash, config_hash, chunk_ids)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+        return len(rows)
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM filings WHERE path = ?", [(key,) for key in keys])
+            self._db.commit()
@@ -0,0 +1,63 @@
+"""
+Fixed-bucket latency histograms.
+
+Timings go into log-spaced buckets, so memory stays bounded however many are recorded
+and recording is a bisect plus two additions. Percentiles are read from the buckets
+(within one bucket width, ~10%).
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Dict, List
+
+# Bucket upper bounds: 10 us to ~100 s, growing 10% per bucket
+BUCKET_GROWTH = 1.1
+_BUCKET_BOUNDS: List[float] = []
+_bound = 1e-5
+while _bound < 100.0:
+    _BUCKET_BOUNDS.append(_bound)
+    _bound *= BUCKET_GROWTH
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with exact count, sum and max."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped at the observed max)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                bound = _BUCKET_BOUNDS[i] if i < len(_BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Milliseconds, rounded for display."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1e3, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1e3, 3),
+            "p95_ms": round(self.percentile(95) * 1e3, 3),
+            "p99_ms": round(self.percentile(99) * 1e3, 3),
+            "max_ms": round(self.max * 1e3, 3),
+        }
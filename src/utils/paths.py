@@ -0,0 +1,13 @@
+"""Filesystem locations for on-disk caches and derived indexes."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Everything the server and pipeline persist between runs lives under one directory
+# so it can be wiped (or mounted) as a unit. Anchored to the project root because the
+# MCP server is spawned by agents from arbitrary working directories.
+CACHE_DIR = Path(os.getenv("SEC_CACHE_DIR", PROJECT_ROOT / ".cache"))
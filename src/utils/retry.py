@@ -0,0 +1,41 @@
+"""Classification of errors from the OpenAI and Pinecone clients for retry decisions."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+# Request timeout, conflict (e.g. a concurrent index update) and rate limit
+RETRYABLE_STATUS = {408, 409, 429}
+
+# Network failures that the client libraries raise outside the OSError hierarchy
+# (openai's connection errors, urllib3's under Pinecone), matched by name so neither
+# library has to be imported here
+_NETWORK_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "MaxRetryError",
+    "ProtocolError",
+    "ReadTimeoutError",
+    "ConnectTimeoutError",
+    "NewConnectionError",
+}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """The HTTP status an API error carries (openai: status_code, Pinecone: status)."""
+    for attribute in ("status_code", "status"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (asyncio.TimeoutError, OSError)):
+        return True
+    return any(cls.__name__ in _NETWORK_ERROR_NAMES for cls in type(error).__mro__)
@@ -0,0 +1,23 @@
+"""
+Connection setup shared by the SQLite-backed stores and caches.
+
+Each store opens one connection per instance and guards it with its own lock, so an
+instance can be shared between threads (the MCP server's workers, asyncio.to_thread
+calls); check_same_thread is off for that. Write-ahead logging lets readers, such as
+a running MCP server, keep reading while an ingest run writes.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+
+
+def connect(path: str | os.PathLike) -> sqlite3.Connection:
+    """Open a WAL-mode connection usable from any thread, creating the parent directory."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
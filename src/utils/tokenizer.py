@@ -0,0 +1,31 @@
+"""
+Shared tiktoken encoding for the embedding model.
+
+Loading an encoding reads (or downloads) its BPE ranks, so it is done once per process,
+on first use, and reused by the chunker and the embedding pipeline.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import List
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str = EMBEDDING_MODEL):
+    import tiktoken
+
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """count_tokens for many texts in one call; tiktoken encodes the batch on a thread pool."""
+    if not texts:
+        return []
+    return [len(tokens) for tokens in get_encoding().encode_batch(texts)]
@@ -0,0 +1,65 @@
+"""Common interface for the vector stores backing semantic search."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector store contract shared by the Pinecone and local backends.
+
+    Vectors are upserted in the same shape Pinecone expects
+    ({"id": ..., "values": [...], "metadata": {...}}) and queries return plain
+    match dictionaries ({"id": ..., "score": ..., "metadata": {...}}), so callers
+    never need to know which backend they are talking to.
+    """
+
+    @abstractmethod
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Return the top_k matches for a query vector, best first."""
+
+    def query_many(
+        self,
+        queries: List[Dict[str, Any]],
+        include_metadata: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several queries ({"vector": ..., "top_k": ..., "filter": ...}) and return
+        one match list per query. Backends override this to score queries together.
+        """
+        return [
+            self.query(
+                q["vector"], top_k=q.get("top_k", 10), filter=q.get("filter"), include_metadata=include_metadata
+            )
+            for q in queries
+        ]
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors (lists or arrays) by id; ids that are not in the index are omitted."""
+        raise NotImplementedError(f"{type(self).__name__} does not support fetching vectors")
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite vectors keyed by their id."""
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove vectors by id; ids that are not in the index are ignored."""
+        raise NotImplementedError(f"{type(self).__name__} does not support deleting vectors")
+
+    def reopen(self) -> "VectorStore":
+        """
+        A store over the index as another process last wrote it, with the same settings.
+        Remote backends always read the live index, so they return themselves.
+        """
+        return self
+
+    def flush(self) -> None:
+        """Persist pending writes. Remote backends write through, so this is a no-op."""
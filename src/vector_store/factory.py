@@ -0,0 +1,52 @@
+"""Select the vector store backend from the environment."""
+
+from __future__ import annotations
+
+import os
+
+from dotenv import load_dotenv
+
+from ..utils.paths import PROJECT_ROOT
+from .base import VectorStore
+
+load_dotenv()
+
+# "pinecone" (hosted, default) or "local" (memory-mapped index under LOCAL_INDEX_DIR)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+# Anchored to the project root so a server spawned from another directory opens the same index
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", str(PROJECT_ROOT / "local_index"))
+# Local backend only: "none" (exact float32 scan), or an "int8", "binary" or "prefix"
+# (Matryoshka, LOCAL_PREFIX_DIMENSIONS wide) first pass with exact re-scoring
+LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none").lower()
+LOCAL_PREFIX_DIMENSIONS = int(os.getenv("LOCAL_PREFIX_DIMENSIONS", "128"))
+# Candidates re-scored: top_k * factor, but at least LOCAL_RESCORE_CANDIDATES; 0 picks the per-mode default
+LOCAL_RESCORE_FACTOR = int(os.getenv("LOCAL_RESCORE_FACTOR", "0"))
+LOCAL_RESCORE_CANDIDATES = int(os.getenv("LOCAL_RESCORE_CANDIDATES", "0"))
+# Local backend only: "none" (scan every row) or "ivf" (probe the LOCAL_IVF_NPROBE closest inverted lists)
+LOCAL_ANN_INDEX = os.getenv("LOCAL_ANN_INDEX", "none").lower()
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "16"))
+# Number of inverted lists when the index is (re)trained; 0 picks sqrt(n_vectors)
+LOCAL_IVF_LISTS = int(os.getenv("LOCAL_IVF_LISTS", "0"))
+
+
+def get_vector_store(backend: str | None = None) -> VectorStore:
+    """Build the configured VectorStore. Pinecone is only imported (and connected) when used."""
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    if backend == "local":
+        from .local_store import LocalVectorStore
+        quantization = None if LOCAL_INDEX_QUANTIZATION in ("", "none") else LOCAL_INDEX_QUANTIZATION
+        return LocalVectorStore(
+            LOCAL_INDEX_DIR,
+            quantization=quantization,
+            rescore_factor=LOCAL_RESCORE_FACTOR or None,
+            rescore_candidates=LOCAL_RESCORE_CANDIDATES or None,
+            prefix_dimensions=LOCAL_PREFIX_DIMENSIONS,
+            ann=None if LOCAL_ANN_INDEX in ("", "none") else LOCAL_ANN_INDEX,
+            nprobe=LOCAL_IVF_NPROBE,
+            n_lists=LOCAL_IVF_LISTS or None,
+        )
+    if backend == "pinecone":
+        from .pinecone_store import PineconeVectorStore
+        # Connects on the first query, so constructing the server stays cheap
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown vector store backend: {backend}")
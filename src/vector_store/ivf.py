@@ -0,0 +1,141 @@
+"""
+Inverted-file (IVF) index over the local store's unit vectors.
+
+Rows are partitioned into `n_lists` clusters by spherical k-means, trained in NumPy on a
+sample of the matrix. A query scores the centroids, then only the rows of its `nprobe`
+closest lists; with nprobe = n_lists the search is exact. New rows are assigned to their
+nearest centroid as they are inserted; the centroids are retrained once the index has
+grown well past the size they were trained on.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Below this many rows a full scan is cheap and k-means has little to work with
+IVF_MIN_ROWS = 1000
+
+# Rows of training sample per list; k-means cost is linear in the sample
+TRAINING_ROWS_PER_LIST = 64
+KMEANS_ITERATIONS = 10
+
+# Retrain once the index holds this many times the rows the centroids were trained on
+RETRAIN_GROWTH = 4
+
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_n_lists(n_rows: int) -> int:
+    return max(1, int(np.sqrt(n_rows)))
+
+
+class IVFIndex:
+    """Centroids plus one list id per matrix row; the per-list row arrays are derived."""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_rows: int):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.trained_rows = trained_rows
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + self.assignments.nbytes
+
+    # ------------------------------------------------------------------ #
+    # Building
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def train(cls, vectors: np.ndarray, n_lists: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        n = vectors.shape[0]
+        n_lists = min(n_lists or default_n_lists(n), n)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, n_lists * TRAINING_ROWS_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(n, size=sample_size, replace=False))], dtype=np.float32)
+
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(labels, minlength=n_lists)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            filled = counts > 0
+            sums[filled] = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts[filled], axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms > 0, norms, 1.0)
+            # An empty list restarts from a random sample row rather than staying dead
+            for empty in np.flatnonzero(~filled):
+                centroids[empty] = sample[rng.integers(sample_size)]
+
+        index = cls(centroids, np.zeros(0, dtype=np.int32), trained_rows=n)
+        index.assignments = index.assign(vectors)
+        return index
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest list id for each row, computed block by block."""
+        labels = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], ASSIGN_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            labels[start:start + ASSIGN_BLOCK_ROWS] = np.argmax(block @ self.centroids.T, axis=1)
+        return labels
+
+    def update(self, vectors: np.ndarray, rows: np.ndarray) -> None:
+        """Assign `rows` of `vectors` (new or overwritten) to their nearest list."""
+        if rows.size == 0:
+            return
+        if vectors.shape[0] > self.assignments.shape[0]:
+            grown = np.zeros(vectors.shape[0], dtype=np.int32)
+            grown[:self.assignments.shape[0]] = self.assignments
+            self.assignments = grown
+        self.assignments[rows] = self.assign(vectors[rows])
+        self._order = None
+
+    def keep_rows(self, keep: np.ndarray) -> None:
+        """Drop the assignments of deleted rows (`keep` is a boolean mask over the old rows)."""
+        self.assignments = self.assignments[keep]
+        self._order = None
+
+    def needs_retraining(self) -> bool:
+        return self.assignments.shape[0] > RETRAIN_GROWTH * self.trained_rows
+
+    # ------------------------------------------------------------------ #
+    # Searching
+    # ------------------------------------------------------------------ #
+    def _lists(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._order is None:
+            self._order = np.argsort(self.assignments, kind="stable").astype(np.int64)
+            self._offsets = np.searchsorted(self.assignments[self._order], np.arange(self.n_lists + 1))
+        return self._order, self._offsets
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted matrix rows in the `nprobe` lists whose centroids are closest to `query`."""
+        order, offsets = self._lists()
+        nprobe = min(max(nprobe, 1), self.n_lists)
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([order[offsets[i]:offsets[i + 1]] for i in closest])
+        return np.sort(rows)
+
+    def expected_candidates(self, nprobe: int) -> int:
+        return int(self.assignments.shape[0] * min(nprobe, self.n_lists) / self.n_lists)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, assignments=self.assignments, trained_rows=self.trained_rows)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assignments"], int(data["trained_rows"]))
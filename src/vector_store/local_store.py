@@ -0,0 +1,503 @@
+"""
+In-process vector store backed by a memory-mapped float32 matrix.
+
+Layout of an index directory:
+    vectors.npy    float32 matrix of shape (n_chunks, dimensions), L2-normalised
+    metadata.json  {"ids": [...], "metadata": [...]} sidecar aligned with the matrix rows
+    vectors.int8.npy    int8 codes of the same rows, with per-dimension scales in int8_scales.npy
+    vectors.binary.npy  packed sign bits of the same rows (see quantization.py)
+    vectors.prefix<d>.npy  optional re-normalised d-dimensional Matryoshka prefixes
+    ivf.npz             optional IVF centroids and per-row list ids (see ivf.py)
+
+Queries are scored with a single NumPy matrix-vector product and support the same
+Pinecone-style metadata filters the server builds (see metadata_filter.py). With
+quantization="int8", "binary" or "prefix", the compact matrix is scanned instead and only
+the best max(top_k * rescore_factor, rescore_candidates) candidates are re-scored exactly
+against the float32 rows, so only those pages of the float file are read. With ann="ivf", only the rows of the
+`nprobe` inverted lists closest to the query are scored.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter, defaultdict
+import os
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base import VectorStore
+from .ivf import IVF_MIN_ROWS, IVFIndex
+from .metadata_filter import MetadataColumns
+from .quantization import (
+    QUANTIZATION_MODES,
+    binary_signatures,
+    hamming_scores,
+    int8_scores,
+    prefix_matrix,
+    prefix_scores,
+    quantize_int8,
+)
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+INT8_FILE = "vectors.int8.npy"
+INT8_SCALES_FILE = "int8_scales.npy"
+BINARY_FILE = "vectors.binary.npy"
+IVF_FILE = "ivf.npz"
+
+ANN_MODES = ("ivf",)
+DEFAULT_NPROBE = 16
+
+# Candidates re-scored exactly per requested result; sign bits need a deeper pool than int8
+DEFAULT_RESCORE_FACTORS = {"int8": 4, "binary": 10, "prefix": 1}
+# Minimum candidates re-scored per query; a Matryoshka prefix ranks coarsely, so keep a few hundred
+DEFAULT_RESCORE_CANDIDATES = {"prefix": 256}
+DEFAULT_PREFIX_DIMENSIONS = 128
+
+
+def prefix_file(dimensions: int) -> str:
+    return f"vectors.prefix{dimensions}.npy"
+
+
+class LocalVectorStore(VectorStore):
+    """Brute-force cosine similarity search over a memory-mapped matrix."""
+
+    def __init__(
+        self,
+        index_dir: str | os.PathLike,
+        dimensions: int = 512,
+        quantization: Optional[str] = None,
+        rescore_factor: Optional[int] = None,
+        rescore_candidates: Optional[int] = None,
+        prefix_dimensions: int = DEFAULT_PREFIX_DIMENSIONS,
+        ann: Optional[str] = None,
+        nprobe: int = DEFAULT_NPROBE,
+        n_lists: Optional[int] = None,
+    ):
+        if quantization is not None and quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}.")
+        if ann is not None and ann not in ANN_MODES:
+            raise ValueError(f"Unknown ANN index {ann!r}; expected one of {ANN_MODES}.")
+        self.index_dir = Path(index_dir)
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor or DEFAULT_RESCORE_FACTORS.get(quantization, 1)
+        self.rescore_candidates = rescore_candidates or DEFAULT_RESCORE_CANDIDATES.get(quantization, 0)
+        self.prefix_dimensions = prefix_dimensions
+        # First-pass matrices; loaded memory-mapped or built from the float matrix on first use
+        self._int8: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._binary: Optional[np.ndarray] = None
+        self._prefix: Optional[np.ndarray] = None
+        self.ann = ann
+        self.nprobe = nprobe
+        self.n_lists = n_lists
+        # Once built, the IVF index is kept up to date by every writer, whatever its `ann` setting
+        self._ivf: Optional[IVFIndex] = None
+        self.plans: Counter = Counter()  # query plans chosen by _plan, for benchmarks
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._columns: Optional[MetadataColumns] = None
+        # Upserts are buffered and merged lazily so that ingesting many filings
+        # does not copy the whole matrix once per batch.
+        self._pending: Dict[str, tuple[np.ndarray, Dict[str, Any]]] = {}
+        self._dirty = False
+        # Queries run on the server's worker threads; merging pending writes must not race them.
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        self._consolidate()
+        return len(self._ids)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def _load(self) -> None:
+        vectors_path = self.index_dir / VECTORS_FILE
+        metadata_path = self.index_dir / METADATA_FILE
+        if not vectors_path.exists() or not metadata_path.exists():
+            logger.info(f"No local index found at {self.index_dir}; starting empty.")
+            return
+
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self._ids = sidecar["ids"]
+        self._metadata = sidecar["metadata"]
+        if len(self._ids) != self._vectors.shape[0]:
+            raise ValueError(
+                f"Local index at {self.index_dir} is corrupt: {len(self._ids)} ids "
+                f"for {self._vectors.shape[0]} vectors."
+            )
+        self.dimensions = self._vectors.shape[1]
+        self._id_to_row = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._columns = None
+        self._int8, self._binary, self._prefix = None, None, None
+        if self.quantization == "int8" and (self.index_dir / INT8_FILE).exists():
+            codes = np.load(self.index_dir / INT8_FILE, mmap_mode="r")
+            if codes.shape == self._vectors.shape:
+                self._int8 = (codes, np.load(self.index_dir / INT8_SCALES_FILE))
+        elif self.quantization == "binary" and (self.index_dir / BINARY_FILE).exists():
+            signatures = np.load(self.index_dir / BINARY_FILE, mmap_mode="r")
+            if signatures.shape[0] == self._vectors.shape[0]:
+                self._binary = signatures
+        elif self.quantization == "prefix" and (self.index_dir / prefix_file(self.prefix_dimensions)).exists():
+            prefix = np.load(self.index_dir / prefix_file(self.prefix_dimensions), mmap_mode="r")
+            if prefix.shape[0] == self._vectors.shape[0]:
+                self._prefix = prefix
+        self._ivf = None
+        if (self.index_dir / IVF_FILE).exists():
+            ivf = IVFIndex.load(self.index_dir / IVF_FILE)
+            if ivf.assignments.shape[0] == self._vectors.shape[0]:
+                self._ivf = ivf
+            else:
+                logger.warning(f"Ignoring stale IVF index in {self.index_dir}; it will be rebuilt.")
+        logger.info(f"Loaded local index from {self.index_dir}: {len(self._ids)} vectors.")
+
+    def reopen(self) -> "LocalVectorStore":
+        """
+        A fresh store over the files now on disk. Writers replace files rather than
+        overwrite them, so queries still running on this instance keep their memmaps.
+        Pending (unflushed) writes are not carried over.
+        """
+        return type(self)(
+            self.index_dir,
+            dimensions=self.dimensions,
+            quantization=self.quantization,
+            rescore_factor=self.rescore_factor,
+            rescore_candidates=self.rescore_candidates,
+            prefix_dimensions=self.prefix_dimensions,
+            ann=self.ann,
+            nprobe=self.nprobe,
+            n_lists=self.n_lists,
+        )
+
+    def flush(self) -> None:
+        """Write the matrix and sidecar to disk and re-open the matrix memory-mapped."""
+        self._consolidate()
+        if not self._dirty:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if self.ann == "ivf" and (self._ivf is None or self._ivf.needs_retraining()):
+            self._train_ivf()
+        if self._ivf is not None:
+            self._ivf.save(self.index_dir / IVF_FILE)
+
+        # Quantized copies are written for every index (a quarter and a thirty-second of the
+        # float file), so a server can switch modes without re-reading the whole float matrix.
+        codes, scales = quantize_int8(self._vectors)
+        arrays = {
+            VECTORS_FILE: np.ascontiguousarray(self._vectors, dtype=np.float32),
+            INT8_FILE: codes,
+            INT8_SCALES_FILE: scales,
+            BINARY_FILE: binary_signatures(self._vectors),
+        }
+        if self.quantization == "prefix":
+            # Only the configured truncation is written; it is a quarter of the float file at 128-d
+            arrays[prefix_file(self.prefix_dimensions)] = prefix_matrix(self._vectors, self.prefix_dimensions)
+        for name, array in arrays.items():
+            with open(self.index_dir / (name + ".tmp"), "wb") as f:
+                np.save(f, array)
+        metadata_tmp = self.index_dir / (METADATA_FILE + ".tmp")
+        with open(metadata_tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "metadata": self._metadata}, f)
+        for name in arrays:
+            os.replace(self.index_dir / (name + ".tmp"), self.index_dir / name)
+        os.replace(metadata_tmp, self.index_dir / METADATA_FILE)
+
+        self._dirty = False
+        self._load()
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        for vector in vectors:
+            values = np.asarray(vector["values"], dtype=np.float32)
+            if values.shape != (self.dimensions,):
+                raise ValueError(
+                    f"Vector {vector['id']} has shape {values.shape}, expected ({self.dimensions},)."
+                )
+            # Ingestion upserts from several threads; the buffer must not change while it is merged
+            with self._lock:
+                self._pending[vector["id"]] = (values, dict(vector.get("metadata") or {}))
+
+    def _consolidate(self) -> None:
+        """Merge buffered upserts into the in-memory matrix."""
+        if not self._pending:
+            return
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+
+    def _merge_pending(self) -> None:
+        new_rows = []
+        changed_rows = []
+        vectors = np.array(self._vectors, dtype=np.float32)  # detach from the memmap
+        for chunk_id, (values, metadata) in self._pending.items():
+            norm = np.linalg.norm(values)
+            values = values / norm if norm > 0 else values
+            row = self._id_to_row.get(chunk_id)
+            if row is None:
+                self._id_to_row[chunk_id] = len(self._ids)
+                changed_rows.append(len(self._ids))
+                self._ids.append(chunk_id)
+                self._metadata.append(metadata)
+                new_rows.append(values)
+            else:
+                vectors[row] = values
+                self._metadata[row] = metadata
+                changed_rows.append(row)
+
+        if new_rows:
+            vectors = np.vstack([vectors, np.stack(new_rows)])
+        self._vectors = vectors
+        self._columns = None
+        self._int8, self._binary, self._prefix = None, None, None
+        if self._ivf is not None:
+            # Inserts join their nearest existing list; centroids are retrained on flush once stale
+            self._ivf.update(vectors, np.asarray(changed_rows, dtype=np.int64))
+        self._pending = {}
+        self._dirty = True
+
+    def delete(self, ids: List[str]) -> None:
+        """Drop rows by id; the matrix is compacted in memory and written on the next flush."""
+        self._consolidate()
+        with self._lock:
+            rows = [self._id_to_row[chunk_id] for chunk_id in set(ids) if chunk_id in self._id_to_row]
+            if not rows:
+                return
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[rows] = False
+            self._vectors = np.asarray(self._vectors, dtype=np.float32)[keep]
+            self._ids = [chunk_id for chunk_id, kept in zip(self._ids, keep) if kept]
+            self._metadata = [metadata for metadata, kept in zip(self._metadata, keep) if kept]
+            self._id_to_row = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+            self._columns = None
+            self._int8, self._binary, self._prefix = None, None, None
+            if self._ivf is not None:
+                self._ivf.keep_rows(keep)
+            self._dirty = True
+
+    # ------------------------------------------------------------------ #
+    # Filtering
+    # ------------------------------------------------------------------ #
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        if self._columns is None:
+            self._columns = MetadataColumns(self._metadata)
+        return self._columns.filter_mask(filter)
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        self._consolidate()
+        if not self._ids or top_k <= 0:
+            return []
+
+        mask = self._filter_mask(filter) if filter else None
+        rows = np.flatnonzero(mask) if mask is not None else None
+        if rows is not None and rows.size == 0:
+            return []
+        return self._search(mask, rows, self._normalise([vector]), [top_k], include_metadata)[0]
+
+    def query_many(
+        self,
+        queries: List[Dict[str, Any]],
+        include_metadata: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Score many queries with one matrix-matrix product per distinct filter, so the
+        (filtered) matrix is streamed from memory once per group instead of once per query.
+        """
+        self._consolidate()
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not self._ids:
+            return results
+
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for i, q in enumerate(queries):
+            groups[json.dumps(q.get("filter") or {}, sort_keys=True)].append(i)
+
+        for filter_key, members in groups.items():
+            filter = json.loads(filter_key)
+            mask = self._filter_mask(filter) if filter else None
+            rows = np.flatnonzero(mask) if mask is not None else None
+            if rows is not None and rows.size == 0:
+                continue
+            query_matrix = self._normalise([queries[i]["vector"] for i in members])
+            top_ks = [queries[i].get("top_k", 10) for i in members]
+            for i, matches in zip(members, self._search(mask, rows, query_matrix, top_ks, include_metadata)):
+                results[i] = matches
+        return results
+
+    @staticmethod
+    def _normalise(vectors: List[List[float]]) -> np.ndarray:
+        query_matrix = np.stack([np.asarray(v, dtype=np.float32) for v in vectors])
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        return query_matrix / np.where(norms > 0, norms, 1.0)
+
+    def _train_ivf(self) -> None:
+        if len(self._ids) < IVF_MIN_ROWS:
+            return
+        started = time.perf_counter()
+        self._ivf = IVFIndex.train(self._vectors, self.n_lists)
+        logger.info(
+            f"Trained IVF index ({self._ivf.n_lists} lists) over {len(self._ids)} vectors "
+            f"in {time.perf_counter() - started:.1f}s."
+        )
+
+    def _ivf_for_queries(self) -> Optional[IVFIndex]:
+        if self.ann != "ivf":
+            return None
+        with self._lock:
+            if self._ivf is None and len(self._ids) >= IVF_MIN_ROWS:
+                self._train_ivf()
+                if not self._dirty and (self.index_dir / VECTORS_FILE).exists():
+                    self._ivf.save(self.index_dir / IVF_FILE)
+            return self._ivf
+
+    def _plan(self, ivf: Optional[IVFIndex], n_matching: int) -> Tuple[str, int]:
+        """
+        ("scan", 0) to score the `n_matching` filtered rows directly, or ("probe", nprobe) to
+        search the IVF lists and post-filter. The probe widens by 1 / selectivity so its lists
+        still hold about as many matching rows as an unfiltered probe; whichever path touches
+        fewer rows wins.
+        """
+        if ivf is None or n_matching == 0:
+            return "scan", 0
+        selectivity = n_matching / len(self._ids)
+        nprobe = min(ivf.n_lists, math.ceil(self.nprobe / selectivity))
+        if ivf.expected_candidates(nprobe) >= n_matching:
+            return "scan", 0
+        return "probe", nprobe
+
+    def _search(
+        self,
+        mask: Optional[np.ndarray],
+        rows: Optional[np.ndarray],
+        query_matrix: np.ndarray,
+        top_ks: List[int],
+        include_metadata: bool,
+    ) -> List[List[Dict[str, Any]]]:
+        """Rank `rows` (all rows when None, else the rows set in `mask`) as chosen by `_plan`."""
+        ivf = self._ivf_for_queries()
+        strategy, nprobe = self._plan(ivf, len(self._ids) if rows is None else rows.size)
+        self.plans[strategy] += 1
+        if strategy == "scan":
+            return self._rank(rows, query_matrix, top_ks, include_metadata)
+
+        results = []
+        for column, top_k in enumerate(top_ks):
+            candidates = ivf.probe(query_matrix[column], nprobe)
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            if candidates.size < top_k:
+                # The probed lists hold too few matching rows to fill the page
+                candidates = rows
+            results.extend(self._rank(candidates, query_matrix[column:column + 1], [top_k], include_metadata))
+        return results
+
+    def _approximate_scores(self, rows: Optional[np.ndarray], query_matrix: np.ndarray) -> np.ndarray:
+        """First-pass scores (candidates, queries) from the quantized matrix."""
+        with self._lock:
+            if self.quantization == "int8" and self._int8 is None:
+                self._int8 = quantize_int8(self._vectors)
+            elif self.quantization == "binary" and self._binary is None:
+                self._binary = binary_signatures(self._vectors)
+            elif self.quantization == "prefix" and self._prefix is None:
+                self._prefix = prefix_matrix(self._vectors, self.prefix_dimensions)
+            quantized_int8, quantized_binary, prefix = self._int8, self._binary, self._prefix
+        if self.quantization == "int8":
+            codes, scales = quantized_int8
+            return int8_scores(codes, scales, query_matrix, rows)
+        if self.quantization == "prefix":
+            return prefix_scores(prefix, query_matrix, rows)
+        return hamming_scores(quantized_binary, query_matrix, rows)
+
+    def _rank(
+        self,
+        rows: Optional[np.ndarray],
+        query_matrix: np.ndarray,
+        top_ks: List[int],
+        include_metadata: bool,
+    ) -> List[List[Dict[str, Any]]]:
+        """Top matches per query over `rows` (all rows when None); scores are always exact."""
+        if self.quantization is None:
+            if rows is None or rows.size > len(self._ids) // 2:
+                # Gathering most rows costs more than scoring them all and dropping the rest
+                all_scores = self._vectors @ query_matrix.T  # (candidates, queries)
+                all_scores = all_scores[rows] if rows is not None else all_scores
+            else:
+                all_scores = self._vectors[rows] @ query_matrix.T
+            return [
+                self._top_matches(all_scores[:, column], rows, top_k, include_metadata)
+                for column, top_k in enumerate(top_ks)
+            ]
+
+        approximate = self._approximate_scores(rows, query_matrix)
+        results = []
+        for column, top_k in enumerate(top_ks):
+            scores = approximate[:, column]
+            if top_k <= 0:
+                results.append([])
+                continue
+            pool = min(max(top_k * self.rescore_factor, self.rescore_candidates), scores.shape[0])
+            if pool <= 0:
+                results.append([])
+                continue
+            candidates = np.argpartition(-scores, pool - 1)[:pool]
+            candidate_rows = rows[candidates] if rows is not None else candidates
+            # Sorted row order keeps the reads of the memory-mapped float matrix sequential
+            candidate_rows = np.sort(candidate_rows)
+            exact = self._vectors[candidate_rows] @ query_matrix[column]
+            results.append(self._top_matches(exact, candidate_rows, top_k, include_metadata))
+        return results
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Stored (unit-normalised) vectors; rows are views into the memory-mapped matrix."""
+        self._consolidate()
+        return {
+            chunk_id: self._vectors[self._id_to_row[chunk_id]]
+            for chunk_id in ids if chunk_id in self._id_to_row
+        }
+
+    def _top_matches(
+        self,
+        scores: np.ndarray,
+        rows: Optional[np.ndarray],
+        top_k: int,
+        include_metadata: bool,
+    ) -> List[Dict[str, Any]]:
+        """Select the top_k scores; `rows` maps score positions back to matrix rows."""
+        if top_k <= 0 or scores.shape[0] == 0:
+            return []
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        matches = []
+        for position in top:
+            row = int(rows[position]) if rows is not None else int(position)
+            matches.append({
+                "id": self._ids[row],
+                "score": float(scores[position]),
+                "metadata": self._metadata[row] if include_metadata else {},
+            })
+        return matches
@@ -0,0 +1,204 @@
+"""
+Pinecone-style metadata filters evaluated as vectorised NumPy masks.
+
+Supports equality plus $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin/$exists and $and/$or over a
+list of per-row metadata dicts. Shared by the local vector store and the lexical index
+so both honour exactly the same filters the server builds.
+
+The fields searches filter on (ticker, form_type, fiscal_year, chunk_type, item_id) have
+few distinct values, so each is indexed once as a row set per value: a packed bitmap for
+common values, sorted row ids for rare ones. A filter is then a handful of bitwise
+AND/OR/NOT operations over n/8 bytes instead of a comparison per row. Fields with too
+many distinct values (or unhashable ones) fall back to the column comparisons.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Fields with more distinct values than this (free text, ids) are not worth indexing
+MAX_BITMAP_CARDINALITY = 65536
+
+_RANGE_OPS = {
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class FieldBitmaps:
+    """Rows holding each distinct value of one field (None stands for a missing value)."""
+
+    def __init__(self, n_rows: int, row_sets: Dict[Any, np.ndarray]):
+        self.n_rows = n_rows
+        self.row_sets = row_sets  # value -> packed uint8 bitmap, or sorted int64 row ids
+        self.numeric = all(_is_number(value) for value in row_sets if value is not None)
+
+    @classmethod
+    def build(cls, values: List[Any]) -> Optional["FieldBitmaps"]:
+        codes_by_value: Dict[Any, int] = {}
+        try:
+            codes = np.fromiter(
+                (codes_by_value.setdefault(value, len(codes_by_value)) for value in values),
+                dtype=np.int64, count=len(values),
+            )
+        except TypeError:  # Lists or dicts as values
+            return None
+        if len(codes_by_value) > MAX_BITMAP_CARDINALITY:
+            return None
+
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(codes_by_value) + 1))
+        n_bytes = (len(values) + 7) // 8
+        row_sets = {}
+        for value, code in codes_by_value.items():
+            rows = order[bounds[code]:bounds[code + 1]]
+            # Row ids take 8 bytes each, so a bitmap is smaller once a value covers 1/64 of the rows
+            row_sets[value] = _to_bitmap(rows, len(values)) if rows.size * 8 > n_bytes else rows
+        return cls(len(values), row_sets)
+
+    def union(self, values: List[Any]) -> np.ndarray:
+        """Packed bitmap of the rows holding any of `values`."""
+        bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        sparse = []
+        for value in values:
+            rows = self.row_sets.get(value)
+            if rows is None:
+                continue
+            if rows.dtype == np.uint8:
+                bitmap |= rows
+            else:
+                sparse.append(rows)
+        if sparse:
+            bitmap |= _to_bitmap(np.concatenate(sparse), self.n_rows)
+        return bitmap
+
+
+def _to_bitmap(rows: np.ndarray, n_rows: int) -> np.ndarray:
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+class MetadataColumns:
+    """Lazily built columns over row-aligned metadata dicts."""
+
+    def __init__(self, metadata: List[Dict[str, Any]]):
+        self.metadata = metadata
+        self._columns: Dict[str, np.ndarray] = {}
+        self._bitmaps: Dict[str, Optional[FieldBitmaps]] = {}
+        self._all_rows = np.packbits(np.ones(len(metadata), dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def column(self, field: str) -> np.ndarray:
+        """Column of metadata values; numeric (or entirely absent) fields become float64 with NaN gaps."""
+        column = self._columns.get(field)
+        if column is None:
+            values = [metadata.get(field) for metadata in self.metadata]
+            present = [v for v in values if v is not None]
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+            self._columns[field] = column
+        return column
+
+    def condition_mask(self, field: str, condition: Any) -> np.ndarray:
+        column = self.column(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(len(column), dtype=bool)
+        for op, operand in condition.items():
+            if op == "$eq":
+                mask &= column == operand
+            elif op == "$ne":
+                mask &= column != operand
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if column.dtype != np.float64:
+                    raise ValueError(f"Range filter {op} on non-numeric field '{field}'.")
+                with np.errstate(invalid="ignore"):
+                    if op == "$gt":
+                        mask &= column > operand
+                    elif op == "$gte":
+                        mask &= column >= operand
+                    elif op == "$lt":
+                        mask &= column < operand
+                    else:
+                        mask &= column <= operand
+            elif op in ("$in", "$nin"):
+                member = np.isin(column, list(operand))
+                mask &= member if op == "$in" else ~member
+            elif op == "$exists":
+                exists = ~np.isnan(column) if column.dtype == np.float64 else np.not_equal(column, None)
+                mask &= exists if operand else ~exists
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    def bitmaps(self, field: str) -> Optional[FieldBitmaps]:
+        """Row sets per value of `field`, built on first use; None if the field is not indexable."""
+        if field not in self._bitmaps:
+            self._bitmaps[field] = FieldBitmaps.build([metadata.get(field) for metadata in self.metadata])
+        return self._bitmaps[field]
+
+    def _negate(self, bitmap: np.ndarray) -> np.ndarray:
+        return self._all_rows & ~bitmap  # keep the padding bits of the last byte clear
+
+    def condition_bitmap(self, field: str, condition: Any) -> np.ndarray:
+        """Packed bitmap of the rows matching one field condition."""
+        bitmaps = self.bitmaps(field)
+        if bitmaps is None:
+            return np.packbits(self.condition_mask(field, condition))
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        bitmap = self._all_rows
+        for op, operand in condition.items():
+            if op in ("$eq", "$ne"):
+                matching = bitmaps.union([operand])
+                bitmap = bitmap & (matching if op == "$eq" else self._negate(matching))
+            elif op in _RANGE_OPS:
+                if not bitmaps.numeric:
+                    raise ValueError(f"Range filter {op} on non-numeric field '{field}'.")
+                compare = _RANGE_OPS[op]
+                bitmap = bitmap & bitmaps.union([
+                    value for value in bitmaps.row_sets if value is not None and compare(value, operand)
+                ])
+            elif op in ("$in", "$nin"):
+                matching = bitmaps.union(list(operand))
+                bitmap = bitmap & (matching if op == "$in" else self._negate(matching))
+            elif op == "$exists":
+                missing = bitmaps.union([None])
+                bitmap = bitmap & (missing if not operand else self._negate(missing))
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return bitmap
+
+    def filter_bitmap(self, filter: Dict[str, Any]) -> np.ndarray:
+        bitmap = self._all_rows
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    bitmap = bitmap & self.filter_bitmap(sub_filter)
+            elif key == "$or":
+                any_bitmap = np.zeros_like(self._all_rows)
+                for sub_filter in condition:
+                    any_bitmap |= self.filter_bitmap(sub_filter)
+                bitmap = bitmap & any_bitmap
+            else:
+                bitmap = bitmap & self.condition_bitmap(key, condition)
+        return bitmap
+
+    def filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        return np.unpackbits(self.filter_bitmap(filter), count=len(self.metadata)).view(bool)
@@ -0,0 +1,75 @@
+"""Pinecone-backed implementation of the VectorStore interface."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .base import VectorStore
+
+
+class PineconeVectorStore(VectorStore):
+    """Thin adapter over a pinecone Index object."""
+
+    def __init__(self, index=None, max_concurrent_queries: int = 8):
+        # None: open the shared index from src.utils.clients on first use
+        self._index = index
+        self.max_concurrent_queries = max_concurrent_queries
+
+    @property
+    def index(self):
+        if self._index is None:
+            from ..utils.clients import get_pinecone_index
+            self._index = get_pinecone_index()
+        return self._index
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        response = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter if filter else None,
+        )
+        return [
+            {
+                "id": match["id"],
+                "score": match["score"],
+                "metadata": match.get("metadata") or {},
+            }
+            for match in response["matches"]
+        ]
+
+    def query_many(
+        self,
+        queries: List[Dict[str, Any]],
+        include_metadata: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """Pinecone has no multi-vector query, so fan out with bounded concurrency."""
+        def run(q: Dict[str, Any]) -> List[Dict[str, Any]]:
+            return self.query(
+                q["vector"], top_k=q.get("top_k", 10), filter=q.get("filter"), include_metadata=include_metadata
+            )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_queries) as executor:
+            return list(executor.map(run, queries))
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, List[float]]:
+        if not ids:
+            return {}
+        response = self.index.fetch(ids=list(ids))
+        return {vector_id: list(vector.values) for vector_id, vector in response.vectors.items()}
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        ids = list(ids)
+        # Pinecone accepts at most 1000 ids per delete request
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000])
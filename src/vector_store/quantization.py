@@ -0,0 +1,95 @@
+"""
+Compact approximations of the local index's float32 matrix, used for a first-pass scan.
+Three modes are available:
+
+- int8: per-dimension symmetric scalar quantization (512 bytes per 512-d vector). A dot
+  product with the query pre-multiplied by the dimension scales approximates the cosine.
+- binary: one sign bit per dimension, packed (64 bytes per 512-d vector). Hamming distance
+  between sign patterns approximates angular distance.
+- prefix: the leading LOCAL_PREFIX_DIMENSIONS (default 128) dimensions, re-normalised
+  (4 bytes per kept dimension, 512 bytes at 128). text-embedding-3 models are trained
+  Matryoshka-style, so a prefix is itself a usable lower-dimensional embedding; this
+  does not hold for arbitrary vectors.
+
+All three only choose candidates; LocalVectorStore re-scores those exactly against the
+memory-mapped float32 rows, so returned scores are always exact cosines.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("int8", "binary", "prefix")
+
+# Rows converted from int8 to float32 per step; a block of 512-d rows stays cache-sized (8 MB)
+SCAN_BLOCK_ROWS = 4096
+
+# np.bitwise_count needs NumPy 2; older versions use a byte lookup table
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values]
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(codes int8 (n, d), scales float32 (d,)) with vectors ~= codes * scales."""
+    scales = np.ones(vectors.shape[1], dtype=np.float32)
+    if len(vectors):
+        scales = np.abs(vectors).max(axis=0).astype(np.float32) / 127.0
+        scales[scales == 0] = 1.0
+    codes = np.empty(vectors.shape, dtype=np.int8)
+    for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+        codes[start:start + SCAN_BLOCK_ROWS] = np.clip(np.rint(block / scales), -127, 127)
+    return codes, scales
+
+
+def binary_signatures(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed along the last axis: uint8 (n, ceil(d / 8))."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def int8_scores(
+    codes: np.ndarray, scales: np.ndarray, query_matrix: np.ndarray, rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Approximate dot products (candidates, queries), scanning the codes block by block."""
+    scaled_queries = (query_matrix * scales).T.astype(np.float32)  # (d, queries)
+    n = len(rows) if rows is not None else codes.shape[0]
+    scores = np.empty((n, query_matrix.shape[0]), dtype=np.float32)
+    for start in range(0, n, SCAN_BLOCK_ROWS):
+        end = min(start + SCAN_BLOCK_ROWS, n)
+        block = codes[rows[start:end]] if rows is not None else codes[start:end]
+        scores[start:end] = block.astype(np.float32) @ scaled_queries
+    return scores
+
+
+def hamming_scores(signatures: np.ndarray, query_matrix: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Negated Hamming distances (candidates, queries), so that higher is closer as with dot products."""
+    matrix = signatures[rows] if rows is not None else signatures
+    query_bits = binary_signatures(query_matrix)
+    scores = np.empty((matrix.shape[0], query_matrix.shape[0]), dtype=np.float32)
+    for column, bits in enumerate(query_bits):
+        scores[:, column] = -_popcount(np.bitwise_xor(matrix, bits)).sum(axis=1, dtype=np.int32)
+    return scores
+
+
+def prefix_matrix(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """Unit-normalised leading `dimensions` of each row: float32 (n, dimensions)."""
+    prefix = np.empty((vectors.shape[0], dimensions), dtype=np.float32)
+    for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS, :dimensions], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        prefix[start:start + SCAN_BLOCK_ROWS] = block / np.where(norms > 0, norms, 1.0)
+    return prefix
+
+
+def prefix_scores(prefix: np.ndarray, query_matrix: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Cosines (candidates, queries) between stored and query prefixes."""
+    queries = prefix_matrix(query_matrix, prefix.shape[1])
+    matrix = prefix[rows] if rows is not None else prefix
+    return matrix @ queries.T
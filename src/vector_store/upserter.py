@@ -0,0 +1,157 @@
+"""
+Concurrent, size-aware upserts into any VectorStore.
+
+Pinecone caps an upsert request at 2 MB and 1000 vectors. Batches are therefore cut by
+each vector's serialized JSON size rather than a fixed count, and several of them are
+kept in flight on a small thread pool. The store's client, and with it its HTTP
+connection pool, is shared by those threads. Failed batches are retried with
+exponential backoff and jitter, and throughput is reported in vectors/s and MB/s.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.retry import is_retryable
+from .base import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Headroom under Pinecone's 2 MB request limit for the envelope and encoding differences
+UPSERT_MAX_BATCH_BYTES = int(os.getenv("UPSERT_MAX_BATCH_BYTES", str(1_500_000)))
+UPSERT_MAX_BATCH_VECTORS = int(os.getenv("UPSERT_MAX_BATCH_VECTORS", "1000"))
+UPSERT_MAX_CONCURRENCY = int(os.getenv("UPSERT_MAX_CONCURRENCY", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "5"))
+
+
+def serialized_size(vector: Dict[str, Any]) -> int:
+    """Bytes the vector adds to a JSON upsert request body."""
+    return len(json.dumps(vector, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+Batch = Tuple[List[Dict[str, Any]], int]
+
+
+def size_batches(vectors: List[Dict[str, Any]], max_bytes: int, max_vectors: int) -> List[Batch]:
+    """Consecutive vectors grouped so each group stays within both limits, with each group's byte size."""
+    batches: List[Batch] = []
+    current: List[Dict[str, Any]] = []
+    current_bytes = 0
+    for vector in vectors:
+        size = serialized_size(vector)
+        if current and (current_bytes + size > max_bytes or len(current) >= max_vectors):
+            batches.append((current, current_bytes))
+            current, current_bytes = [], 0
+        current.append(vector)
+        current_bytes += size
+    if current:
+        batches.append((current, current_bytes))
+    return batches
+
+
+class VectorUpserter:
+    """
+    Blocking `upsert(vectors) -> written` over a VectorStore. Safe to call from several
+    threads at once; all callers share one pool, so `max_concurrency` bounds the
+    requests in flight for the whole run.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_batch_bytes: int = UPSERT_MAX_BATCH_BYTES,
+        max_batch_vectors: int = UPSERT_MAX_BATCH_VECTORS,
+        max_concurrency: int = UPSERT_MAX_CONCURRENCY,
+        max_retries: int = UPSERT_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.store = store
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_vectors = max_batch_vectors
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.vectors = 0
+        self.bytes = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_vectors = 0
+        # Wall-clock span from the first upsert() call to the last batch written
+        self._first_started: Optional[float] = None
+        self._last_finished: Optional[float] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="upsert")
+            return self._executor
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        """Write `vectors` in size-bounded batches; returns how many were written."""
+        if not vectors:
+            return 0
+        with self._lock:
+            if self._first_started is None:
+                self._first_started = time.perf_counter()
+        batches = size_batches(vectors, self.max_batch_bytes, self.max_batch_vectors)
+        written = sum(self._pool().map(self._upsert_batch, batches))
+        with self._lock:
+            self._last_finished = time.perf_counter()
+        return written
+
+    def _upsert_batch(self, sized_batch: Batch) -> int:
+        batch, size = sized_batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.store.upsert(batch)
+            except Exception as e:
+                if attempt < self.max_retries and is_retryable(e):
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    logger.warning(f"Upsert of {len(batch)} vectors failed ({e}); retrying in {delay:.1f}s.")
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Giving up on an upsert of {len(batch)} vectors after {attempt + 1} attempts: {e}")
+                with self._lock:
+                    self.failed_vectors += len(batch)
+                return 0
+            with self._lock:
+                self.vectors += len(batch)
+                self.bytes += size
+                self.batches += 1
+            return len(batch)
+        return 0
+
+    def stats(self) -> Dict[str, float]:
+        """Throughput between the first upsert() call and the last completed one."""
+        with self._lock:
+            span = (self._last_finished or 0.0) - (self._first_started or 0.0)
+            seconds = max(span, 1e-9)
+            return {
+                "vectors": self.vectors,
+                "batches": self.batches,
+                "megabytes": round(self.bytes / 1e6, 2),
+                "vectors_per_second": round(self.vectors / seconds, 1) if self.vectors else 0.0,
+                "mb_per_second": round(self.bytes / 1e6 / seconds, 2) if self.bytes else 0.0,
+                "retries": self.retries,
+                "failed_vectors": self.failed_vectors,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,45 @@
+# conftest.py - Offline environment and server factory shared by the MCP server tests
+
+import os
+import tempfile
+
+import pytest
+
+# Set before any test module imports the server, so the module-level search server and
+# every default store path land in a scratch directory; no Pinecone or OpenAI calls are made
+_scratch = tempfile.mkdtemp(prefix="sec-tests-")
+os.environ.setdefault("SEC_CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("VECTOR_STORE_BACKEND", "local")
+os.environ.setdefault("LOCAL_INDEX_DIR", os.path.join(_scratch, "local_index"))
+os.environ.setdefault("BM25_INDEX_DIR", os.path.join(_scratch, "bm25_index"))
+os.environ.setdefault("DOCUMENT_STORE_PATH", os.path.join(_scratch, "document_store.sqlite"))
+os.environ.setdefault("FACTS_DB_PATH", os.path.join(_scratch, "financial_facts.sqlite"))
+os.environ.setdefault("INGEST_MANIFEST_PATH", os.path.join(_scratch, "ingest_manifest.sqlite"))
+
+
+@pytest.fixture
+def make_server(tmp_path):
+    """
+    make_server(store, embed) -> an SECSearchServer over `store` with its facts, document,
+    query cache and index generation files under tmp_path, no BM25 index, and the async
+    `embed(texts) -> (embeddings, total_tokens)` in place of the OpenAI call.
+    """
+    from src.embeddings.query_cache import QueryEmbeddingCache
+    from src.mcp_server.server import SECSearchServer
+    from src.utils.document_store import DocumentStore
+    from src.utils.facts_store import FactsStore
+    from src.utils.index_generation import GenerationWatcher
+
+    def make(store, embed):
+        server = SECSearchServer(
+            vector_store=store,
+            facts_store=FactsStore(tmp_path / "facts.sqlite"),
+            document_store=DocumentStore(tmp_path / "documents.sqlite"),
+            index_generation=GenerationWatcher(tmp_path / "index_generation"),
+        )
+        server.lexical_index = None
+        server.query_cache = QueryEmbeddingCache(tmp_path / "queries.sqlite")
+        server._embed_texts = embed
+        return server
+
+    return make
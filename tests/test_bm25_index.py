@@ -0,0 +1,46 @@
+# test_bm25_index.py - Offline checks for the BM25 lexical index and rank fusion
+
+from src.retrieval.bm25_index import BM25Index, BM25IndexBuilder
+from src.retrieval.fusion import reciprocal_rank_fusion
+
+
+def _chunks():
+    return [
+        {"chunk_id": "AAPL_10K_2023-11-03-chunk-0000", "ticker": "AAPL", "fiscal_year": 2023, "chunk_type": "table",
+         "text": "Free cash flow and net cash generated by operating activities"},
+        {"chunk_id": "AAPL_10K_2023-11-03-chunk-0001", "ticker": "AAPL", "fiscal_year": 2023, "chunk_type": "narrative",
+         "text": "Diluted earnings per share increased; diluted share count declined"},
+        {"chunk_id": "MSFT_10K_2023-07-27-chunk-0000", "ticker": "MSFT", "fiscal_year": 2023, "chunk_type": "table",
+         "text": "Free cash flow"},
+        {"chunk_id": "MSFT_10K_2023-07-27-chunk-0001", "ticker": "MSFT", "fiscal_year": 2023, "chunk_type": "narrative",
+         "text": "Cloud revenue grew as customers migrated workloads"},
+    ]
+
+
+def test_bm25_ranks_exact_terms_and_applies_filters(tmp_path):
+    builder = BM25IndexBuilder()
+    builder.add_chunks(_chunks())
+    builder.write(tmp_path)
+    index = BM25Index(tmp_path)
+
+    # Shorter chunk with the same term frequencies ranks first (length normalisation)
+    matches = index.search("free cash flow", top_k=5)
+    assert [m["id"] for m in matches] == ["MSFT_10K_2023-07-27-chunk-0000", "AAPL_10K_2023-11-03-chunk-0000"]
+    assert matches[0]["metadata"]["ticker"] == "MSFT"
+    assert "text" not in matches[0]["metadata"]  # Served from the document store instead
+
+    filtered = index.search("free cash flow", top_k=5, filter={"ticker": "AAPL", "fiscal_year": {"$gte": 2023}})
+    assert [m["id"] for m in filtered] == ["AAPL_10K_2023-11-03-chunk-0000"]
+    assert index.search("diluted", top_k=5, filter={"chunk_type": "table"}) == []
+    assert index.search("the of and", top_k=5) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{"id": "a", "score": 0.9, "metadata": {}}, {"id": "b", "score": 0.8, "metadata": {}}]
+    lexical = [{"id": "b", "score": 12.0, "metadata": {}}, {"id": "c", "score": 7.0, "metadata": {}}]
+
+    fused = reciprocal_rank_fusion([vector, lexical])
+    assert [m["id"] for m in fused] == ["b", "a", "c"]
+    assert fused[0]["fusion_score"] == 1 / 62 + 1 / 61
+    # Vector similarities are kept; a BM25-only hit has none
+    assert [m["score"] for m in fused] == [0.8, 0.9, None]
@@ -0,0 +1,77 @@
+# test_chunker_golden.py - The prefix-sum chunker must reproduce the chunks of the original re-tokenizing chunker
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import nltk
+import pytest
+
+from src.preprocessing import chunker
+from src.utils import tokenizer
+
+FILINGS_DIR = Path(__file__).resolve().parent.parent / "processed_filings"
+# Chunks of the chunker as it was before the prefix-sum rewrite, run under the stubs below
+GOLDEN_FILE = Path(__file__).resolve().parent / "fixtures" / "chunker_golden.json"
+PARAMS = {
+    "default": {},
+    "small": {"min_tokens": 10, "target_size": 200, "overlap_tokens": 60},
+    "no_overlap": {"target_size": 120, "overlap_tokens": 0},
+}
+GOLDEN_CASES = [
+    ("AAPL/AAPL_10K_2023-11-03.txt", "default"),
+    ("AAPL/AAPL_10Q_2024-02-02.txt", "default"),
+    ("AAPL/AAPL_10Q_2024-02-02.txt", "small"),
+    ("AAPL/AAPL_10Q_2024-02-02.txt", "no_overlap"),
+]
+
+# BPE-like pieces: a word or punctuation run takes its leading space, as in cl100k
+PIECE_PATTERN = re.compile(r" ?\w+| ?[^\w\s]+|\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])(?=\s)")
+
+
+class StubEncoding:
+    """Deterministic stand-in for tiktoken: pieces of PIECE_PATTERN, four characters per token."""
+
+    def encode(self, text):
+        return [piece[i:i + 4] for piece in PIECE_PATTERN.findall(text) for i in range(0, len(piece), 4)]
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+
+def split_sentences(text):
+    """Stand-in for nltk.sent_tokenize, whose punkt data is not available offline."""
+    return SENTENCE_END.split(text)
+
+
+def chunk_digests(chunks):
+    """[token_count, digest of the whole chunk dict] per chunk."""
+    return [
+        [chunk["token_count"], hashlib.sha256(json.dumps(chunk, sort_keys=True).encode("utf-8")).hexdigest()[:16]]
+        for chunk in chunks
+    ]
+
+
+def golden_chunks(process_single_filing):
+    """{"<filing> <params>": chunk_digests} for GOLDEN_CASES; the fixture holds this for the original chunker."""
+    golden = {}
+    for name, label in GOLDEN_CASES:
+        ticker, form_type, filing_date = Path(name).stem.split("_")
+        document_text = (FILINGS_DIR / name).read_text(encoding="utf-8")
+        chunks = process_single_filing(document_text, ticker, form_type, filing_date, **PARAMS[label])
+        golden[f"{name} {label}"] = chunk_digests(chunks)
+    return golden
+
+
+@pytest.mark.skipif(not FILINGS_DIR.is_dir(), reason="processed_filings/ is not present")
+def test_chunks_match_the_original_chunker(monkeypatch):
+    monkeypatch.setattr(tokenizer, "get_encoding", lambda model=tokenizer.EMBEDDING_MODEL: StubEncoding())
+    monkeypatch.setattr(nltk, "sent_tokenize", split_sentences)
+    expected = json.loads(GOLDEN_FILE.read_text(encoding="utf-8"))
+
+    actual = golden_chunks(chunker.process_single_filing)
+    assert list(actual) == list(expected)
+    for case, digests in expected.items():
+        assert actual[case] == digests, case
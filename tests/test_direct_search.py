@@ -2,6 +2,7 @@
 
 import asyncio
 from src.utils.clients import openai_client, index
+from src.utils.document_store import DocumentStore
 
 async def test_direct_search():
     """Test search directly without MCP"""
@@ -30,6 +31,9 @@ async def test_direct_search():
     
     print(f"\nFound {len(search_results['matches'])} results:")
     
+    # Chunk text is not in the index metadata; read previews from the document store
+    previews = DocumentStore().get_texts([match['id'] for match in search_results['matches']], text_chars=200)
+    
     for i, match in enumerate(search_results['matches']):
         metadata = match['metadata']
         print(f"\n{i+1}. Score: {match['score']:.4f}")
@@ -37,7 +41,7 @@ async def test_direct_search():
         print(f"   Form: {metadata['form_type']}")
         print(f"   Date: {metadata['filing_date']}")
         print(f"   Section: {metadata['item_id']}")
-        print(f"   Text preview: {metadata['text'][:200]}...")
+        print(f"   Text preview: {previews.get(match['id'], '')}...")
 
 if __name__ == "__main__":
     asyncio.run(test_direct_search())
\ No newline at end of file
@@ -0,0 +1,40 @@
+# test_diversify.py - Offline checks for collapsing, merging and MMR over overlapping chunks
+
+from src.retrieval.diversify import group_adjacent, merge_texts, mmr_order
+
+
+def _match(chunk_id, score, item_id="Item 1A - Risk Factors"):
+    return {"id": chunk_id, "score": score, "metadata": {"item_id": item_id}}
+
+
+def test_adjacent_chunks_of_one_section_are_grouped():
+    matches = [
+        _match("AAPL_10K_2023-11-03-chunk-0012", 0.9),
+        _match("AAPL_10K_2023-11-03-chunk-0040", 0.8),
+        _match("AAPL_10K_2023-11-03-chunk-0014", 0.7),
+        _match("AAPL_10K_2023-11-03-chunk-0013", 0.6),  # Bridges 0012 and 0014
+        _match("AAPL_10K_2023-11-03-chunk-0041", 0.5, item_id="Item 7 - MD&A"),  # Other section
+        _match("MSFT_10K_2023-07-27-chunk-0013", 0.4),  # Other filing
+    ]
+    groups = [[m["id"][-4:] for m in group] for group in group_adjacent(matches)]
+    assert groups == [["0012", "0013", "0014"], ["0040"], ["0041"], ["0013"]]
+
+    capped = [[m["id"][-4:] for m in group] for group in group_adjacent(matches, max_group_size=2)]
+    # 0013 would join 0012 and 0014 into a run of three, so it is dropped as redundant
+    assert capped == [["0012"], ["0040"], ["0014"], ["0041"], ["0013"]]
+
+
+def test_merge_texts_drops_the_repeated_overlap():
+    first = "Supply chains may be disrupted. Demand may fall. Rates may rise."
+    second = "Demand may fall. Rates may rise. Competition is intense."
+    assert merge_texts([first, second]) == (
+        "Supply chains may be disrupted. Demand may fall. Rates may rise. Competition is intense."
+    )
+    assert merge_texts(["No overlap here.", "Different text."]) == "No overlap here. Different text."
+
+
+def test_mmr_skips_near_duplicates():
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]]
+    assert mmr_order(query, candidates, k=2, lambda_=0.5) == [0, 2]
+    assert mmr_order(query, candidates, k=2, lambda_=1.0) == [0, 1]
@@ -0,0 +1,78 @@
+# test_embedding_batcher.py - Offline checks for token packing, retries and dead-lettering of embedding requests
+
+import asyncio
+import json
+
+import pytest
+
+from src.embeddings.embedding_batcher import ChunkEmbeddingBatcher, FatalEmbeddingError, TokenBucket, pack_batches
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class Unauthorized(Exception):
+    status_code = 401
+
+
+def test_pack_batches_respects_token_and_input_limits():
+    assert pack_batches([40, 40, 40, 90, 10], max_tokens=100, max_inputs=10) == [[0, 1], [2], [3, 4]]
+    assert pack_batches([1] * 5, max_tokens=100, max_inputs=2) == [[0, 1], [2, 3], [4]]
+    # An input over the token limit still gets a request of its own
+    assert pack_batches([500, 1], max_tokens=100, max_inputs=10) == [[0], [1]]
+
+
+def test_transient_errors_are_retried_and_rejected_inputs_dead_lettered(tmp_path):
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        if calls.count(["alpha", "beta", "poison"]) == 1 and texts == ["alpha", "beta", "poison"]:
+            raise RateLimited("rate limited")
+        if "poison" in texts:
+            raise BadRequest("maximum context length exceeded")
+        return [[float(len(text))] for text in texts]
+
+    dead_letters = tmp_path / "dead.jsonl"
+    batcher = ChunkEmbeddingBatcher(
+        embed, max_batch_tokens=10, max_concurrency=2, base_delay=0.001, dead_letter_path=dead_letters
+    )
+    texts = ["alpha", "beta", "poison", "gamma"]
+    result = asyncio.run(batcher.embed(texts, [3, 3, 3, 3], ids=["c0", "c1", "c2", "c3"]))
+
+    # Never a placeholder vector: the rejected input is None and only the others are embedded
+    assert result == [[5.0], [4.0], None, [5.0]]
+    assert calls.count(["alpha", "beta", "poison"]) == 2
+    assert batcher.stats()["retries"] == 1 and batcher.stats()["dead_lettered"] == 1
+    records = [json.loads(line) for line in dead_letters.read_text().splitlines()]
+    assert [(r["id"], r["text"]) for r in records] == [("c2", "poison")]
+    assert "maximum context length" in records[0]["error"]
+
+
+def test_auth_errors_abort_instead_of_splitting_or_dead_lettering(tmp_path):
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        raise Unauthorized("invalid api key")
+
+    dead_letters = tmp_path / "dead.jsonl"
+    batcher = ChunkEmbeddingBatcher(embed, max_batch_tokens=6, base_delay=0.001, dead_letter_path=dead_letters)
+    with pytest.raises(FatalEmbeddingError):
+        asyncio.run(batcher.embed(["alpha", "beta", "gamma", "delta"], [3, 3, 3, 3]))
+    assert all(len(texts) == 2 for texts in calls) and len(calls) <= 2
+    assert not dead_letters.exists()
+
+
+def test_token_bucket_waits_for_refill():
+    async def take():
+        bucket = TokenBucket(per_minute=6000)  # 100 per second
+        assert await bucket.acquire(6000) == 0.0
+        return await bucket.acquire(5)
+
+    assert 0.03 < asyncio.run(take()) < 0.5
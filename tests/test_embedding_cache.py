@@ -0,0 +1,88 @@
+# test_embedding_cache.py - Offline checks for the content-addressed chunk embedding cache
+
+import asyncio
+import threading
+
+import pytest
+
+from src.embeddings.embedding_cache import ChunkEmbeddingCache
+
+
+def _cache(path):
+    return ChunkEmbeddingCache("text-embedding-3-small", 4, directory=path, count_tokens=lambda text: len(text.split()))
+
+
+def test_only_distinct_misses_are_embedded_and_vectors_persist(tmp_path):
+    requests = []
+
+    async def embed(texts, token_counts):
+        requests.append(list(texts))
+        return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+    cache = _cache(tmp_path)
+    texts = ["Risk factors.", "Revenue grew strongly.", "Risk factors."]
+    first = asyncio.run(cache.get_or_embed(texts, embed))
+    assert requests == [["Risk factors.", "Revenue grew strongly."]]
+    assert first[0] == first[2] == [13.0, 1.0, 0.0, 0.0]
+    assert cache.stats()["duplicates"] == 1 and cache.stats()["tokens_saved"] == 2
+
+    reopened = _cache(tmp_path)
+    second = asyncio.run(reopened.get_or_embed(["Revenue grew strongly.", "Outlook."], embed))
+    assert requests[-1] == ["Outlook."]
+    assert second[0] == first[1]
+    stats = reopened.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["tokens_saved"] == 3 and stats["cached_vectors"] == 3
+
+    # Another model or width never shares entries
+    other = ChunkEmbeddingCache("text-embedding-3-large", 4, directory=tmp_path, count_tokens=len)
+    assert other.get_many([other.key("Outlook.")]) == {}
+
+
+def test_failed_requests_are_not_cached(tmp_path):
+    async def fail(texts, token_counts):
+        raise RuntimeError("rate limited")
+
+    cache = _cache(tmp_path)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_embed(["Risk factors."], fail))
+    assert len(cache) == 0 and cache.get_many([cache.key("Risk factors.")]) == {}
+
+
+def test_inputs_that_could_not_be_embedded_come_back_as_none(tmp_path):
+    async def partial(texts, token_counts):
+        return [None if "Outlook" in text else [1.0, 0.0, 0.0, 0.0] for text in texts]
+
+    cache = _cache(tmp_path)
+    result = asyncio.run(cache.get_or_embed(["Outlook.", "Risk factors.", "Outlook."], partial, [1, 2, 1]))
+    assert result == [None, [1.0, 0.0, 0.0, 0.0], None]
+    assert len(cache) == 1 and cache.stats()["tokens_embedded"] == 2
+
+
+def test_put_many_appends_only_new_keys(tmp_path):
+    cache = _cache(tmp_path)
+    alpha, beta = cache.key("alpha"), cache.key("beta")
+    cache.put_many([(alpha, [1.0, 0.0, 0.0, 0.0], 1), (alpha, [2.0, 0.0, 0.0, 0.0], 1)])
+    # A concurrent miss for the same text is written again: it keeps the first row
+    cache.put_many([(alpha, [3.0, 0.0, 0.0, 0.0], 1), (beta, [0.0, 1.0, 0.0, 0.0], 1)])
+    assert len(cache) == 2 and (tmp_path / "vectors.f32").stat().st_size == 2 * 4 * 4
+    assert cache.get_many([alpha, beta]) == {alpha: ([1.0, 0.0, 0.0, 0.0], 1), beta: ([0.0, 1.0, 0.0, 0.0], 1)}
+
+
+def test_cache_io_runs_off_the_event_loop_thread(tmp_path):
+    cache = _cache(tmp_path)
+    io_threads = []
+    for name in ("get_many", "put_many"):
+        method = getattr(cache, name)
+
+        def recorded(*args, _method=method):
+            io_threads.append(threading.current_thread())
+            return _method(*args)
+
+        setattr(cache, name, recorded)
+
+    async def embed(texts, token_counts):
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts]
+
+    asyncio.run(cache.get_or_embed(["Risk factors."], embed, [2]))
+    assert len(io_threads) == 2 and threading.main_thread() not in io_threads
@@ -0,0 +1,55 @@
+# test_financial_facts.py - Offline checks for table fact extraction and the facts store
+
+from src.preprocessing.financial_facts import extract_filing_facts
+from src.utils.facts_store import FactsStore
+
+# Flattened the way processed_filings stores tables: "$" and parentheses are cells of
+# their own, and this issuer lists years oldest first.
+INCOME_AND_CASH_FLOW = """
+CONSOLIDATED STATEMENTS OF OPERATIONS (in millions, except per share data)
+[TABLE_START] Year Ended December 31, | 2022 | 2023 | Total net sales | $ | 513,983 | $ | 574,785 |
+Net income (loss) | $ | ( | 2,722 | ) | $ | 30,425 | Diluted earnings per share | $ | (0.27 | ) | $ | 2.90 |
+Weighted-average shares used in computation of earnings per share: | Diluted | 10,189 | 10,492 |
+Net cash provided by (used in) operating activities | 46,752 | 84,946 |
+Purchases of property and equipment | ( | 63,645 | ) | ( | 52,729 | ) [TABLE_END]
+"""
+
+
+def test_extracts_metrics_per_fiscal_year():
+    facts = extract_filing_facts(INCOME_AND_CASH_FLOW, "AMZN", "10K", "2024-02-02")
+    by_key = {(f.fiscal_year, f.metric): f for f in facts}
+
+    assert by_key[(2023, "revenue")].value == 574_785_000_000
+    assert by_key[(2022, "net_income")].value == -2_722_000_000
+    assert by_key[(2023, "eps_diluted")].value == 2.90
+    assert by_key[(2022, "eps_diluted")].value == -0.27
+    assert by_key[(2023, "free_cash_flow")].value == (84_946 - 52_729) * 1_000_000
+    assert by_key[(2023, "revenue")].source_rank == 0
+    assert by_key[(2022, "revenue")].source_rank == 1
+
+
+def test_store_keeps_the_filings_own_period_over_later_comparatives(tmp_path):
+    store = FactsStore(tmp_path / "facts.sqlite")
+    store.upsert_facts(extract_filing_facts(INCOME_AND_CASH_FLOW, "AMZN", "10K", "2024-02-02"))
+    # A later filing restating 2023 as its prior-year column must not replace it
+    store.upsert_facts([{
+        "ticker": "AMZN", "fiscal_year": 2023, "fiscal_quarter": 0, "metric": "revenue",
+        "value": 1.0, "unit_scale": 1_000_000, "form_type": "10K", "filing_date": "2025-02-07",
+        "source_chunk_ids": ["AMZN_10K_2025-02-07-chunk-0042"], "source_rank": 1,
+    }])
+
+    fact = store.get_fact("amzn", 2023, "revenue")
+    assert fact["value"] == 574_785_000_000
+    assert fact["filing_date"] == "2024-02-02"
+    assert store.get_fact("AMZN", 2023, "revenue", fiscal_quarter=2) is None
+
+
+def test_deleting_a_filing_removes_only_the_facts_read_from_it(tmp_path):
+    store = FactsStore(tmp_path / "facts.sqlite")
+    store.upsert_facts(extract_filing_facts(INCOME_AND_CASH_FLOW, "AMZN", "10K", "2024-02-02"))
+    store.upsert_facts(extract_filing_facts(INCOME_AND_CASH_FLOW, "MSFT", "10K", "2024-02-02"))
+    total = store.count()
+
+    assert store.delete_filings([("amzn", "10K", "2024-02-02"), ("AMZN", "10Q", "2024-02-02")]) == total // 2
+    assert store.get_fact("AMZN", 2023, "revenue") is None
+    assert store.get_fact("MSFT", 2023, "revenue")["value"] == 574_785_000_000
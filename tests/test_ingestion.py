@@ -0,0 +1,132 @@
+# test_ingestion.py - Offline check of the pipelined chunk -> embed -> upsert ingestion runner
+
+import asyncio
+import os
+
+import pytest
+
+from src.embeddings.ingestion import (
+    IngestionRunner, discover_filings, ingest_config_hash, manifest_entry, plan_incremental,
+)
+from src.utils.document_store import DocumentStore
+from src.utils.ingest_manifest import IngestManifest
+from src.vector_store.local_store import LocalVectorStore
+
+
+def paragraph_chunks(job):
+    """Stand-in for chunk_filing: one chunk per paragraph. Module-level so worker processes can load it."""
+    text = job.path.read_text(encoding="utf-8")
+    if text.startswith("CORRUPT"):
+        raise ValueError("unreadable filing")
+    chunks = [
+        {"chunk_id": f"{job.path.stem}-chunk-{i:04d}", "text": paragraph, "ticker": job.ticker,
+         "token_count": len(paragraph.split())}
+        for i, paragraph in enumerate(p for p in text.split("\n\n") if p.strip())
+    ]
+    return job, chunks, []
+
+
+class RecordingPipeline:
+    def __init__(self, tmp_path):
+        self.vector_store = LocalVectorStore(tmp_path / "index", dimensions=4)
+        self.document_store = DocumentStore(tmp_path / "documents.sqlite")
+        self.embedded_batches = []
+
+    async def generate_embeddings(self, texts, token_counts=None, ids=None):
+        self.embedded_batches.append(len(texts))
+        await asyncio.sleep(0.01)
+        return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+    def build_vectors(self, chunks, embeddings):
+        return [{"id": c["chunk_id"], "values": e, "metadata": {"ticker": c["ticker"]}} for c, e in zip(chunks, embeddings)]
+
+    def upsert_vectors(self, vectors):
+        self.vector_store.upsert(vectors)
+        return len(vectors)
+
+
+def test_runner_ingests_every_filing_and_reports_failures(tmp_path):
+    base = tmp_path / "processed_filings"
+    for ticker in ("AAPL", "MSFT"):
+        (base / ticker).mkdir(parents=True)
+        for year in range(2020, 2024):
+            (base / ticker / f"{ticker}_10K_{year}-10-30.txt").write_text("Risk factors.\n\nRevenue grew.\n\nOutlook.")
+    (base / "AAPL" / "notes.txt").write_text("not a filing")
+    (base / "MSFT" / "MSFT_10Q_2024-04-25.txt").write_text("CORRUPT")
+    (base / "MSFT" / "MSFT_10Q_2024-01-30.txt").write_text("")
+
+    jobs = discover_filings(base)
+    assert len(jobs) == 10
+
+    pipeline = RecordingPipeline(tmp_path)
+    indexed = []
+    runner = IngestionRunner(
+        pipeline, workers=2, embed_concurrency=3, upsert_concurrency=2, queue_size=1,
+        on_indexed=lambda job, chunks, facts: indexed.append((job.label, len(chunks))),
+        chunk_fn=paragraph_chunks,
+    )
+    stats = asyncio.run(runner.run(jobs))
+
+    assert stats.filings == 9 and stats.chunks == 24 and stats.vectors == 24
+    assert [path.endswith("MSFT_10Q_2024-04-25.txt") for path in stats.failed] == [True]
+    assert ("MSFT 10Q (2024-01-30)", 0) in indexed
+    assert len(pipeline.vector_store) == 24
+    assert pipeline.document_store.get_texts(["AAPL_10K_2021-10-30-chunk-0001"]) == {
+        "AAPL_10K_2021-10-30-chunk-0001": "Revenue grew."
+    }
+    assert "filings/s" in stats.summary()
+
+
+def test_runner_cancels_every_stage_when_on_indexed_raises(tmp_path):
+    base = tmp_path / "processed_filings"
+    (base / "AAPL").mkdir(parents=True)
+    for year in range(2015, 2024):
+        (base / "AAPL" / f"AAPL_10K_{year}-10-30.txt").write_text("Risk factors.\n\nRevenue grew.")
+
+    def on_indexed(job, chunks, facts):
+        raise RuntimeError("manifest is read-only")
+
+    runner = IngestionRunner(
+        RecordingPipeline(tmp_path), workers=2, embed_concurrency=1, upsert_concurrency=1, queue_size=1,
+        on_indexed=on_indexed, chunk_fn=paragraph_chunks,
+    )
+    with pytest.raises(RuntimeError, match="read-only"):
+        asyncio.run(asyncio.wait_for(runner.run(discover_filings(base)), timeout=30))
+
+
+def test_incremental_plan_skips_unchanged_filings_and_finds_stale_chunks(tmp_path):
+    base = tmp_path / "processed_filings"
+    (base / "AAPL").mkdir(parents=True)
+    for year in (2021, 2022, 2023):
+        (base / "AAPL" / f"AAPL_10K_{year}-10-30.txt").write_text("Risk factors.\n\nRevenue grew.\n\nOutlook.")
+    manifest = IngestManifest(tmp_path / "manifest.sqlite")
+
+    plan = plan_incremental(discover_filings(base), manifest.entries(), "config-a")
+    assert len(plan.to_ingest) == 3 and not plan.unchanged
+    manifest.record(manifest_entry(job, "config-a", paragraph_chunks(job)[1]) for job in plan.to_ingest)
+
+    # Re-written with the same content, shortened, and deleted
+    touched = base / "AAPL" / "AAPL_10K_2021-10-30.txt"
+    touched.write_text(touched.read_text())
+    os.utime(touched, ns=(0, 0))
+    (base / "AAPL" / "AAPL_10K_2022-10-30.txt").write_text("Risk factors.")
+    (base / "AAPL" / "AAPL_10K_2023-10-30.txt").unlink()
+
+    plan = plan_incremental(discover_filings(base), manifest.entries(), "config-a")
+    assert [job.key for job in plan.to_ingest] == ["AAPL/AAPL_10K_2022-10-30.txt"]
+    assert [entry.path for entry in plan.touched] == ["AAPL/AAPL_10K_2021-10-30.txt"]
+    assert [entry.path for entry in plan.removed] == ["AAPL/AAPL_10K_2023-10-30.txt"]
+    assert plan.removed_filings() == [("AAPL", "10K", "2023-10-30")]
+    completed = [manifest_entry(job, "config-a", paragraph_chunks(job)[1]) for job in plan.to_ingest]
+    assert plan.stale_ids(completed) == [
+        "AAPL_10K_2022-10-30-chunk-0001", "AAPL_10K_2022-10-30-chunk-0002",
+        "AAPL_10K_2023-10-30-chunk-0000", "AAPL_10K_2023-10-30-chunk-0001", "AAPL_10K_2023-10-30-chunk-0002",
+    ]
+
+    # The configuration hash depends on settings and version constants, not on source text
+    assert ingest_config_hash("text-embedding-3-small", 512) == ingest_config_hash("text-embedding-3-small", 512)
+    assert ingest_config_hash("text-embedding-3-small", 512) != ingest_config_hash("text-embedding-3-small", 256)
+
+    # A different ingest configuration re-processes everything, as does force
+    assert len(plan_incremental(discover_filings(base), manifest.entries(), "config-b").to_ingest) == 2
+    assert len(plan_incremental(discover_filings(base), manifest.entries(), "config-a", force=True).to_ingest) == 2
@@ -0,0 +1,37 @@
+# test_lazy_imports.py - Offline check that importing the server and pipeline modules builds no heavy clients
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter so modules other tests imported do not count
+CHECK = """
+import sys
+import src.embeddings.embedding_pipeline as embedding_pipeline
+import src.mcp_server.server
+from src.utils import clients, tokenizer
+
+assert embedding_pipeline.get_pipeline.cache_info().currsize == 0
+assert clients.get_openai_client.cache_info().currsize == 0
+assert tokenizer.get_encoding.cache_info().currsize == 0
+print(sorted(m for m in ("openai", "pinecone", "tiktoken", "nltk", "pandas") if m in sys.modules))
+"""
+
+
+def test_importing_the_server_and_pipeline_builds_no_clients(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env.update({
+        "SEC_CACHE_DIR": str(tmp_path / "cache"),
+        "VECTOR_STORE_BACKEND": "local",
+        "LOCAL_INDEX_DIR": str(tmp_path / "local_index"),
+        "BM25_INDEX_DIR": str(tmp_path / "bm25_index"),
+        "DOCUMENT_STORE_PATH": str(tmp_path / "document_store.sqlite"),
+    })
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
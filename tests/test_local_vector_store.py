@@ -0,0 +1,166 @@
+# test_local_vector_store.py - Offline checks for the memory-mapped local vector store
+
+import numpy as np
+
+from src.vector_store.local_store import LocalVectorStore
+from src.vector_store.metadata_filter import MetadataColumns
+
+
+def _vector(dimensions, hot):
+    values = np.zeros(dimensions, dtype=np.float32)
+    values[hot] = 1.0
+    return values.tolist()
+
+
+def _chunk_vectors(dimensions=8):
+    return [
+        {"id": "AAPL_10K_2023-11-03-chunk-0000", "values": _vector(dimensions, 0),
+         "metadata": {"ticker": "AAPL", "form_type": "10K", "fiscal_year": 2023, "chunk_type": "narrative"}},
+        {"id": "AAPL_10Q_2024-02-02-chunk-0000", "values": _vector(dimensions, 1),
+         "metadata": {"ticker": "AAPL", "form_type": "10Q", "fiscal_year": 2024, "chunk_type": "table"}},
+        {"id": "MSFT_10K_2023-07-27-chunk-0000", "values": _vector(dimensions, 0),
+         "metadata": {"ticker": "MSFT", "form_type": "10K", "fiscal_year": 2023, "chunk_type": "narrative"}},
+    ]
+
+
+def test_query_ranks_by_cosine_and_applies_filters(tmp_path):
+    store = LocalVectorStore(tmp_path, dimensions=8)
+    store.upsert(_chunk_vectors())
+
+    matches = store.query(_vector(8, 0), top_k=2)
+    assert {m["id"] for m in matches} == {"AAPL_10K_2023-11-03-chunk-0000", "MSFT_10K_2023-07-27-chunk-0000"}
+    assert matches[0]["score"] > 0.99
+
+    matches = store.query(_vector(8, 0), top_k=5, filter={"ticker": "AAPL", "form_type": "10K"})
+    assert [m["id"] for m in matches] == ["AAPL_10K_2023-11-03-chunk-0000"]
+
+    matches = store.query(_vector(8, 1), top_k=5, filter={"fiscal_year": {"$gte": 2024}})
+    assert [m["id"] for m in matches] == ["AAPL_10Q_2024-02-02-chunk-0000"]
+
+    matches = store.query(_vector(8, 0), top_k=5, filter={"chunk_type": {"$in": ["table"]}})
+    assert [m["metadata"]["chunk_type"] for m in matches] == ["table"]
+
+
+def test_flush_round_trips_through_memory_map(tmp_path):
+    store = LocalVectorStore(tmp_path, dimensions=8)
+    store.upsert(_chunk_vectors())
+    store.flush()
+
+    reopened = LocalVectorStore(tmp_path)
+    assert len(reopened) == 3
+    assert isinstance(reopened._vectors, np.memmap)
+    assert reopened.query(_vector(8, 1), top_k=1)[0]["id"] == "AAPL_10Q_2024-02-02-chunk-0000"
+
+    # Upserting an existing id overwrites it rather than adding a row
+    reopened.upsert([{"id": "AAPL_10Q_2024-02-02-chunk-0000", "values": _vector(8, 2),
+                      "metadata": {"ticker": "AAPL"}}])
+    assert len(reopened) == 3
+    assert reopened.query(_vector(8, 2), top_k=1)[0]["id"] == "AAPL_10Q_2024-02-02-chunk-0000"
+
+
+def test_delete_compacts_rows_and_survives_flush(tmp_path):
+    store = LocalVectorStore(tmp_path, dimensions=8)
+    store.upsert(_chunk_vectors())
+    store.flush()
+
+    reopened = LocalVectorStore(tmp_path)
+    reopened.upsert([{"id": "AAPL_10Q_2024-05-03-chunk-0000", "values": _vector(8, 3), "metadata": {"ticker": "AAPL"}}])
+    reopened.delete(["AAPL_10K_2023-11-03-chunk-0000", "not-indexed"])
+    assert len(reopened) == 3
+    assert reopened.query(_vector(8, 0), top_k=1)[0]["id"] == "MSFT_10K_2023-07-27-chunk-0000"
+    assert {m["id"] for m in reopened.query(_vector(8, 0), top_k=5, filter={"ticker": "AAPL"})} == {
+        "AAPL_10Q_2024-02-02-chunk-0000", "AAPL_10Q_2024-05-03-chunk-0000"
+    }
+    reopened.flush()
+
+    assert LocalVectorStore(tmp_path).fetch_vectors(["AAPL_10K_2023-11-03-chunk-0000", "AAPL_10Q_2024-05-03-chunk-0000"]).keys() == {
+        "AAPL_10Q_2024-05-03-chunk-0000"
+    }
+
+def test_quantized_search_rescores_candidates_exactly(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    exact = LocalVectorStore(tmp_path, dimensions=32)
+    exact.upsert([{"id": f"chunk-{i}", "values": v, "metadata": {"even": i % 2 == 0}} for i, v in enumerate(vectors)])
+    exact.flush()
+    query = vectors[7] + 0.05 * rng.standard_normal(32).astype(np.float32)
+    expected = exact.query(query, top_k=5)
+
+    for mode in ("int8", "binary", "prefix"):
+        store = LocalVectorStore(tmp_path, quantization=mode, rescore_factor=20, prefix_dimensions=16)
+        if mode != "prefix":  # The prefix matrix is only written by a store configured for it
+            assert isinstance(store._int8[0] if mode == "int8" else store._binary, np.memmap)
+        matches = store.query(query, top_k=5)
+        assert matches[0]["id"] == "chunk-7"
+        # Candidates are re-scored against the float rows, so scores equal the exact ones
+        assert matches[0]["score"] == expected[0]["score"]
+        [filtered] = store.query_many([{"vector": query, "top_k": 3, "filter": {"even": False}}])
+        assert filtered[0]["id"] == "chunk-7" and len(filtered) == 3
+
+
+def test_ivf_index_probes_lists_and_tracks_inserts(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((2000, 16)).astype(np.float32)
+    store = LocalVectorStore(tmp_path, dimensions=16, ann="ivf", nprobe=8, n_lists=8)
+    store.upsert([{"id": f"chunk-{i}", "values": v, "metadata": {"ticker": f"T{i % 20}"}} for i, v in enumerate(vectors)])
+    store.flush()
+    assert (tmp_path / "ivf.npz").exists()
+
+    # Probing every list is an exact search
+    exact = LocalVectorStore(tmp_path)
+    reopened = LocalVectorStore(tmp_path, ann="ivf", nprobe=8)
+    assert reopened._ivf.n_lists == 8
+    assert [m["id"] for m in reopened.query(vectors[3], top_k=10)] == [m["id"] for m in exact.query(vectors[3], top_k=10)]
+
+    reopened.nprobe = 1
+    matches = reopened.query(vectors[3], top_k=5, filter={"ticker": "T3"})
+    assert matches[0]["id"] == "chunk-3"
+    assert all(m["metadata"]["ticker"] == "T3" for m in matches)
+
+    # New rows join their nearest list without retraining and survive a reload
+    reopened.upsert([{"id": "new-chunk", "values": -vectors[3], "metadata": {"ticker": "T3"}}])
+    assert reopened.query(-vectors[3], top_k=1)[0]["id"] == "new-chunk"
+    reopened.flush()
+    assert LocalVectorStore(tmp_path)._ivf.assignments.shape == (2001,)
+
+
+def test_planner_scans_selective_filters_and_probes_broad_ones(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((4000, 16)).astype(np.float32)
+    store = LocalVectorStore(tmp_path, dimensions=16, ann="ivf", nprobe=2, n_lists=16)
+    store.upsert([
+        {"id": f"chunk-{i}", "values": v, "metadata": {"ticker": "RARE" if i < 40 else f"T{i % 2}", "fiscal_year": 2020 + i % 5}}
+        for i, v in enumerate(vectors)
+    ])
+    store.flush()
+
+    matches = store.query(vectors[5], top_k=5, filter={"ticker": "RARE"})
+    assert store.plans == {"scan": 1}
+    assert matches[0]["id"] == "chunk-5" and all(m["metadata"]["ticker"] == "RARE" for m in matches)
+
+    matches = store.query(vectors[100], top_k=5, filter={"ticker": {"$in": ["T0", "T1"]}, "fiscal_year": {"$gte": 2020}})
+    assert store.plans["probe"] == 1
+    assert matches[0]["id"] == "chunk-100" and all(m["metadata"]["ticker"] != "RARE" for m in matches)
+
+
+def test_bitmap_filters_match_column_evaluation():
+    rng = np.random.default_rng(3)
+    metadata = [
+        {"ticker": f"T{rng.integers(300)}", "fiscal_year": int(rng.integers(2015, 2025))} if i % 10 else {"ticker": "AAPL"}
+        for i in range(3000)
+    ]
+    columns = MetadataColumns(metadata)
+    for filter in [
+        {"ticker": "AAPL"},
+        {"ticker": {"$nin": ["AAPL", "T1"]}, "fiscal_year": {"$gte": 2018, "$lt": 2021}},
+        {"$or": [{"ticker": {"$in": ["T2", "T3"]}}, {"fiscal_year": {"$exists": False}}]},
+    ]:
+        expected = np.ones(len(metadata), dtype=bool)
+        for key, condition in filter.items():
+            if key == "$or":
+                expected &= np.logical_or.reduce([
+                    columns.condition_mask(*next(iter(sub.items()))) for sub in condition
+                ])
+            else:
+                expected &= columns.condition_mask(key, condition)
+        assert np.array_equal(columns.filter_mask(filter), expected)
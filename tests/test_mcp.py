@@ -2,7 +2,7 @@ import os
 import sys # Import sys to get the executable path
 import asyncio
 from dotenv import load_dotenv
-from agents.mcp import MCPServerStdio
+from agents.mcp import MCPServerSse, MCPServerStdio
 from agents import Agent, Runner, set_default_openai_key
 from mcp.shared.exceptions import McpError # Import McpError for specific exception handling
 
@@ -15,7 +15,7 @@ async def run(server):
     Runs the OpenAI Agent with the provided MCP server
 
     Args:
-        server (MCPServerStdio): The MCP server to use
+        server (MCPServerStdio | MCPServerSse): The MCP server to use
     """
     
     agent = Agent(
@@ -92,6 +92,16 @@ async def test():
     Defines the MCP server and runs the OpenAI Agent
     """
     
+    # Connect to an already running shared server (server.py --transport sse) if one is given
+    server_url = os.getenv("MCP_SERVER_URL")
+    if server_url:
+        try:
+            async with MCPServerSse(params={"url": server_url}) as server:
+                await run(server)
+        except McpError as e:
+            print(f"Error connecting to MCP server at {server_url}: {e}")
+        return
+    
     # Calculate the project root dynamically
     PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__)) 
     PROJECT_ROOT = os.path.dirname(PROJECT_ROOT) 
@@ -0,0 +1,48 @@
+# test_query_batcher.py - Offline checks for micro-batching of query embeddings
+
+import asyncio
+
+from src.embeddings.query_batcher import QueryEmbeddingBatcher
+
+
+def test_concurrent_requests_share_one_upstream_call():
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts], 10 * len(texts)
+
+    async def run():
+        batcher = QueryEmbeddingBatcher(embed, max_wait_seconds=0.05, max_batch_size=64)
+        results = await asyncio.gather(
+            batcher.embed(["net income"]), batcher.embed(["revenue", "eps"]), batcher.embed(["revenue"])
+        )
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert calls == [["net income", "revenue", "eps"]]  # Duplicate text sent once
+    assert results[0] == ([[10.0]], 10)
+    assert results[1] == ([[7.0], [3.0]], 20)
+    assert results[2] == ([[7.0]], 10)
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["batch_sizes"] == {3: 1}
+    assert stats["queue_delay"]["count"] == 3
+
+
+def test_full_batch_is_sent_early_and_errors_reach_every_caller():
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        raise RuntimeError("rate limited")
+
+    async def run():
+        # A 10 s window: only reaching max_batch_size can release the batch in time
+        batcher = QueryEmbeddingBatcher(embed, max_wait_seconds=10, max_batch_size=2)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True), timeout=1
+        )
+
+    results = asyncio.run(run())
+    assert calls == [["a", "b"]]
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,42 @@
+# test_query_cache.py - Offline checks for the two-tier query embedding cache
+
+import asyncio
+
+from src.embeddings.query_cache import QueryEmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def test_misses_are_embedded_once_and_reused_from_memory_and_disk(tmp_path):
+    requests = []
+
+    async def embed(texts):
+        requests.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts], 10 * len(texts)
+
+    cache = QueryEmbeddingCache(tmp_path / "queries.sqlite")
+    first = asyncio.run(cache.get_or_embed(MODEL, 2, ["Apple  revenue", "Apple revenue", "risk factors"], embed))
+    # Whitespace variants share an entry, so only the two distinct texts are sent
+    assert requests == [["Apple revenue", "risk factors"]]
+    assert first[0] == first[1] == [13.0, 1.0]
+    assert cache.stats()["misses"] == 2
+
+    again = asyncio.run(cache.get_or_embed(MODEL, 2, ["Apple revenue"], embed))
+    assert again == [[13.0, 1.0]] and len(requests) == 1
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["tokens_saved"] == 10
+
+    # A restarted server finds the embedding on disk; another width does not share it
+    reopened = QueryEmbeddingCache(tmp_path / "queries.sqlite")
+    assert asyncio.run(reopened.get_or_embed(MODEL, 2, ["risk factors"], embed)) == [[12.0, 1.0]]
+    assert len(requests) == 1 and reopened.stats()["disk_hits"] == 1
+    assert reopened.get(MODEL, 3, "risk factors") is None
+    stats = reopened.stats()
+    assert (stats["hit_rate"], stats["memory_entries"]) == (1.0, 1)
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cache = QueryEmbeddingCache(tmp_path / "queries.sqlite", max_memory_entries=2)
+    cache.put_many(MODEL, 2, [(f"query {i}", [float(i), 0.0], 1) for i in range(3)])
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get(MODEL, 2, "query 0") == [0.0, 0.0]  # Evicted from memory, still on disk
+    assert cache.stats()["disk_hits"] == 1
@@ -0,0 +1,64 @@
+# test_response_cache.py - Offline checks for TTL expiry, LRU eviction and generation invalidation of tool responses
+
+from src.mcp_server import response_cache as response_cache_module
+from src.mcp_server.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache_module.time, "monotonic", clock)
+    cache = ResponseCache(ttl_seconds=60)
+    key = ResponseCache.make_key("get_risk_factors", {"ticker": "AAPL", "fiscal_year": None})
+    assert key == ResponseCache.make_key("get_risk_factors", {"ticker": "AAPL"})
+
+    cache.put(key, "risks")
+    clock.now += 59
+    assert cache.get(key) == "risks"
+    clock.now += 1
+    assert cache.get(key) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_a_new_index_generation_drops_every_entry():
+    generation = [4]
+    cache = ResponseCache(generation=lambda: generation[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    generation[0] = 5
+    assert cache.get("b") is None and cache.get("a") is None
+    cache.put("a", 10)
+    assert cache.get("a") == 10
+    stats = cache.stats()
+    assert (stats["invalidations"], stats["generation"], stats["entries"]) == (1, 5, 1)
+
+
+def test_a_response_computed_across_a_generation_change_is_not_stored():
+    generation = [1]
+    cache = ResponseCache(generation=lambda: generation[0])
+    started_under = cache.generation()
+    generation[0] = 2  # An ingest run finished while the tool was running
+    cache.put("a", "mixed", started_under)
+    assert cache.get("a") is None and cache.stats()["stale_puts"] == 1
+
+    cache.put("a", "fresh", cache.generation())
+    assert cache.get("a") == "fresh"
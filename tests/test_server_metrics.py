@@ -0,0 +1,37 @@
+# test_server_metrics.py - Offline checks for the MCP server's latency histograms and counters
+
+from src.mcp_server.metrics import LatencyHistogram, ServerMetrics, current_tool
+
+
+def test_histogram_percentiles_are_within_one_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["max_ms"] == 100.0
+    assert 50.0 <= summary["p50_ms"] <= 55.0
+    assert 95.0 <= summary["p95_ms"] <= 100.0
+    assert summary["p99_ms"] <= summary["max_ms"]
+
+
+def test_stages_are_attributed_to_the_current_tool():
+    metrics = ServerMetrics()
+    token = current_tool.set("search_sec_filings")
+    try:
+        metrics.call_started("search_sec_filings")
+        with metrics.stage("embed"):
+            pass
+        metrics.cache_lookup("search_sec_filings", hit=False)
+        assert metrics.snapshot()["in_flight"] == 1
+        metrics.call_finished("search_sec_filings", 0.004)
+    finally:
+        current_tool.reset(token)
+    metrics.cache_lookup("search_sec_filings", hit=True)
+
+    tool = metrics.snapshot()["tools"]["search_sec_filings"]
+    assert tool["calls"] == 1 and tool["in_flight"] == 0 and tool["errors"] == 0
+    assert tool["response_cache_hit_rate"] == 0.5
+    assert set(tool["stages"]) == {"embed", "total"}
+    assert "search_sec_filings: n=1" in metrics.log_line()
@@ -0,0 +1,264 @@
+# test_server_search.py - Offline checks of SECSearchServer search paths against the local vector store
+
+import asyncio
+import json
+import time
+
+from src.embeddings.query_batcher import MAX_REQUEST_INPUTS
+from src.mcp_server import server as server_module
+from src.mcp_server.response_cache import ResponseCache
+from src.mcp_server.server import EMBEDDING_DIMENSIONS, MAX_FETCH_K, SearchRequest
+from src.preprocessing.sections import item_filter_conditions
+from src.retrieval.bm25_index import BM25IndexBuilder
+from src.utils.index_generation import bump_index_generation
+from src.vector_store.local_store import LocalVectorStore
+
+TICKERS = ["AAPL", "MSFT", "NVDA"]
+
+
+def _direction(i):
+    return [0.0] * i + [1.0] + [0.0] * (EMBEDDING_DIMENSIONS - i - 1)
+
+
+def _chunk(ticker, n=0, item_number="1A", part="PART I", item_name="Risk Factors", form_type="10K"):
+    return {
+        "id": f"{ticker}_{form_type}_2023-11-03-chunk-{n:04d}",
+        "values": _direction(TICKERS.index(ticker)),
+        "metadata": {
+            "ticker": ticker, "form_type": form_type, "filing_date": "2023-11-03", "fiscal_year": 2023,
+            "fiscal_quarter": 4, "item_id": f"Item {item_number} - {item_name}", "item_number": item_number,
+            "part": part, "item_name": item_name, "chunk_type": "narrative",
+        },
+    }
+
+
+async def ticker_embed(texts):
+    """A query naming a ticker points at that company's chunks."""
+    return [_direction(next((i for i, t in enumerate(TICKERS) if t in text), 0)) for text in texts], 0
+
+
+class RejectingStore(LocalVectorStore):
+    """Fails every query filtered on the ticker "BOOM", as a backend rejecting a bad filter would."""
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        if (filter or {}).get("ticker") == "BOOM":
+            raise ValueError("unsupported filter")
+        return super().query(vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
+
+    def query_many(self, queries, include_metadata=True):
+        if any((q.get("filter") or {}).get("ticker") == "BOOM" for q in queries):
+            raise ValueError("unsupported filter")
+        return super().query_many(queries, include_metadata=include_metadata)
+
+
+def test_semantic_search_many_keeps_request_order_and_isolates_failures(tmp_path, make_server):
+    store = RejectingStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([_chunk(ticker) for ticker in TICKERS])
+    server = make_server(store, ticker_embed)
+
+    requests = [
+        SearchRequest(query="NVDA risks", ticker_filter="NVDA", top_k=1),
+        {"query": "AAPL risks", "ticker_filter": "AAPL", "top_k": 1},
+        SearchRequest(query="MSFT risks", ticker_filter="MSFT", top_k=1),
+    ]
+    results = asyncio.run(server.semantic_search_many(requests))
+    assert [[r.ticker for r in result] for result in results] == [["NVDA"], ["AAPL"], ["MSFT"]]
+
+    # A request the store rejects comes back empty; the rest of the batch is still answered
+    requests.insert(1, SearchRequest(query="risks", ticker_filter="BOOM", top_k=1))
+    results = asyncio.run(server.semantic_search_many(requests))
+    assert [[r.ticker for r in result] for result in results] == [["NVDA"], [], ["AAPL"], ["MSFT"]]
+
+
+def test_a_bulk_batch_over_the_embedding_input_limit_is_split_into_requests(tmp_path, make_server):
+    store = LocalVectorStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([_chunk(ticker) for ticker in TICKERS])
+    server = make_server(store, ticker_embed)
+    embed = server._embed_texts
+    request_sizes = []
+
+    async def recording_embed(texts):
+        request_sizes.append(len(texts))
+        return await embed(texts)
+
+    server._embed_texts = recording_embed
+    tickers = [TICKERS[i % len(TICKERS)] for i in range(MAX_REQUEST_INPUTS + 2)]
+    requests = [SearchRequest(query=f"{ticker} risks #{i}", top_k=1) for i, ticker in enumerate(tickers)]
+    results = asyncio.run(server.semantic_search_many(requests))
+    assert request_sizes == [MAX_REQUEST_INPUTS, 2]
+    assert [result[0].ticker for result in results] == tickers
+
+
+class RecordingStore(LocalVectorStore):
+    """Local store that records the top_k and filter of every query."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = []
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        self.queries.append((top_k, filter))
+        return super().query(vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
+
+
+class EndlessStore:
+    """Always returns a full page of matches, none of which are in the filtered item."""
+
+    def __init__(self):
+        self.top_ks = []
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        self.top_ks.append(top_k)
+        return [{**_chunk("AAPL", n, item_number="7", item_name="Other"), "score": 0.5} for n in range(top_k)]
+
+
+def test_item_filters_map_to_exact_conditions_for_10k_and_10q_items():
+    assert item_filter_conditions("Item 8. Financial Statements and Supplementary Data") == {"item_number": "8"}
+    assert item_filter_conditions("Item 1A - Risk Factors") == {"item_number": "1A"}
+    assert item_filter_conditions("Part II, Item 1A") == {"item_number": "1A", "part": "PART II"}
+    assert item_filter_conditions("part i item 2") == {"item_number": "2", "part": "PART I"}
+    assert item_filter_conditions("Risk  Factors") == {"item_name": "Risk Factors"}
+    assert item_filter_conditions("Management's Discussion") == {
+        "item_name": "Management's Discussion and Analysis of Financial Condition and Results of Operations"
+    }
+    # "Financial Statements" is a 10-Q Part I item and part of the 10-K Item 8 name
+    assert item_filter_conditions("financial statements") == {
+        "item_name": {"$in": ["Financial Statements", "Financial Statements and Supplementary Data"]}
+    }
+    # Text that names no known item cannot be pushed down
+    assert item_filter_conditions("Liquidity and Capital Resources") is None
+    assert item_filter_conditions("  ") is None
+
+
+def test_item_filters_are_pushed_down_or_post_filtered(tmp_path, make_server):
+    store = RecordingStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([
+        _chunk("AAPL", 0),
+        _chunk("AAPL", 1, item_number="7", part="PART II", item_name="Management's Discussion and Analysis "
+               "of Financial Condition and Results of Operations"),
+        _chunk("AAPL", 2, item_number="7", part="PART II", item_name="Liquidity and Capital Resources"),
+    ])
+    server = make_server(store, ticker_embed)
+
+    results = asyncio.run(server.semantic_search("AAPL risks", item_filter="Item 1A. Risk Factors", top_k=3))
+    assert [r.chunk_id for r in results] == ["AAPL_10K_2023-11-03-chunk-0000"]
+    assert store.queries == [(3, {"item_number": "1A"})]
+
+    # Free text matched against item_id after the query, over-fetching for the post-filter
+    store.queries.clear()
+    results = asyncio.run(server.semantic_search("AAPL liquidity", item_filter="Liquidity", top_k=1))
+    assert [r.chunk_id for r in results] == ["AAPL_10K_2023-11-03-chunk-0002"]
+    assert len(store.queries) == 1 and store.queries[0][0] > 1 and store.queries[0][1] is None
+
+
+def test_adaptive_over_fetch_stops_at_max_fetch_k(make_server):
+    store = EndlessStore()
+    server = make_server(store, ticker_embed)
+    results = asyncio.run(server.semantic_search("AAPL liquidity", item_filter="Liquidity", top_k=5))
+    assert results == []
+    # Grows (at least doubling) until the cap, then gives up instead of querying again
+    assert store.top_ks[-1] == MAX_FETCH_K and store.top_ks.count(MAX_FETCH_K) == 1
+    assert all(b >= 2 * a or b == MAX_FETCH_K for a, b in zip(store.top_ks, store.top_ks[1:]))
+
+
+class SlowStore(LocalVectorStore):
+    """A blocking backend: each query holds its thread for QUERY_SECONDS, as a slow Pinecone call would."""
+
+    QUERY_SECONDS = 0.3
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        time.sleep(self.QUERY_SECONDS)
+        return super().query(vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
+
+
+def test_vector_queries_leave_the_event_loop_free_and_tool_searches_overlap(tmp_path, monkeypatch, make_server):
+    store = SlowStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([_chunk(ticker) for ticker in TICKERS])
+    monkeypatch.setattr(server_module, "search_server", make_server(store, ticker_embed))
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        response = await server_module.dispatch_tool(
+            "compare_companies", {"ticker1": "AAPL", "ticker2": "MSFT", "topic": "risks"}
+        )
+        elapsed = time.perf_counter() - started
+        beat.cancel()
+        return json.loads(response[0].text), elapsed, ticks
+
+    payload, elapsed, ticks = asyncio.run(run())
+    assert payload["company_1"]["ticker"] == "AAPL" and payload["company_2"]["ticker"] == "MSFT"
+    # Both searches were in flight together: one query's time, not two
+    assert elapsed < 2 * SlowStore.QUERY_SECONDS
+    # Other coroutines kept running while the queries blocked their worker threads
+    assert ticks >= 10
+
+
+def test_an_ingest_run_in_another_process_is_picked_up_on_the_next_tool_call(tmp_path, make_server):
+    writer = LocalVectorStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    writer.upsert([_chunk("AAPL")])
+    writer.flush()
+    server = make_server(LocalVectorStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS), ticker_embed)
+    server._lexical_index_dir = tmp_path / "bm25_index"
+
+    # The "ingest process" adds NVDA to both indexes and bumps the generation
+    writer.upsert([_chunk("NVDA")])
+    writer.flush()
+    builder = BM25IndexBuilder()
+    builder.add_chunks([{"chunk_id": _chunk("NVDA")["id"], "text": "NVDA supply risks", "ticker": "NVDA"}])
+    builder.write(tmp_path / "bm25_index")
+    assert asyncio.run(server.semantic_search("NVDA risks", ticker_filter="NVDA")) == []
+
+    bump_index_generation(server.index_generation.path)
+    asyncio.run(server.refresh_indexes())
+    assert len(server.vector_store) == 2 and len(server.lexical_index) == 1
+    results = asyncio.run(server.semantic_search("NVDA risks", ticker_filter="NVDA"))
+    assert [r.ticker for r in results] == ["NVDA"]
+
+
+class FlakyStore(LocalVectorStore):
+    """Raises on every query while `down` is set, as Pinecone does during an outage."""
+
+    down = True
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        if self.down:
+            raise ConnectionError("vector store unavailable")
+        return super().query(vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
+
+
+def test_responses_of_calls_whose_search_failed_are_not_cached(tmp_path, monkeypatch, make_server):
+    store = FlakyStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([_chunk(ticker) for ticker in TICKERS])
+    monkeypatch.setattr(server_module, "search_server", make_server(store, ticker_embed))
+    monkeypatch.setattr(server_module, "response_cache", ResponseCache())
+
+    def call(name, arguments):
+        response, failed = asyncio.run(server_module.cached_dispatch(name, arguments))
+        return json.loads(response[0].text), failed
+
+    search = {"query": "NVDA risks", "ticker": "NVDA"}
+    compare = {"ticker1": "AAPL", "ticker2": "MSFT", "topic": "risks"}
+    # The outage reads as "no results" to the agent, but is reported as a failure and not pinned
+    assert call("search_sec_filings", search) == ({"query": "NVDA risks", "total_results": 0, "results": []}, True)
+    assert call("compare_companies", compare)[1] is True
+    assert server_module.response_cache.stats()["entries"] == 0
+
+    store.down = False
+    payload, failed = call("search_sec_filings", search)
+    assert payload["total_results"] == 1 and not failed
+    assert call("compare_companies", compare)[0]["company_1"]["ticker"] == "AAPL"
+    assert server_module.response_cache.stats()["entries"] == 2
+
+    # An {"error": ...} payload is flagged from the payload itself, not its serialized text
+    payload, failed = call("get_risk_factors", {"ticker": "NOPE"})
+    assert "error" in payload and failed
+    assert server_module.response_cache.stats()["entries"] == 2
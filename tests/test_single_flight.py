@@ -0,0 +1,36 @@
+# test_single_flight.py - Offline check that identical concurrent searches share one upstream call
+
+import asyncio
+
+from src.mcp_server.server import EMBEDDING_DIMENSIONS
+from src.vector_store.local_store import LocalVectorStore
+
+
+def test_identical_concurrent_searches_are_coalesced(tmp_path, make_server):
+    store = LocalVectorStore(tmp_path / "index", dimensions=EMBEDDING_DIMENSIONS)
+    store.upsert([{
+        "id": "AAPL_10K_2023-11-03-chunk-0000",
+        "values": [1.0] + [0.0] * (EMBEDDING_DIMENSIONS - 1),
+        "metadata": {"ticker": "AAPL", "form_type": "10K", "filing_date": "2023-11-03", "fiscal_year": 2023,
+                     "fiscal_quarter": 4, "item_id": "Item 1A. Risk Factors", "chunk_type": "narrative"},
+    }])
+
+    embed_calls = []
+
+    async def fake_embed(texts):
+        embed_calls.append(texts)
+        await asyncio.sleep(0.01)  # Keep the first call in flight while the others arrive
+        return [[1.0] + [0.0] * (EMBEDDING_DIMENSIONS - 1) for _ in texts], 0
+
+    server = make_server(store, fake_embed)
+
+    async def run():
+        same = [server.semantic_search("risk factors", ticker_filter="AAPL") for _ in range(4)]
+        different = server.semantic_search("risk factors", ticker_filter="AAPL", top_k=1)
+        return await asyncio.gather(*same, different)
+
+    results = asyncio.run(run())
+    assert all(r and r[0].chunk_id == "AAPL_10K_2023-11-03-chunk-0000" for r in results)
+    assert results[0] is not results[1]  # Each caller gets its own list
+    stats = server.single_flight_stats()
+    assert stats["executed"] == 2 and stats["coalesced"] == 3 and stats["in_flight"] == 0
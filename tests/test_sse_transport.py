@@ -0,0 +1,51 @@
+# test_sse_transport.py - Offline check that several MCP clients share one server over HTTP/SSE
+
+import asyncio
+import json
+import socket
+
+import httpx
+import uvicorn
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from src.mcp_server.server import create_sse_app
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_concurrent_sse_clients_are_served_by_one_process():
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    async def client_session():
+        async with sse_client(f"{base_url}/sse") as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                tools = await session.list_tools()
+                stats = await session.call_tool("get_server_stats", {})
+                return [tool.name for tool in tools.tools], json.loads(stats.content[0].text)
+
+    async def run():
+        server = uvicorn.Server(uvicorn.Config(create_sse_app(), host="127.0.0.1", port=port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        try:
+            while not server.started:
+                await asyncio.sleep(0.01)
+            sessions = await asyncio.wait_for(asyncio.gather(client_session(), client_session()), timeout=30)
+            async with httpx.AsyncClient() as client:
+                health = (await client.get(f"{base_url}/health")).json()
+        finally:
+            server.should_exit = True
+            await serving
+        return sessions, health
+
+    sessions, health = asyncio.run(run())
+    for tool_names, stats in sessions:
+        assert "search_sec_filings" in tool_names and "get_server_stats" in tool_names
+        assert "query_embedding_cache" in stats
+    assert health["status"] == "ok"
@@ -0,0 +1,90 @@
+# test_vector_upserter.py - Offline checks for size-bounded, concurrent, retried vector upserts
+
+import threading
+import time
+
+from src.utils.retry import is_retryable
+from src.vector_store.upserter import VectorUpserter, serialized_size
+
+
+class ServiceUnavailable(Exception):
+    status = 503
+
+
+class Forbidden(Exception):
+    status = 403
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class APITimeoutError(APIConnectionError):
+    pass
+
+
+def test_retry_classification_is_shared_by_openai_and_pinecone_errors():
+    assert is_retryable(ServiceUnavailable()) and not is_retryable(Forbidden())
+    assert is_retryable(APITimeoutError()) and is_retryable(ConnectionResetError())
+    assert not is_retryable(ValueError("bad vector"))
+
+
+class RecordingStore:
+    """Stand-in for a remote index: records each request and fails the first `flaky` of them."""
+
+    def __init__(self, flaky=0, reject=False):
+        self.requests = []
+        self.flaky = flaky
+        self.reject = reject
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            attempt = len(self.requests)
+            self.requests.append([v["id"] for v in vectors])
+        try:
+            time.sleep(0.02)
+            if self.reject:
+                raise Forbidden("invalid api key")
+            if attempt < self.flaky:
+                raise ServiceUnavailable("try again")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _vectors(n, dimensions=64):
+    return [{"id": f"chunk-{i}", "values": [0.1] * dimensions, "metadata": {"ticker": "AAPL"}} for i in range(n)]
+
+
+def test_batches_are_sized_by_bytes_and_sent_concurrently():
+    vectors = _vectors(40)
+    sizes = {v["id"]: serialized_size(v) for v in vectors}
+    limit = 5 * sizes["chunk-10"]
+    store = RecordingStore()
+    upserter = VectorUpserter(store, max_batch_bytes=limit, max_batch_vectors=1000, max_concurrency=4)
+
+    assert upserter.upsert(vectors) == 40
+    assert all(sum(sizes[i] for i in ids) <= limit for ids in store.requests)
+    assert [len(ids) for ids in store.requests][-6:] == [5] * 6
+    assert sorted(i for ids in store.requests for i in ids) == sorted(v["id"] for v in vectors)
+    assert store.max_in_flight > 1
+    stats = upserter.stats()
+    assert stats["vectors"] == 40 and stats["batches"] == len(store.requests)
+    assert stats["vectors_per_second"] > 0 and stats["mb_per_second"] > 0
+    upserter.close()
+
+
+def test_transient_failures_are_retried_and_permanent_ones_reported():
+    store = RecordingStore(flaky=2)
+    upserter = VectorUpserter(store, max_batch_vectors=10, max_concurrency=1, base_delay=0.001)
+    assert upserter.upsert(_vectors(10)) == 10
+    assert len(store.requests) == 3 and upserter.stats()["retries"] == 2
+
+    rejecting = VectorUpserter(RecordingStore(reject=True), max_batch_vectors=10, base_delay=0.001)
+    assert rejecting.upsert(_vectors(10)) == 0
+    assert rejecting.stats()["retries"] == 0 and rejecting.stats()["failed_vectors"] == 10